@@ -0,0 +1,126 @@
+'''
+Author: Munir Mohamed Hafeel
+Date: 10-18-2026
+'''
+
+import math
+import threading
+from collections import deque
+
+
+class RollingStats:
+    # mean and variance of the last `window` values, Welford's update with removal
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    @property
+    def n(self):
+        return len(self.values)
+
+    def add(self, value):
+        if len(self.values) == self.window:
+            old = self.values.popleft()
+            if self.values:
+                old_mean = self.mean
+                self.mean -= (old - self.mean) / len(self.values)
+                self.m2 -= (old - old_mean) * (old - self.mean)
+            else:
+                self.mean = self.m2 = 0.0
+        self.values.append(value)
+        delta = value - self.mean
+        self.mean += delta / len(self.values)
+        self.m2 += delta * (value - self.mean)
+
+    def std(self):
+        return math.sqrt(max(self.m2, 0.0) / (self.n - 1)) if self.n > 1 else 0.0
+
+
+class EwmaStats:
+    # exponentially weighted mean and variance; alpha ~ 2 / (window + 1)
+    def __init__(self, window):
+        self.alpha = 2.0 / (window + 1)
+        self.n = 0
+        self.mean = 0.0
+        self.var = 0.0
+
+    def add(self, value):
+        self.n += 1
+        if self.n == 1:
+            self.mean = value
+            return
+        delta = value - self.mean
+        self.mean += self.alpha * delta
+        self.var = (1 - self.alpha) * (self.var + self.alpha * delta * delta)
+
+    def std(self):
+        return math.sqrt(self.var)
+
+
+class AnomalyDetector:
+    '''
+    Flags a reading as soon as it arrives when it is more than `threshold`
+    standard deviations from the rolling mean of its sensor and data key.
+    Keys start being checked after min_samples readings. windows overrides the
+    window length for individual data keys. A key alerts at most once every
+    `cooldown` seconds of reading time, so a sensor stuck on a bad value does
+    not send an alert per reading; the outliers held back are counted.
+    '''
+
+    def __init__(self, threshold=3.0, window=300, min_samples=30, method="window", windows=None, cooldown=60.0):
+        self.threshold = threshold
+        self.window = window
+        self.min_samples = min_samples
+        self.stats_class = EwmaStats if method == "ewma" else RollingStats
+        self.windows = windows or {}
+        self.cooldown = cooldown
+        self.stats = {}
+        self.last_alert = {}
+        self.suppressed = 0
+        self.listeners = []
+        self.lock = threading.Lock()
+
+    def observe(self, sensor_type, records):
+        alerts = []
+        with self.lock:
+            for record in records:
+                for data_key, value in record['data'].items():
+                    stats = self.stats.get((sensor_type, data_key))
+                    if stats is None:
+                        stats = self.stats_class(self.windows.get(data_key, self.window))
+                        self.stats[(sensor_type, data_key)] = stats
+                    if stats.n >= self.min_samples:
+                        std = stats.std()
+                        if std > 0 and abs(value - stats.mean) > self.threshold * std:
+                            last = self.last_alert.get((sensor_type, data_key))
+                            if last is not None and abs((record['timestamp'] - last).total_seconds()) < self.cooldown:
+                                self.suppressed += 1
+                            else:
+                                self.last_alert[(sensor_type, data_key)] = record['timestamp']
+                                alerts.append({
+                                    "sensor": sensor_type,
+                                    "key": data_key,
+                                    "timestamp": record['timestamp'],
+                                    "value": value,
+                                    "mean": stats.mean,
+                                    "std": std,
+                                    "z": (value - stats.mean) / std
+                                })
+                    stats.add(value)
+        for alert in alerts:
+            for listener in self.listeners:
+                listener(alert)
+        return alerts
+
+
+def compact_alert(alert):
+    # short field names, the anomalies collection can grow for years
+    return {
+        "s": alert["sensor"],
+        "k": alert["key"],
+        "t": alert["timestamp"],
+        "v": alert["value"],
+        "z": round(alert["z"], 2)
+    }
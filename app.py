@@ -1,7 +1,15 @@
-from flask import Flask, render_template, request, redirect, url_for
+import os
+import json
+from itertools import islice
+from datetime import datetime, timedelta
+from flask import Flask, Response, jsonify, render_template, request, redirect, url_for, stream_with_context
 import paho.mqtt.client as mqtt
 import db
 from bson.decimal128 import Decimal128
+from broadcast import Broadcaster
+from commands import CommandDispatcher
+from rules import RULES_CONFIG, RuleEngine, load_rules
+from ingest_service import parse_readings
 
 
 app = Flask(__name__)
@@ -18,50 +26,132 @@ devices = [
 # MQTT Broker credentials
 mqtt_server = "100.64.74.12"
 mqtt_topic = "fantopic"
+ack_topic = "fantopic/ack"
+alert_topic = "alerts"
+
+# "app": this process subscribes to the sensor topics and stores the readings.
+# "service": ingest_service.py workers store them and publish them on
+# readings_topic, which feeds the stream, rules and anomaly detection here
+ingest_mode = os.environ.get("INGEST_MODE", "app")
+readings_topic = os.environ.get("READINGS_TOPIC", "readings")
+if ingest_mode not in ("app", "service"):
+    raise ValueError(f"INGEST_MODE must be 'app' or 'service', not {ingest_mode!r}")
+# RULE_CONTROL=on lets the rules in RULES_CONFIG (rules.json, see rules.example.json)
+# switch the fans and pumps; off by default, the rules must match the wiring first
+rule_control = os.environ.get("RULE_CONTROL", "off")
+if rule_control not in ("on", "off"):
+    raise ValueError(f"RULE_CONTROL must be 'on' or 'off', not {rule_control!r}")
+rules_config = os.environ.get("RULES_CONFIG", RULES_CONFIG)
+
+# Live readings and alerts fanned out to every open dashboard stream
+broadcaster = Broadcaster()
 
 # Initialize SensorDataExtractor
 info = db.keys.run()
 db_uri = info.getauth("mongo")
-extractor = db.SensorDataExtractor(db_uri)
+# metrics=True records ingest and query timings for /metrics
+extractor = db.SensorDataExtractor(db_uri, metrics=True)
+if ingest_mode == "app":
+    extractor.start_write_behind()
+    extractor.start_spool()
+extractor.warm_latest_values()
+
+# Sensor topics come from sensors.json (temp_humid, APDS, SCD40, TDS, pH, DO, EC)
+subscribed_topics = set()
+
+def subscribe_sensor_topics(registry):
+    # also called after sensors.json is reloaded
+    topics = set(registry.topics())
+    for topic in topics - subscribed_topics:
+        mqtt_client.subscribe(topic)
+    for topic in subscribed_topics - topics:
+        mqtt_client.unsubscribe(topic)
+    subscribed_topics.clear()
+    subscribed_topics.update(topics)
 
 def on_connect(client, userdata, flags, rc):
-    client.subscribe("temp_humid")
-    client.subscribe("APDS")
-    client.subscribe("SCD40")
-    client.subscribe("TDS")
-    client.subscribe("pH")
-    client.subscribe("DO")
-    client.subscribe("EC")
+    if ingest_mode == "service":
+        client.subscribe(f"{readings_topic}/#")
+    else:
+        subscribed_topics.clear()
+        subscribe_sensor_topics(extractor.registry)
+    client.subscribe(ack_topic, qos=1)
     get_latest_values()
 
 def on_message(client, userdata, msg):
     incoming_message = msg.payload.decode()
-    extractor.insert_decoded_message(incoming_message)
+    if msg.topic == ack_topic:
+        dispatcher.handle_ack(incoming_message)
+        return
+    if ingest_mode == "service":
+        try:
+            extractor.receive_readings(*parse_readings(incoming_message))
+        except Exception as e:
+            print(f"Error reading published readings: {e}")
+        return
+    extractor.insert_decoded_message(incoming_message, msg.topic)
+
+def publish_alert(alert):
+    mqtt_client.publish(alert_topic, json.dumps(alert, default=str))
+    broadcaster.publish({"type": "alert", **{k: to_json_value(v) for k, v in alert.items()}})
+
+def publish_readings(sensor_type, records):
+    # called by the extractor for each live reading, already parsed
+    for record in records:
+        broadcaster.publish({
+            "type": "reading",
+            "sensor": sensor_type,
+            "timestamp": record['timestamp'].isoformat(),
+            "data": {k: to_json_value(v) for k, v in record['data'].items()}
+        })
+
+def publish_control(device, state, rules):
+    broadcaster.publish({"type": "control", "device": device, "state": state, "rules": rules})
 
 # Initialize MQTT client
 mqtt_client = mqtt.Client()
 mqtt_client.on_connect = on_connect
 mqtt_client.on_message = on_message
+extractor.anomalies.listeners.append(publish_alert)
+extractor.listeners.append(publish_readings)
+if ingest_mode == "app":
+    extractor.registry.listeners.append(subscribe_sensor_topics)
+extractor.registry.watch()
+# Device commands: batched QoS 1 publishes, acknowledged by fancontrol.ino
+dispatcher = CommandDispatcher(mqtt_client, mqtt_topic, ack_topic).start()
+# Fans and pumps driven from the live readings
+rule_engine = None
+if rule_control == "on":
+    rule_engine = RuleEngine(dispatcher.send, load_rules(rules_config)).start()
+    rule_engine.listeners.append(publish_control)
+    extractor.listeners.append(rule_engine.observe)
+extractor.metrics.collect("dashboard_streams", "gauge", "Open /api/stream connections", lambda: len(broadcaster))
+extractor.metrics.collect("device_commands_pending", "gauge", "Command batches waiting for an acknowledgement",
+                          lambda: len(dispatcher.pending))
+extractor.metrics.collect("device_commands_failed_total", "counter", "Command batches never acknowledged",
+                          lambda: dispatcher.failed)
 mqtt_client.connect(mqtt_server, 1883)
 
 # Start the MQTT loop in the background
 mqtt_client.loop_start()
 
-def get_latest_values():
-  sensor_types = ["temperature-humidity", "co2", "light", "pH", "conductivity", "o2"]
+def to_json_value(value):
+  # Convert the value to a float if it's stored as a Decimal128 object in MongoDB
+  if isinstance(value, Decimal128):
+      return value.to_decimal().to_float_lossy()
+  if isinstance(value, datetime):
+      return value.isoformat()
+  return value
 
+def get_latest_values():
+  # served from the extractor's last-value cache, no database round trips
   latest_data = {}
-  for sensor_type in sensor_types:
-      latest_collection = extractor.get_latest_collection(sensor_type)
-      if latest_collection:
-          latest_datapoint = extractor.get_latest_datapoint(latest_collection)
-          if latest_datapoint:
-              for key, value in latest_datapoint["data"].items():
-                  # Convert the value to a float if it's stored as a Decimal128 object in MongoDB
-                  if isinstance(value, Decimal128):
-                      value = value.to_decimal().to_float_lossy()
-                  latest_data[key] = value
-                  print(key, value)
+  for sensor_type, values in extractor.latest_values.snapshot().items():
+      for key, entry in values.items():
+          value = to_json_value(entry["value"])
+          latest_data[key] = value
+          print(key, value)
+  return latest_data
 
 
 
@@ -70,16 +160,95 @@ def get_latest_values():
 def index():
     return render_template('index.html', devices=devices)
 
+@app.route('/api/latest')
+def api_latest():
+    # {sensor: {key: {value, timestamp}}} from the last-value cache
+    return jsonify({
+        sensor_type: {key: {"value": to_json_value(entry["value"]), "timestamp": to_json_value(entry["timestamp"])}
+                      for key, entry in values.items()}
+        for sensor_type, values in extractor.latest_values.snapshot().items()
+    })
+
+@app.route('/api/series')
+def api_series():
+    # ?sensor=temperature-humidity&keys=temperature,humidity&start=...&end=...&resolution=60&limit=5000
+    # start/end are "YYYY-MM-DD" or "YYYY-MM-DD HH:MM:SS", default the last hour;
+    # resolution (seconds) serves averaged points from the rollup tiers
+    sensor_type = request.args.get('sensor')
+    keys = request.args.get('keys')
+    if not sensor_type or not keys:
+        return jsonify({"error": "sensor and keys are required"}), 400
+    now = datetime.now()
+    start = request.args.get('start') or (now - timedelta(hours=1)).strftime('%Y-%m-%d %H:%M:%S')
+    end = request.args.get('end') or now.strftime('%Y-%m-%d %H:%M:%S')
+    resolution = request.args.get('resolution', type=int)
+    limit = request.args.get('limit', 10000, type=int)
+    try:
+        series = extractor.get_series(sensor_type, start, end, keys.split(','), resolution)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    points = [
+        {"timestamp": to_json_value(point['timestamp']),
+         **{k: to_json_value(v) for k, v in point.get('data', {}).items()}}
+        for point in islice(series, limit)
+    ]
+    return jsonify({"sensor": sensor_type, "points": points})
+
+@app.route('/api/stream')
+def api_stream():
+    # Server-Sent Events: every live reading and alert as it is ingested
+    return Response(stream_with_context(broadcaster.stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/metrics')
+def metrics():
+    return Response(extractor.metrics.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/device', methods=['POST'])
 def fan():
     fan_state = request.form['device_state']
     print(fan_state)
-    mqtt_client.publish(mqtt_topic, fan_state)
+    dispatcher.send([fan_state])
     return redirect(url_for('index'))
 
+@app.route('/api/devices', methods=['POST'])
+def api_devices():
+    # {"commands": {"pump1": "on", "fan2": "off"}, "wait": true}; all changes go out in one publish.
+    # With wait the response carries the acknowledgement, otherwise 202 and the command id.
+    body = request.get_json(silent=True) or {}
+    commands = body.get("commands")
+    if not commands or not isinstance(commands, (dict, list)):
+        return jsonify({"error": "commands must be a non-empty object or list"}), 400
+    command_id = dispatcher.send(commands)
+    if not body.get("wait"):
+        return jsonify({"id": command_id}), 202
+    result = dispatcher.wait(command_id)
+    if result is None:
+        return jsonify({"id": command_id, "acked": False}), 504
+    return jsonify(result), 200 if result["acked"] else 504
+
+@app.route('/api/devices/latency')
+def api_device_latency():
+    # command-to-actuation time per device, from publish to the controller's acknowledgement
+    return jsonify(dispatcher.stats())
+
+@app.route('/api/rules')
+def api_rules():
+    # rule states, the commands they last sent and the current score
+    if rule_engine is None:
+        return jsonify({"error": "rule control is off, see RULE_CONTROL"}), 404
+    return jsonify(rule_engine.status())
+
 if __name__ == '__main__':
     try:
-        app.run(debug=True)
+        # threaded so that open event streams do not block other requests; no
+        # reloader, its child process would ingest, spool and send commands too
+        app.run(debug=True, threaded=True, use_reloader=False)
     finally:
         # Stop the MQTT loop when the Flask app stops
         mqtt_client.loop_stop()
+        if rule_engine is not None:
+            rule_engine.close()
+        dispatcher.close()
+        # Flush any buffered readings before exiting
+        extractor.close()
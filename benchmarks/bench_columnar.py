@@ -0,0 +1,83 @@
+'''
+Author: Munir Mohamed Hafeel
+Date: 10-18-2026
+
+List-based statistics methods against the columnar NumPy path for one day.
+--decode times only the client side: synthetic readings encoded as raw BSON
+batches, decoded by the fixed-layout path and by decode_all, no database.
+
+    python benchmarks/bench_columnar.py temperature-humidity 2023-03-01 temperature
+    python benchmarks/bench_columnar.py --decode 1000000
+'''
+
+import os
+import sys
+import time
+import argparse
+from datetime import datetime, timedelta
+from bson import encode
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import db
+import columnar
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"{label:<36} {(time.perf_counter() - start) * 1000:>10.1f} ms")
+    return result
+
+
+def bench_decode(readings, data_keys, batch_size=10000):
+    start = datetime(2026, 1, 1)
+    batches = []
+    for first in range(0, readings, batch_size):
+        batches.append(b"".join(encode({
+            "timestamp": start + timedelta(seconds=10 * i),
+            "data": {k: 20.0 + (i * (j + 1)) % 97 / 10 for j, k in enumerate(data_keys)}
+        }) for i in range(first, min(first + batch_size, readings))))
+    print(f"{readings} readings, {len(data_keys)} keys, {sum(map(len, batches)) / 1e6:.1f} MB of BSON")
+    fixed = timed("fixed-layout decode", lambda: columnar.concat_columns(
+        [columnar.decode_fixed(batch, data_keys) for batch in batches], data_keys))
+    documents = timed("decode_all decode", lambda: columnar.concat_columns(
+        [columnar.decode_documents(batch, data_keys) for batch in batches], data_keys))
+    assert all((fixed[k] == documents[k]).all() for k in fixed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare list-based and columnar statistics")
+    parser.add_argument("sensor", nargs="?")
+    parser.add_argument("date", nargs="?")
+    parser.add_argument("data_key", nargs="?")
+    parser.add_argument("--decode", type=int, metavar="READINGS", help="time decoding only, on synthetic readings")
+    args = parser.parse_args()
+    if args.decode:
+        bench_decode(args.decode, ["temperature", "humidity"])
+        return
+    if not args.data_key:
+        parser.error("sensor, date and data_key are required without --decode")
+
+    extractor = db.SensorDataExtractor(db.keys.run().getauth("mongo"))
+    collection_name = f"{args.sensor}-{args.date}"
+    key = args.data_key
+    try:
+        def list_based():
+            return (extractor.get_standard_deviation(collection_name, key),
+                    extractor.get_percentiles(collection_name, key, exact=True),
+                    extractor.get_mode(collection_name, key),
+                    extractor.get_median(collection_name, key, exact=True),
+                    extractor.get_data_rate(collection_name))
+
+        timed("list-based (5 queries)", list_based)
+        columns = timed("columnar fetch", lambda: extractor.get_columns(args.sensor, args.date, args.date, [key]))
+        timed("columnar stats", lambda: columnar.summarize(columns, [key]))
+        print(f"{columns['timestamp'].size} readings, "
+              f"{sum(column.nbytes for column in columns.values()) / 1e6:.1f} MB as columns")
+    finally:
+        extractor.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+'''
+Author: Munir Mohamed Hafeel
+Date: 10-18-2026
+
+Micro-benchmark for line parsing: the per-sensor regex + strptime loop that
+extract_data used to run against the shared SensorLineParser.
+
+    python benchmarks/bench_parser.py --lines 200000
+'''
+
+import os
+import re
+import sys
+import time
+import random
+import argparse
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from sensor_parser import SENSOR_PATTERNS, TIMESTAMP_PATTERN, TIMESTAMP_FORMAT, SensorLineParser
+
+
+def legacy_parse(line, sensor_patterns):
+    results = []
+    timestamp_match = re.search(TIMESTAMP_PATTERN, line)
+    if timestamp_match:
+        dt = datetime.strptime(timestamp_match.group(1), TIMESTAMP_FORMAT)
+        for sensor, sensor_info in sensor_patterns.items():
+            match = re.search(sensor_info['pattern'], line)
+            if match:
+                record = {
+                    "metadata": sensor_info['metadata'],
+                    "timestamp": dt,
+                    "data": {k: float(v) for k, v in zip(sensor_info['data_keys'], match.groups())}
+                }
+                results.append((sensor, record))
+    return results
+
+
+def make_lines(count, seed=0):
+    rng = random.Random(seed)
+    start = datetime(2023, 3, 1)
+    templates = [
+        "Temperature: {:.2f}, Humidity: {:.2f}",
+        "CO2: {}",
+        "Red: {}, Green: {}, Blue: {}, Clear: {}",
+        "pH: {}",
+        "EC: {}",
+        "O2: {}",
+    ]
+    lines = []
+    for i in range(count):
+        ts = (start + timedelta(seconds=i // 3)).strftime(TIMESTAMP_FORMAT)
+        kind = i % (len(templates) + 1)
+        if kind == len(templates):
+            lines.append(f"{ts} - Connecting to WiFi...\n")
+            continue
+        values = [rng.uniform(10, 90) if kind == 0 else rng.randint(0, 2000) for _ in range(4)]
+        lines.append(f"{ts} - " + templates[kind].format(*values) + "\n")
+    return lines
+
+
+def run(label, parse, lines):
+    start = time.perf_counter()
+    records = 0
+    for line in lines:
+        records += len(parse(line))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<10} {len(lines) / elapsed:>12,.0f} lines/sec  ({records} records, {elapsed:.3f}s)")
+    return len(lines) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare legacy and compiled line parsing throughput")
+    parser.add_argument("--lines", type=int, default=200000)
+    args = parser.parse_args()
+
+    lines = make_lines(args.lines)
+    line_parser = SensorLineParser(SENSOR_PATTERNS)
+    before = run("legacy", lambda line: legacy_parse(line, SENSOR_PATTERNS), lines)
+    after = run("compiled", line_parser.parse, lines)
+    print(f"speedup    {after / before:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+'''
+Author: Munir Mohamed Hafeel
+Date: 10-18-2026
+
+Query latency and size of the same day on every storage layout. Run after
+migrate.py (--to timeseries and --to buckets) so all layouts hold the same data,
+or with --generate, which writes one synthetic day to every layout of a
+scratch database (dropped afterwards) first.
+
+    python benchmarks/bench_storage.py temperature-humidity 2023-03-01 temperature
+    python benchmarks/bench_storage.py temperature-humidity 2023-03-01 temperature --mongo mock --generate 10
+
+"storage MB" is collStats storage plus index size and needs a server.
+"BSON MB" is the size of the stored documents as the client reads them (the
+measurements, not the internal buckets, for time-series). --mongo mock
+(mongomock) cannot create time-series collections, and its timings are
+Python costs, not a server's.
+'''
+
+import os
+import sys
+import time
+import argparse
+from statistics import median
+from bson import encode
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import db
+from storage import STORAGE_BACKENDS
+from synthetic import ReadingGenerator
+
+
+def timed(fn, repeat):
+    # None when the query fails, e.g. a stage mongomock cannot run
+    samples = []
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - start)
+    except Exception as e:
+        print(f"  {type(e).__name__}: {e}")
+        return None
+    return median(samples) * 1000
+
+
+def generate(extractor, sensor, date, interval):
+    records = []
+    for _, _, line in ReadingGenerator(days=1, interval=interval, start=date, sensors=[sensor], noise=0).readings():
+        records.extend(record for _, record in extractor.registry.parse(line))
+    extractor.storage.write(sensor, records)
+    return len(records)
+
+
+def stored_bytes(extractor, sensor, date):
+    # the day's stored documents: before the stages that unpack buckets
+    collection, stages = extractor.storage.source(sensor, date)
+    documents = collection.aggregate(stages[:1]) if stages else collection.find()
+    return sum(len(encode(document)) for document in documents)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare query latency between storage backends")
+    parser.add_argument("sensor")
+    parser.add_argument("date")
+    parser.add_argument("data_key")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--mongo", default=None, help="'mock' for mongomock, a MongoDB URI, or the keys file default")
+    parser.add_argument("--generate", type=float, metavar="INTERVAL",
+                        help="write a synthetic day, one reading every INTERVAL seconds, to every layout first")
+    parser.add_argument("--database", default="ModelFarm2_bench_storage", help="scratch database for --generate")
+    args = parser.parse_args()
+
+    if args.mongo == "mock":
+        import mongomock
+        db.MongoClient = mongomock.MongoClient
+        db_uri = "mongodb://localhost"
+    else:
+        db_uri = args.mongo or db.keys.run().getauth("mongo")
+    database = args.database if args.generate else "ModelFarm2"
+    collection_name = f"{args.sensor}-{args.date}"
+    noon = f"{args.date} 12:00:00"
+    queries = {
+        "get_latest_collection": lambda e: e.get_latest_collection(args.sensor),
+        "get_latest_datapoint": lambda e: e.get_latest_datapoint(collection_name),
+        "get_data_for_time": lambda e: e.get_data_for_time(collection_name, noon),
+        "get_data_count": lambda e: e.get_data_count(collection_name),
+        "get_mode": lambda e: e.get_mode(collection_name, args.data_key),
+        "get_median (exact)": lambda e: e.get_median(collection_name, args.data_key, exact=True),
+        "filter_data": lambda e: e.filter_data(args.sensor, args.date, {f"data.{args.data_key}": {"$gt": 0}}),
+    }
+
+    results = {}
+    sizes = {}
+    documents = {}
+    for backend in STORAGE_BACKENDS:
+        extractor = db.SensorDataExtractor(db_uri, storage=backend, database=database)
+        # measure the layout, not the result cache
+        extractor.query_cache = None
+        try:
+            if args.generate:
+                generate(extractor, args.sensor, args.date, args.generate)
+            documents[backend] = stored_bytes(extractor, args.sensor, args.date)
+            results[backend] = {name: timed(lambda: query(extractor), args.repeat) for name, query in queries.items()}
+            try:
+                sizes[backend] = extractor.storage.storage_size(args.sensor)
+            except Exception:
+                sizes[backend] = None
+        except Exception as e:
+            print(f"{backend}: {type(e).__name__}: {e}")
+        finally:
+            if args.generate:
+                extractor.client.drop_database(database)
+            extractor.close()
+
+    show = lambda value, digits: f"{value:>12.{digits}f}" if value is not None else f"{'n/a':>12}"
+    print(f"{'query (median ms)':<24}" + "".join(f"{backend:>12}" for backend in results))
+    for name in queries:
+        print(f"{name:<24}" + "".join(show(results[backend][name], 2) for backend in results))
+    print(f"{'storage MB (sensor)':<24}" + "".join(show(sizes[backend] and sizes[backend] / 1e6, 2) for backend in results))
+    print(f"{'BSON MB (day)':<24}" + "".join(show(documents[backend] / 1e6, 2) for backend in results))
+
+
+if __name__ == '__main__':
+    main()
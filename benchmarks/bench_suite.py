@@ -0,0 +1,309 @@
+'''
+Author: Munir Mohamed Hafeel
+Date: 10-18-2026
+
+End-to-end benchmark on synthetic data: extract_data throughput on a
+generated serial log, live insert_decoded_message rate and latency through an
+MQTT broker (an in-process loopback by default), and latency percentiles of
+every statistics method. Results are written as JSON so runs can be compared.
+
+    python benchmarks/bench_suite.py --mongo mock --days 2 --interval 10 --output results.json
+    python benchmarks/bench_suite.py --mongo mongodb://localhost:27017 --broker localhost:1883
+
+--mongo mock runs against mongomock (pip install mongomock "pymongo<4.9";
+mongomock 4.3 cannot take newer pymongo bulk operations) inside the process
+and needs no keys file; queries it cannot execute are recorded as errors.
+Its timings show where Python time goes, not what a server costs. Against a real
+mongod the benchmark uses its own database (--database), dropped first.
+'''
+
+import os
+import sys
+import json
+import time
+import queue
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+import contextlib
+from types import SimpleNamespace
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import db
+from synthetic import ReadingGenerator
+
+
+def percentiles(samples):
+    # milliseconds
+    if not samples:
+        return {"count": 0}
+    samples = sorted(samples)
+    n = len(samples)
+    pick = lambda p: samples[min(int(n * p), n - 1)] * 1000
+    return {
+        "count": n,
+        "mean": sum(samples) / n * 1000,
+        "p50": pick(0.50),
+        "p90": pick(0.90),
+        "p99": pick(0.99),
+        "max": samples[-1] * 1000
+    }
+
+
+class LoopbackBroker:
+    '''
+    Stand-in for a local MQTT broker: published messages are delivered to the
+    subscriber's on_message from one network thread, as paho's loop does.
+    '''
+
+    def __init__(self):
+        self.messages = queue.Queue()
+        self.handlers = {}
+        self.thread = threading.Thread(target=self._run, name="loopback-broker", daemon=True)
+
+    def subscribe(self, topic, on_message):
+        self.handlers[topic] = on_message
+        if not self.thread.is_alive():
+            self.thread.start()
+
+    def publish(self, topic, payload):
+        self.messages.put(SimpleNamespace(topic=topic, payload=payload.encode()))
+
+    def _run(self):
+        while True:
+            msg = self.messages.get()
+            if msg is None:
+                return
+            handler = self.handlers.get(msg.topic)
+            if handler:
+                handler(None, None, msg)
+
+    def close(self):
+        if self.thread.is_alive():
+            self.messages.put(None)
+            self.thread.join()
+
+
+class PahoBroker:
+    # a real broker, e.g. a local mosquitto; one client publishes, one subscribes
+    def __init__(self, address):
+        import paho.mqtt.client as mqtt
+        host, _, port = address.partition(":")
+        self.publisher = mqtt.Client()
+        self.subscriber = mqtt.Client()
+        for client in (self.publisher, self.subscriber):
+            client.connect(host, int(port or 1883))
+            client.loop_start()
+
+    def subscribe(self, topic, on_message):
+        self.subscriber.message_callback_add(topic, on_message)
+        self.subscriber.subscribe(topic)
+
+    def publish(self, topic, payload):
+        self.publisher.publish(topic, payload)
+
+    def close(self):
+        for client in (self.publisher, self.subscriber):
+            client.loop_stop()
+            client.disconnect()
+
+
+def connect(args):
+    if args.mongo == "mock":
+        try:
+            import mongomock
+        except ImportError:
+            sys.exit("--mongo mock needs mongomock: pip install mongomock")
+        db.MongoClient = mongomock.MongoClient
+        uri = "mongodb://localhost"
+    else:
+        uri = args.mongo or db.keys.run().getauth("mongo")
+    extractor = db.SensorDataExtractor(uri, storage=args.storage, database=args.database)
+    extractor.client.drop_database(args.database)
+    if not args.cached:
+        # measure the database, not the result cache
+        extractor.query_cache = None
+    return extractor
+
+
+def bench_extract(extractor, generator):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "serial.log")
+        lines, readings = generator.write_log(path)
+        size = os.path.getsize(path)
+        start = time.perf_counter()
+        extractor.extract_data(path)
+        elapsed = time.perf_counter() - start
+    return {
+        "lines": lines,
+        "readings": readings,
+        "bytes": size,
+        "seconds": elapsed,
+        "lines_per_sec": lines / elapsed,
+        "readings_per_sec": readings / elapsed,
+        "mb_per_sec": size / elapsed / 1e6
+    }
+
+
+def bench_live(extractor, generator, broker, messages, rate):
+    # publish -> on_message -> insert_decoded_message, with the write-behind
+    # buffer the app uses; latency is publish to handler return
+    payloads = list(generator.payloads(messages))
+    sent = {}
+    latencies = []
+    done = threading.Event()
+
+    def on_message(client, userdata, msg):
+        payload = msg.payload.decode()
+        extractor.insert_decoded_message(payload)
+        latencies.append(time.perf_counter() - sent[payload])
+        if len(latencies) == len(payloads):
+            done.set()
+
+    extractor.start_write_behind()
+    for topic in {topic for topic, _ in payloads}:
+        broker.subscribe(topic, on_message)
+
+    gap = 1.0 / rate if rate else 0
+    start = time.perf_counter()
+    for i, (topic, payload) in enumerate(payloads):
+        if gap:
+            delay = start + i * gap - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        sent[payload] = time.perf_counter()
+        broker.publish(topic, payload)
+    done.wait(timeout=max(60, len(payloads) / 100))
+    handled = time.perf_counter() - start
+
+    # everything queued is in the database once the buffer is closed
+    extractor.write_buffer.close()
+    stored = time.perf_counter() - start
+    buffer_stats = extractor.write_buffer.stats()
+    extractor.write_buffer = None
+    return {
+        "messages": len(payloads),
+        "handled": len(latencies),
+        "target_rate": rate or None,
+        "messages_per_sec": len(latencies) / handled,
+        "stored_per_sec": len(latencies) / stored,
+        "latency_ms": percentiles(latencies),
+        "write_buffer": buffer_stats
+    }
+
+
+def statistics_queries(sensor, date_str, data_key):
+    collection_name = f"{sensor}-{date_str}"
+    return {
+        "get_average_value": lambda e: e.get_average_value(sensor, date_str, data_key),
+        "get_highest_value": lambda e: e.get_highest_value(sensor, date_str, data_key),
+        "get_lowest_value": lambda e: e.get_lowest_value(sensor, date_str, data_key),
+        "get_standard_deviation": lambda e: e.get_standard_deviation(collection_name, data_key),
+        "get_median": lambda e: e.get_median(collection_name, data_key),
+        "get_median (exact)": lambda e: e.get_median(collection_name, data_key, exact=True),
+        "get_percentiles": lambda e: e.get_percentiles(collection_name, data_key),
+        "get_percentiles (exact)": lambda e: e.get_percentiles(collection_name, data_key, exact=True),
+        "get_mode": lambda e: e.get_mode(collection_name, data_key),
+        "get_data_count": lambda e: e.get_data_count(collection_name),
+        "get_data_rate": lambda e: e.get_data_rate(collection_name),
+        "get_summary": lambda e: e.get_summary(sensor, date_str, [data_key]),
+        "get_latest_datapoint": lambda e: e.get_latest_datapoint(collection_name),
+    }
+
+
+def bench_queries(extractor, queries, repeat):
+    results = {}
+    for name, query in queries.items():
+        samples = []
+        try:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                query(extractor)
+                samples.append(time.perf_counter() - start)
+            results[name] = percentiles(samples)
+        except Exception as e:
+            results[name] = {"error": f"{type(e).__name__}: {e}"}
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingestion and query benchmarks on synthetic sensor data")
+    parser.add_argument("--mongo", default=None, help="'mock' for mongomock, a MongoDB URI, or the keys file default")
+    parser.add_argument("--database", default="ModelFarm2_bench")
+    parser.add_argument("--storage", default="daily")
+    parser.add_argument("--broker", default=None, help="host[:port] of a real MQTT broker, loopback if omitted")
+    parser.add_argument("--days", type=float, default=1)
+    parser.add_argument("--interval", type=float, default=10.0, help="seconds between readings of each sensor")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--messages", type=int, default=5000, help="live MQTT messages")
+    parser.add_argument("--rate", type=float, default=0, help="live messages/sec, 0 for as fast as possible")
+    parser.add_argument("--repeat", type=int, default=20, help="runs per statistics method")
+    parser.add_argument("--sensor", default="temperature-humidity")
+    parser.add_argument("--key", default="temperature")
+    parser.add_argument("--cached", action="store_true", help="leave the query result cache enabled")
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args()
+
+    history = ReadingGenerator(days=args.days, interval=args.interval, seed=args.seed)
+    # live readings are stamped from today on, after the imported history
+    live = ReadingGenerator(days=args.messages * args.interval / len(history.sensors) / 86400 + 1, interval=args.interval,
+                            start=datetime.now().strftime('%Y-%m-%d'), seed=args.seed + 1, noise=0)
+
+    extractor = connect(args)
+    broker = PahoBroker(args.broker) if args.broker else LoopbackBroker()
+    results = {
+        "run": {
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": vars(args)
+        }
+    }
+    try:
+        # the extractor prints every decoded message; keep that out of the timings
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            results["extract_data"] = bench_extract(extractor, history)
+            results["live"] = bench_live(extractor, live, broker, args.messages, args.rate)
+            extractor.sketches.flush()
+            extractor.rollups.flush()
+            queries = statistics_queries(args.sensor, history.dates()[0], args.key)
+            results["queries"] = bench_queries(extractor, queries, args.repeat)
+    finally:
+        broker.close()
+        extractor.sketches.flush()
+        extractor.rollups.flush()
+        extractor.client.drop_database(args.database)
+        extractor.close()
+
+    with open(args.output, 'w') as file:
+        json.dump(results, file, indent=2, default=str)
+
+    extract = results["extract_data"]
+    live_results = results["live"]
+    print(f"extract_data           {extract['lines_per_sec']:>12,.0f} lines/sec  {extract['readings_per_sec']:>12,.0f} readings/sec")
+    print(f"insert_decoded_message {live_results['messages_per_sec']:>12,.0f} msgs/sec   "
+          f"p50 {live_results['latency_ms'].get('p50', 0):.2f} ms  p99 {live_results['latency_ms'].get('p99', 0):.2f} ms")
+    print(f"{'query':<24}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}")
+    for name, stats in results["queries"].items():
+        if "error" in stats:
+            print(f"{name:<24}  {stats['error'][:60]}")
+        else:
+            print(f"{name:<24}{stats['p50']:>10.2f}{stats['p90']:>10.2f}{stats['p99']:>10.2f}")
+    print(f"results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
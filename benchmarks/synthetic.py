@@ -0,0 +1,88 @@
+'''
+Author: Munir Mohamed Hafeel
+Date: 10-18-2026
+
+Reproducible synthetic sensor data in the exact formats matched by
+SENSOR_PATTERNS: serial log lines ("YYYY-MM-DD, HH:MM:SS - CO2: 612") and the
+same lines as MQTT payloads. Values follow a seeded random walk inside each
+sensor's usual range, so the same arguments always produce the same data.
+'''
+
+import random
+from datetime import datetime, timedelta
+
+from sensor_parser import SENSOR_PATTERNS, TIMESTAMP_FORMAT
+
+# sensor -> (line template, [(start, low, high, step, decimals)] per value)
+SENSORS = {
+    "temperature-humidity": ("Temperature: {}, Humidity: {}",
+                             [(22.0, 15.0, 35.0, 0.1, 2), (55.0, 30.0, 90.0, 0.3, 2)]),
+    "co2": ("CO2: {}", [(600, 400, 2000, 15, 0)]),
+    "light": ("Red: {}, Green: {}, Blue: {}, Clear: {}",
+              [(300, 0, 4000, 20, 0), (350, 0, 4000, 20, 0), (250, 0, 4000, 20, 0), (900, 0, 12000, 60, 0)]),
+    "pH": ("pH: {}", [(6, 4, 9, 1, 0)]),
+    "conductivity": ("EC: {}", [(1200, 500, 3000, 10, 0)]),
+    "o2": ("O2: {}", [(8, 4, 12, 1, 0)]),
+}
+
+
+class ReadingGenerator:
+    '''
+    One reading per sensor every `interval` seconds for `days` days starting
+    at `start`. noise adds that fraction of non-sensor lines, like the
+    WiFi/MQTT status messages in the real serial logs.
+    '''
+
+    def __init__(self, days=1, interval=10.0, start="2023-03-01", sensors=None, noise=0.05, seed=0):
+        self.days = days
+        self.interval = interval
+        self.start = datetime.strptime(start, '%Y-%m-%d')
+        self.sensors = sensors or list(SENSORS)
+        self.noise = noise
+        self.seed = seed
+
+    def readings(self):
+        # (sensor, timestamp, line) in timestamp order
+        rng = random.Random(self.seed)
+        state = {sensor: [spec[0] for spec in SENSORS[sensor][1]] for sensor in self.sensors}
+        steps = int(self.days * 86400 / self.interval)
+        for i in range(steps):
+            dt = self.start + timedelta(seconds=i * self.interval)
+            ts = dt.strftime(TIMESTAMP_FORMAT)
+            for sensor in self.sensors:
+                template, specs = SENSORS[sensor]
+                values = state[sensor]
+                text = []
+                for j, (_, low, high, step, decimals) in enumerate(specs):
+                    values[j] = min(high, max(low, values[j] + rng.uniform(-step, step)))
+                    text.append(f"{values[j]:.{decimals}f}" if decimals else str(int(round(values[j]))))
+                yield sensor, dt, f"{ts} - " + template.format(*text)
+            if rng.random() < self.noise:
+                yield None, dt, f"{ts} - Connecting to MQTT Broker..."
+
+    def count(self):
+        return int(self.days * 86400 / self.interval) * len(self.sensors)
+
+    def dates(self):
+        return [(self.start + timedelta(days=d)).strftime('%Y-%m-%d') for d in range(int(self.days + 0.999))]
+
+    def write_log(self, path):
+        # returns (lines, readings) written
+        lines = readings = 0
+        with open(path, 'w') as file:
+            for sensor, _, line in self.readings():
+                file.write(line + "\n")
+                lines += 1
+                readings += sensor is not None
+        return lines, readings
+
+    def payloads(self, limit=None):
+        # (topic, payload) as the devices publish them, one reading per message
+        n = 0
+        for sensor, _, line in self.readings():
+            if sensor is None:
+                continue
+            if limit is not None and n >= limit:
+                return
+            n += 1
+            yield SENSOR_PATTERNS[sensor]['topic'], line
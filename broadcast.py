@@ -0,0 +1,67 @@
+'''
+Author: Munir Mohamed Hafeel
+Date: 10-18-2026
+'''
+
+import json
+import queue
+import threading
+
+
+def format_sse(data, event=None):
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data, default=str)}\n\n"
+
+
+class Broadcaster:
+    '''
+    In-memory fan-out of live events to any number of subscribers (one per
+    open dashboard). Each subscriber has its own bounded queue; a client that
+    falls behind loses its oldest events rather than slowing down ingestion.
+    '''
+
+    def __init__(self, max_queue=100):
+        self.max_queue = max_queue
+        self.subscribers = set()
+        self.lock = threading.Lock()
+
+    def subscribe(self):
+        subscriber = queue.Queue(maxsize=self.max_queue)
+        with self.lock:
+            self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+
+    def publish(self, event):
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            while True:
+                try:
+                    subscriber.put_nowait(event)
+                    break
+                except queue.Full:
+                    try:
+                        subscriber.get_nowait()
+                    except queue.Empty:
+                        pass
+
+    def stream(self, keepalive=15.0):
+        # Server-Sent Events generator for one client
+        subscriber = self.subscribe()
+        try:
+            while True:
+                try:
+                    event = subscriber.get(timeout=keepalive)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                yield format_sse(event, event.get("type"))
+        finally:
+            self.unsubscribe(subscriber)
+
+    def __len__(self):
+        return len(self.subscribers)
@@ -0,0 +1,107 @@
+'''
+Author: Munir Mohamed Hafeel
+Date: 10-18-2026
+'''
+
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from sensor_parser import SensorLineParser
+
+_worker_parser = None
+
+
+def _init_worker(sensor_patterns):
+    global _worker_parser
+    _worker_parser = SensorLineParser(sensor_patterns)
+
+
+def _parse_chunk(chunk):
+    # (grouped records, lines, parse seconds), timed in the worker process
+    start = time.perf_counter()
+    grouped = {}
+    lines = chunk.splitlines()
+    for line in lines:
+        for sensor, record in _worker_parser.parse(line):
+            grouped.setdefault(sensor, []).append(record)
+    return grouped, len(lines), time.perf_counter() - start
+
+
+def read_chunks(file_path, chunk_bytes=4 * 1024 * 1024, start=0):
+    # chunks always end on a line boundary; yields (text, end_offset)
+    with open(file_path, 'rb') as file:
+        file.seek(start)
+        while True:
+            data = file.read(chunk_bytes)
+            if not data:
+                break
+            if not data.endswith(b'\n'):
+                data += file.readline()
+            yield data.decode('utf-8', errors='replace'), file.tell()
+
+
+def parse_chunks(chunks, sensor_patterns, workers=None, max_pending=None, on_parsed=None):
+    '''
+    Parse (text, end_offset) chunks and yield (grouped_records, end_offset) in
+    file order. At most max_pending chunks are in flight, so a slow consumer
+    stops the file from being read any further ahead. on_parsed(lines,
+    seconds) is called for every chunk with the time its worker spent parsing.
+    '''
+    patterns = {
+        sensor: {k: sensor_info[k] for k in ("pattern", "metadata", "data_keys")}
+        for sensor, sensor_info in sensor_patterns.items()
+    }
+    workers = workers or os.cpu_count() or 1
+
+    def parsed(result):
+        grouped, lines, seconds = result
+        if on_parsed is not None:
+            on_parsed(lines, seconds)
+        return grouped
+
+    if workers == 1:
+        _init_worker(patterns)
+        for chunk, offset in chunks:
+            yield parsed(_parse_chunk(chunk)), offset
+        return
+
+    max_pending = max_pending or workers * 2
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(patterns,)) as pool:
+        for chunk, offset in chunks:
+            pending.append((pool.submit(_parse_chunk, chunk), offset))
+            if len(pending) >= max_pending:
+                future, end = pending.popleft()
+                yield parsed(future.result()), end
+        while pending:
+            future, end = pending.popleft()
+            yield parsed(future.result()), end
+
+
+class ImportProgress:
+    def __init__(self, total_bytes, report, interval=5.0, start_offset=0):
+        self.total_bytes = total_bytes
+        self.report = report
+        self.interval = interval
+        self.start_offset = start_offset
+        self.offset = start_offset
+        self.records = 0
+        self.started = time.monotonic()
+        self.last_report = self.started
+
+    def update(self, offset, records):
+        self.offset = offset
+        self.records += records
+        now = time.monotonic()
+        if now - self.last_report >= self.interval:
+            self.last_report = now
+            self.report(self.summary())
+
+    def summary(self):
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        done = self.offset - self.start_offset
+        percent = 100.0 * self.offset / self.total_bytes if self.total_bytes else 100.0
+        return (f"{percent:5.1f}% {self.offset / 1e6:.1f}/{self.total_bytes / 1e6:.1f} MB, "
+                f"{self.records} records, {done / 1e6 / elapsed:.1f} MB/s, "
+                f"{self.records / elapsed:.0f} records/s")
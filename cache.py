@@ -0,0 +1,251 @@
+'''
+Author: Munir Mohamed Hafeel
+Date: 10-18-2026
+'''
+
+import copy
+import time
+import pickle
+import sqlite3
+import inspect
+import functools
+import threading
+from datetime import date
+from collections import OrderedDict
+from pymongo import ReturnDocument
+from storage import split_collection_name
+
+
+class LastValueCache:
+    '''
+    Most recent value of every (sensor, data key), updated by ingestion and
+    read by the web app without touching the database. A reading only
+    replaces the cached one if it is at least as new, so importing old logs
+    does not overwrite live values.
+    '''
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def update(self, sensor_type, records):
+        with self.lock:
+            for record in records:
+                dt = record['timestamp']
+                for data_key, value in record['data'].items():
+                    current = self.values.get((sensor_type, data_key))
+                    if current is None or dt >= current[1]:
+                        self.values[(sensor_type, data_key)] = (value, dt)
+
+    def get(self, sensor_type, data_key):
+        with self.lock:
+            return self.values.get((sensor_type, data_key))
+
+    def latest(self, sensor_type):
+        with self.lock:
+            return {k: value for (s, k), (value, _) in self.values.items() if s == sensor_type}
+
+    def snapshot(self):
+        with self.lock:
+            items = list(self.values.items())
+        result = {}
+        for (sensor_type, data_key), (value, dt) in items:
+            result.setdefault(sensor_type, {})[data_key] = {"value": value, "timestamp": dt}
+        return result
+
+    def __len__(self):
+        return len(self.values)
+
+
+class QueryCache:
+    '''
+    LRU cache of query results keyed by day collection, method and arguments.
+    Results for finished days do not expire and can also be kept in an SQLite
+    file that survives restarts. Results for the current day expire after
+    today_ttl seconds. Callers get copies, so changing a result does not
+    change the cache.
+
+    Writes to a finished day call invalidate(), which also increments that
+    day's counter in the epochs collection. Every process that writes or
+    caches shares those counters. A cached result is only served while the
+    counter matches the one read before the query ran, so an import in
+    another process invalidates this cache too. Counters are read at most
+    every epoch_ttl seconds per day.
+    '''
+
+    def __init__(self, max_entries=10000, today_ttl=30.0, disk_path=None, epochs=None, epoch_ttl=1.0,
+                 report=print):
+        self.max_entries = max_entries
+        self.today_ttl = today_ttl
+        self.epochs = epochs
+        self.epoch_ttl = epoch_ttl
+        self.report = report
+        self._epochs = {}
+        self.entries = OrderedDict()
+        self.days = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+        self.disk = None
+        if disk_path:
+            self.disk = sqlite3.connect(disk_path, check_same_thread=False)
+            self.disk.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, day TEXT, value BLOB, epoch INTEGER)")
+            try:
+                # cache files written before epochs existed
+                self.disk.execute("ALTER TABLE results ADD COLUMN epoch INTEGER")
+            except sqlite3.OperationalError:
+                pass
+            self.disk.execute("CREATE INDEX IF NOT EXISTS results_day ON results (day)")
+            self.disk.commit()
+
+    @staticmethod
+    def is_finished(date_str):
+        return date_str < date.today().strftime('%Y-%m-%d')
+
+    def epoch(self, day):
+        # change counter of a finished day, None when there is none to check
+        if self.epochs is None or not self.is_finished(day[1]):
+            return None
+        now = time.monotonic()
+        with self.lock:
+            known = self._epochs.get(day)
+        if known is not None and now - known[1] < self.epoch_ttl:
+            return known[0]
+        try:
+            doc = self.epochs.find_one({"_id": "|".join(day)})
+        except Exception as e:
+            self.report(f"Could not read the cache epoch of {day}: {e}")
+            return known[0] if known else None
+        epoch = doc["epoch"] if doc else 0
+        with self.lock:
+            self._epochs[day] = (epoch, now)
+        return epoch
+
+    def get(self, day, key, epoch=None):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                value, expires, _, stored_epoch = entry
+                fresh = expires is None or expires > time.monotonic()
+                if fresh and (epoch is None or stored_epoch == epoch):
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return True, copy.deepcopy(value)
+                self._drop(key)
+
+            if self.disk is not None and self.is_finished(day[1]):
+                row = self.disk.execute("SELECT value, epoch FROM results WHERE key = ?", (key,)).fetchone()
+                if row is not None and (epoch is None or row[1] == epoch):
+                    value = pickle.loads(row[0])
+                    self._store(day, key, value, None, row[1])
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return True, copy.deepcopy(value)
+
+            self.misses += 1
+            return False, None
+
+    def put(self, day, key, value, epoch=None):
+        # epoch is the one read before the query ran; a write that lands while
+        # it runs changes the counter, and this result is never served
+        finished = self.is_finished(day[1])
+        value = copy.deepcopy(value)
+        with self.lock:
+            self._store(day, key, value, None if finished else time.monotonic() + self.today_ttl, epoch)
+            if self.disk is not None and finished:
+                self.disk.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                                  (key, "|".join(day), pickle.dumps(value), epoch))
+                self.disk.commit()
+
+    def _store(self, day, key, value, expires, epoch=None):
+        self.entries[key] = (value, expires, day, epoch)
+        self.entries.move_to_end(key)
+        self.days.setdefault(day, set()).add(key)
+        while len(self.entries) > self.max_entries:
+            old_key, (_, _, old_day, _) = self.entries.popitem(last=False)
+            self._forget(old_day, old_key)
+            self.evictions += 1
+
+    def _drop(self, key):
+        _, _, day, _ = self.entries.pop(key)
+        self._forget(day, key)
+
+    def _forget(self, day, key):
+        keys = self.days.get(day)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self.days[day]
+
+    def invalidate(self, sensor_type, date_str):
+        # call after the write is stored, a query in between would cache the old result
+        day = (sensor_type, date_str)
+        with self.lock:
+            for key in self.days.pop(day, ()):
+                self.entries.pop(key, None)
+            self._epochs.pop(day, None)
+            if self.disk is not None:
+                self.disk.execute("DELETE FROM results WHERE day = ?", ("|".join(day),))
+                self.disk.commit()
+        if self.epochs is None:
+            return
+        try:
+            doc = self.epochs.find_one_and_update({"_id": "|".join(day)}, {"$inc": {"epoch": 1}},
+                                                  upsert=True, return_document=ReturnDocument.AFTER)
+        except Exception as e:
+            self.report(f"Could not advance the cache epoch of {day}, other processes may serve stale results: {e}")
+            return
+        with self.lock:
+            self._epochs[day] = (doc["epoch"], time.monotonic())
+
+    def stats(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else None
+            }
+
+    def close(self):
+        if self.disk is not None:
+            self.disk.close()
+
+
+def cached_query(method):
+    '''
+    Serve a SensorDataExtractor query method from self.query_cache. The day is
+    taken from a collection_name argument or from sensor_type and date_str.
+    '''
+    signature = inspect.signature(method)
+    instance_name = next(iter(signature.parameters))
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        cache = self.query_cache
+        if cache is None:
+            return method(self, *args, **kwargs)
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        arguments = dict(bound.arguments)
+        arguments.pop(instance_name)
+        if "collection_name" in arguments:
+            day = split_collection_name(arguments["collection_name"])
+        else:
+            day = (arguments["sensor_type"], arguments["date_str"])
+        key = f"{method.__name__}|{sorted(arguments.items())!r}"
+
+        epoch = cache.epoch(day)
+        found, value = cache.get(day, key, epoch)
+        if found:
+            return value
+        value = method(self, *args, **kwargs)
+        cache.put(day, key, value, epoch)
+        return value
+
+    return wrapper
@@ -0,0 +1,201 @@
+'''
+Author: Munir Mohamed Hafeel
+Date: 10-18-2026
+
+Bulk columnar access to readings: projected raw BSON batches decoded straight
+into NumPy arrays, vectorized statistics over them, and Arrow/Parquet export.
+NumPy is needed for the arrays, pyarrow only for to_arrow/export_parquet.
+'''
+
+from array import array
+from bson import decode_all
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("numpy is required for columnar queries: pip install numpy")
+
+
+def raw_batches(collection, stages, conditions, projection, batch_size=10000):
+    if not stages:
+        return collection.find_raw_batches(conditions, projection, sort=[("timestamp", 1)], batch_size=batch_size)
+    pipeline = stages + [{"$match": conditions}, {"$sort": {"timestamp": 1}}, {"$project": projection}]
+    return collection.aggregate_raw_batches(pipeline, batchSize=batch_size)
+
+
+def fetch_columns(collection, stages, data_keys, conditions=None, batch_size=10000):
+    # {"timestamp": datetime64[ms], key: float64, ...}; missing values become NaN
+    _require_numpy()
+    projection = {"_id": 0, "timestamp": 1, **{f"data.{k}": 1 for k in data_keys}}
+    parts = [decode_batch(batch, data_keys)
+             for batch in raw_batches(collection, stages, conditions or {}, projection, batch_size)]
+    return concat_columns(parts, data_keys)
+
+
+def decode_batch(batch, data_keys):
+    columns = decode_fixed(batch, data_keys)
+    return columns if columns is not None else decode_documents(batch, data_keys)
+
+
+def _layout(doc, data_keys):
+    # byte offsets of the timestamp and of each data key's double in one
+    # projected reading, None unless it is exactly {timestamp: date, data: {key: double}}
+    offsets = {}
+    pos = 4
+    while doc[pos]:
+        kind = doc[pos]
+        name_end = doc.index(0, pos + 1)
+        name = doc[pos + 1:name_end]
+        value = name_end + 1
+        if kind == 0x09 and name == b"timestamp":
+            offsets["timestamp"] = value
+            pos = value + 8
+        elif kind == 0x03 and name == b"data":
+            end = value + int.from_bytes(doc[value:value + 4], "little") - 1
+            inner = value + 4
+            while inner < end:
+                if doc[inner] != 0x01:
+                    return None
+                name_end = doc.index(0, inner + 1)
+                key = doc[inner + 1:name_end].decode()
+                if key in data_keys:
+                    offsets[key] = name_end + 1
+                inner = name_end + 9
+            pos = end + 1
+        else:
+            return None
+    return offsets if "timestamp" in offsets else None
+
+
+def decode_fixed(batch, data_keys):
+    # Projected readings of one sensor usually share one layout: the same
+    # fields in the same order with the same types, hence the same size.
+    # The batch is then an (n, size) byte matrix whose value columns are
+    # sliced out in one step. None when any document differs from the first.
+    if len(batch) < 5:
+        return None
+    size = int.from_bytes(batch[:4], "little")
+    if len(batch) % size:
+        return None
+    offsets = _layout(batch[:size], data_keys)
+    if offsets is None:
+        return None
+    rows = np.frombuffer(batch, dtype=np.uint8).reshape(-1, size)
+    structure = np.ones(size, dtype=bool)
+    for offset in offsets.values():
+        structure[offset:offset + 8] = False
+    if not (rows[:, structure] == rows[0, structure]).all():
+        return None
+
+    def column(offset, dtype):
+        # BSON is little-endian: int64 milliseconds for dates, float64 for doubles
+        return np.ascontiguousarray(rows[:, offset:offset + 8]).view(dtype).ravel()
+
+    columns = {"timestamp": column(offsets["timestamp"], "<i8").astype("datetime64[ms]")}
+    for k in data_keys:
+        if k in offsets:
+            columns[k] = column(offsets[k], "<f8").astype(np.float64, copy=False)
+        else:
+            columns[k] = np.full(rows.shape[0], np.nan)
+    return columns
+
+
+def decode_documents(batch, data_keys):
+    # any layout: every document decoded to a dict
+    timestamps = []
+    values = {k: array('d') for k in data_keys}
+    nan = float('nan')
+    for doc in decode_all(batch):
+        timestamps.append(doc['timestamp'])
+        data = doc.get('data', {})
+        for k in data_keys:
+            value = data.get(k)
+            values[k].append(nan if value is None else float(value))
+    columns = {"timestamp": np.array(timestamps, dtype='datetime64[ms]')}
+    for k in data_keys:
+        columns[k] = np.frombuffer(values[k], dtype=np.float64)
+    return columns
+
+
+def concat_columns(parts, data_keys):
+    _require_numpy()
+    keys = ["timestamp"] + list(data_keys)
+    if not parts:
+        return {"timestamp": np.array([], dtype='datetime64[ms]'), **{k: np.array([], dtype=np.float64) for k in data_keys}}
+    return {k: np.concatenate([part[k] for part in parts]) for k in keys}
+
+
+def mean(values):
+    values = values[~np.isnan(values)]
+    return float(values.mean()) if values.size else None
+
+
+def stdev(values):
+    values = values[~np.isnan(values)]
+    return float(values.std(ddof=1)) if values.size > 1 else None
+
+
+def percentiles(values, percentiles=[25, 50, 75, 90]):
+    # same rule as SensorDataExtractor.get_percentiles: sorted[int(n * p / 100)]
+    values = values[~np.isnan(values)]
+    n = values.size
+    if not n:
+        return {}
+    indexes = [min(int(n * (p / 100)), n - 1) for p in percentiles]
+    selected = np.partition(values, sorted(set(indexes)))
+    return {p: float(selected[i]) for p, i in zip(percentiles, indexes)}
+
+
+def mode(values):
+    values = values[~np.isnan(values)]
+    if not values.size:
+        return None
+    unique, counts = np.unique(values, return_counts=True)
+    return float(unique[counts.argmax()])
+
+
+def rate(timestamps):
+    if timestamps.size < 2:
+        return None
+    seconds = (timestamps[-1] - timestamps[0]) / np.timedelta64(1, 's')
+    return timestamps.size / seconds if seconds > 0 else None
+
+
+def summarize(columns, data_keys, percentile_list=[25, 50, 75, 90]):
+    summary = {}
+    for k in data_keys:
+        values = columns[k]
+        summary[k] = {
+            "average": mean(values),
+            "highest": float(np.nanmax(values)) if values.size and not np.isnan(values).all() else None,
+            "lowest": float(np.nanmin(values)) if values.size and not np.isnan(values).all() else None,
+            "standard_deviation": stdev(values),
+            "percentiles": percentiles(values, percentile_list),
+            "mode": mode(values),
+            "count": int((~np.isnan(values)).sum()),
+            "data_rate": rate(columns["timestamp"])
+        }
+    return summary
+
+
+def to_arrow(columns):
+    if pa is None:
+        raise ImportError("pyarrow is required for Arrow/Parquet export: pip install pyarrow")
+    return pa.table({k: pa.array(v) for k, v in columns.items()})
+
+
+def export_parquet(columns, path, compression="zstd"):
+    table = to_arrow(columns)
+    pq.write_table(table, path, compression=compression)
+    return table.num_rows
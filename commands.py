@@ -0,0 +1,206 @@
+'''
+Author: Munir Mohamed Hafeel
+Date: 10-18-2026
+'''
+
+import os
+import time
+import itertools
+import threading
+from collections import OrderedDict, deque
+
+
+def split_command(command):
+    # "pump1_on" -> ("pump1", "on"); the older "sample7on" form has no separator
+    device, _, state = command.rpartition("_")
+    if device:
+        return device, state
+    for state in ("off", "on"):
+        if command.endswith(state):
+            return command[:-len(state)], state
+    return command, None
+
+
+def format_commands(command_id, commands):
+    # "<id>:pump1_on,fan2_off", parsed by fancontrol.ino
+    return f"{command_id}:{','.join(commands)}"
+
+
+def parse_ack(payload):
+    # "<id>:pump1_on=1,fan2_off=0" -> (id, {command: recognized})
+    command_id, _, results = payload.partition(":")
+    acked = {}
+    for result in filter(None, results.split(",")):
+        command, _, ok = result.partition("=")
+        acked[command] = ok != "0"
+    return command_id, acked
+
+
+class LatencyStats:
+    # command-to-acknowledgement times of one device, the last `window` of them
+    def __init__(self, window=200):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.timeouts = 0
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+
+    def summary(self):
+        samples = sorted(self.samples)
+        n = len(samples)
+        return {
+            "count": self.count,
+            "timeouts": self.timeouts,
+            "last": self.samples[-1] if n else None,
+            "mean": sum(samples) / n if n else None,
+            "p50": samples[int(n * 0.5)] if n else None,
+            "p95": samples[min(int(n * 0.95), n - 1)] if n else None,
+            "max": samples[-1] if n else None
+        }
+
+
+class CommandDispatcher:
+    '''
+    Sends device commands to the relay controller over MQTT. All the state
+    changes of one send() go out as a single QoS 1 publish tagged with an id,
+    the firmware answers on ack_topic, and batches that are not acknowledged
+    within `timeout` seconds are published again up to `retries` times. A
+    newer command for a device replaces any unacknowledged older one so a
+    retry never switches it back. Time from first publish to acknowledgement
+    is recorded per device.
+    '''
+
+    def __init__(self, client, topic="fantopic", ack_topic="fantopic/ack", timeout=2.0, retries=3, qos=1,
+                 report=print):
+        self.client = client
+        self.topic = topic
+        self.ack_topic = ack_topic
+        self.timeout = timeout
+        self.retries = retries
+        self.qos = qos
+        self.report = report
+        self.pending = {}
+        # finished batches, so wait() still finds one acknowledged before it was called
+        self.recent = OrderedDict()
+        self.latency = {}
+        self.failed = 0
+        self.lock = threading.Lock()
+        # ids only need to be unique among in-flight batches, the prefix keeps
+        # a restarted app from matching acks meant for the previous process
+        self._prefix = os.urandom(2).hex()
+        self._ids = itertools.count(1)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="command-retry", daemon=True)
+        self._thread.start()
+        return self
+
+    def send(self, commands):
+        # commands: ["pump1_on", "fan2_off"] or {"pump1": "on", "fan2": "off"}
+        if isinstance(commands, dict):
+            commands = [f"{device}_{state}" for device, state in commands.items()]
+        latest = {}
+        for command in commands:
+            latest[split_command(command)[0]] = command
+        if not latest:
+            return None
+
+        now = time.monotonic()
+        with self.lock:
+            command_id = f"{self._prefix}{next(self._ids):x}"
+            for other_id, other in list(self.pending.items()):
+                other["commands"] = {d: c for d, c in other["commands"].items() if d not in latest}
+                if not other["commands"]:
+                    self._finish(other_id, acked=False, superseded=True)
+            batch = {
+                "id": command_id,
+                "commands": latest,
+                "sent": now,
+                "last_attempt": now,
+                "attempts": 1,
+                "done": threading.Event(),
+                "result": None
+            }
+            self.pending[command_id] = batch
+        self._publish(batch)
+        return command_id
+
+    def wait(self, command_id, timeout=None):
+        # blocks until the batch is acknowledged or given up; returns its result
+        with self.lock:
+            batch = self.pending.get(command_id) or self.recent.get(command_id)
+        if batch is None:
+            return None
+        if timeout is None:
+            timeout = self.timeout * (self.retries + 2)
+        batch["done"].wait(timeout)
+        return batch["result"]
+
+    def _publish(self, batch):
+        self.client.publish(self.topic, format_commands(batch["id"], batch["commands"].values()), qos=self.qos)
+
+    def handle_ack(self, payload):
+        command_id, acked = parse_ack(payload)
+        now = time.monotonic()
+        with self.lock:
+            batch = self.pending.get(command_id)
+            if batch is None:
+                # duplicate delivery or an ack for a superseded batch
+                return False
+            elapsed = now - batch["sent"]
+            for device, command in batch["commands"].items():
+                if acked.get(command, True):
+                    self.latency.setdefault(device, LatencyStats()).add(elapsed)
+            unknown = [command for command, ok in acked.items() if not ok]
+            self._finish(command_id, acked=True, latency=elapsed, unknown=unknown)
+        if unknown:
+            self.report(f"Controller did not recognize commands: {', '.join(unknown)}")
+        return True
+
+    def _finish(self, command_id, **result):
+        batch = self.pending.pop(command_id)
+        batch["result"] = {"id": command_id, "commands": list(batch["commands"].values()),
+                           "attempts": batch["attempts"], **result}
+        batch["done"].set()
+        self.recent[command_id] = batch
+        if len(self.recent) > 1000:
+            self.recent.popitem(last=False)
+
+    def _run(self):
+        while not self._stop.wait(self.timeout / 4):
+            now = time.monotonic()
+            retry = []
+            with self.lock:
+                for command_id, batch in list(self.pending.items()):
+                    if now - batch["last_attempt"] < self.timeout:
+                        continue
+                    if batch["attempts"] > self.retries:
+                        for device in batch["commands"]:
+                            self.latency.setdefault(device, LatencyStats()).timeouts += 1
+                        self.failed += 1
+                        self._finish(command_id, acked=False)
+                        self.report(f"No acknowledgement for {', '.join(batch['commands'].values())} "
+                                    f"after {batch['attempts']} attempts")
+                        continue
+                    batch["attempts"] += 1
+                    batch["last_attempt"] = now
+                    retry.append(batch)
+            for batch in retry:
+                self._publish(batch)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "pending": len(self.pending),
+                "failed": self.failed,
+                "devices": {device: stats.summary() for device, stats in self.latency.items()}
+            }
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
@@ -3,14 +3,41 @@ Author: Munir Mohamed Hafeel
 Date: 03-30-2023
 '''
 
-import re
 import os
-import keys #passwords
+import sys
+import json
+import time
+try:
+    import keys #passwords
+except ImportError:
+    # only needed for the real database; benchmarks and tests run without it
+    keys = None
 import paho.mqtt.client as mqtt
 import logging  
 from datetime import datetime
+from collections import Counter
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
 from pymongo import MongoClient
 from statistics import mean, median, mode, variance, stdev
+from sensor_parser import SENSOR_CONFIG
+from sensor_registry import SensorRegistry
+from bulk_import import ImportProgress, read_chunks, parse_chunks
+from write_buffer import WriteBehindBuffer
+from spool import Spool
+from tail_ingest import Checkpoint, read_new_lines
+from quantile_sketch import KLLSketch, SketchStore
+from rollups import RollupStore, summarize
+from cache import LastValueCache, QueryCache, cached_query
+from storage import STORAGE_BACKENDS, RoutedStorage, split_collection_name
+from range_query import dates_between, fan_out_merge, to_datetime
+from anomaly import AnomalyDetector, compact_alert
+from metrics import Metrics, PARSE_BUCKETS, SIZE_BUCKETS, timed_method
+from rules import score
+import columnar
+
+# write-behind and spool key of anomaly alerts, which are not sensor readings
+ALERTS = "_alerts"
 
 # logs
 log_dir = 'cwd/logs'
@@ -22,90 +49,69 @@ def log(message, level=logging.INFO):
     logging.log(level, message)
 
 class SensorDataExtractor:
-    def __init__(self, db_uri):
+    def __init__(self, db_uri, idempotent=False, storage="daily", cache_path=None, database="ModelFarm2",
+                 metrics=False, sensor_config=SENSOR_CONFIG):
         self.client = MongoClient(db_uri)
-        self.db = self.client.ModelFarm2
-        self.sensor_patterns = { 
-            "temperature-humidity": {
-                "pattern": r'Temperature: (\d+\.\d+), Humidity: (\d+\.\d+)',
-                "metadata": {
-                    "sensor": "DHT22",
-                    "device": "Arduino-MKR-1010-A"
-                },
-                "data_keys": ["temperature", "humidity"],
-                "records": []
-            },
-            "co2": {
-                "pattern": r'CO2: (\d+)',
-                "metadata": {
-                    "sensor": "SCD40",
-                    "device": "Arduino-MKR-1010-A"
-                },
-                "data_keys": ["co2"],
-                "records": []
-            },
-            "light": {
-                "pattern": r'Red: (\d+), Green: (\d+), Blue: (\d+), Clear: (\d+)',
-                "metadata": {
-                    "sensor": "SCD40",
-                    "device": "Arduino-MKR-1010-A"
-                },
-                "data_keys": ["Red", "Green", "Blue", "Clear"],
-                "records": []
-            },
-            "pH": {
-                "pattern": r'pH: (\d+)',
-                "metadata": {
-                    "sensor": "Atlas-Scientific-Gravity-pH",
-                    "device": "Arduino-MKR-1010-B"
-                },
-                "data_keys": ["pH"],
-                "records": []
-            },
-            "conductivity": {
-                "pattern": r'EC: (\d+)',
-                "metadata": {
-                    "sensor": "Atlas-Scientific-Conductivity",
-                    "device": "Arduino-MKR-1010-B"
-                },
-                "data_keys": ["EC"],
-                "records": []
-            },
-            "o2": {
-                "pattern": r'O2: (\d+)',
-                "metadata": {
-                    "sensor": "Atlas-Scientific-Gravity-O2",
-                    "device": "Arduino-MKR-1010-B"
-                },
-                "data_keys": ["o2"],
-                "records": []
-            }
-        }
-
-    def intercept_mqtt_data(self, mqtt_broker, mqtt_port, mqtt_topic):
+        self.db = self.client[database]
+        # sensor definitions from sensors.json, see SensorRegistry.reload/watch
+        self.registry = SensorRegistry(sensor_config, STORAGE_BACKENDS,
+                                       report=lambda message: log(message, level=logging.WARNING))
+        # storage is the default backend, a sensor's "storage" setting overrides it;
+        # with idempotent writes a unique (sensor, timestamp) index makes replays no-ops
+        self.storage = RoutedStorage(self.db, idempotent, report=lambda message: log(message, level=logging.WARNING),
+                                     default=storage, route=self.registry.storage)
+        self.write_buffer = None
+        # readings the database could not take, replayed once it is back
+        self.spool = None
+        # summaries a flush cannot write stay pending and are retried
+        self.sketches = SketchStore(self.db.sketches, report=lambda message: log(message, level=logging.WARNING))
+        self.rollups = RollupStore(self.db, report=lambda message: log(message, level=logging.WARNING))
+        self.latest_values = LastValueCache()
+        # results of the per-day statistics methods; cache_path adds an on-disk tier
+        self.query_cache = QueryCache(disk_path=cache_path, epochs=self.db.cache_epochs,
+                                      report=lambda message: log(message, level=logging.WARNING))
+        # live readings only; alerts are stored and passed to any other listeners.
+        # None turns detection off, e.g. in ingest workers that leave it to the app
+        self.anomalies = AnomalyDetector()
+        self.anomalies.listeners.append(self._store_alert)
+        # callables (sensor_type, records) run for every live reading, e.g. the dashboard stream
+        self.listeners = []
+        # range queries fan out one day per thread over the client's connection pool
+        self.query_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="range-query")
+        # ingest and query instrumentation, rendered by the app's /metrics endpoint
+        self.metrics = Metrics(enabled=metrics)
+        self.metrics.collect("write_buffer_queue_depth", "gauge", "Records waiting in the write-behind buffer",
+                             lambda: self.write_buffer.depth() if self.write_buffer else None)
+        self.metrics.collect("write_buffer_errors_total", "counter", "Write-behind flushes that failed",
+                             lambda: self.write_buffer.errors if self.write_buffer else None)
+        self.metrics.collect("write_buffer_dropped_total", "counter", "Readings dropped because the write queue was full",
+                             lambda: self.write_buffer.dropped if self.write_buffer else None)
+        self.metrics.collect("query_cache_requests_total", "counter", "Query result cache lookups",
+                             self._query_cache_requests)
+        self.metrics.collect("latest_values_cached", "gauge", "Sensor keys in the last-value cache",
+                             lambda: len(self.latest_values))
+        self.metrics.collect("spool_pending_bytes", "gauge", "Spooled readings not yet written to the database",
+                             lambda: self.spool.pending_bytes() if self.spool else None)
+
+    @property
+    def sensor_patterns(self):
+        return self.registry.sensors
+
+    @property
+    def parser(self):
+        return self.registry.parser
+
+    def intercept_mqtt_data(self, mqtt_broker, mqtt_port, mqtt_topic, alert_topic="alerts"):
         def on_connect(client, userdata, flags, rc):
             print(f"Connected with result code {str(rc)}")
             client.subscribe(mqtt_topic)
 
         def on_message(client, userdata, msg):
+            self.metrics.inc("mqtt_messages_total", topic=msg.topic)
             try:
                 line = msg.payload.decode()
-                timestamp_pattern = r'(\d{4}-\d{2}-\d{2}, \d{2}:\d{2}:\d{2})'
-                timestamp_match = re.search(timestamp_pattern, line)
-
-                if timestamp_match:
-                    timestamp = timestamp_match.group(1)
-                    dt = datetime.strptime(timestamp, '%Y-%m-%d, %H:%M:%S')
-
-                    for sensor, sensor_info in self.sensor_patterns.items():
-                        match = re.search(sensor_info['pattern'], line)
-                        if match:
-                            record = {
-                                "metadata": sensor_info['metadata'],
-                                "timestamp": dt,
-                                "data": {k: float(v) for k, v in zip(sensor_info['data_keys'], match.groups())}
-                            }
-                            self.insert_data([record], sensor, 1)
+                for sensor, record in self.registry.parse(line, msg.topic):
+                    self.insert_single_record(record, sensor)
 
             except Exception as e:
                 print(f"Error processing MQTT message: {e}")
@@ -113,6 +119,7 @@ class SensorDataExtractor:
         client = mqtt.Client()
         client.on_connect = on_connect
         client.on_message = on_message
+        self.anomalies.listeners.append(lambda alert: client.publish(alert_topic, json.dumps(alert, default=str)))
 
         try:
             client.connect(mqtt_broker, mqtt_port, 60)
@@ -120,107 +127,323 @@ class SensorDataExtractor:
         except Exception as e:
             print(f"Error connecting to MQTT broker: {e}")
         
-    def insert_decoded_message(self, decoded_message):
+    def insert_decoded_message(self, decoded_message, topic=None):
         print("decoded: ", decoded_message)
+        self.metrics.inc("mqtt_messages_total", topic=topic or "unknown")
         try:
-            timestamp_pattern = r'(\d{4}-\d{2}-\d{2}, \d{2}:\d{2}:\d{2})'
-            timestamp_match = re.search(timestamp_pattern, decoded_message)
-
-            if timestamp_match:
-                timestamp = timestamp_match.group(1)
-                dt = datetime.strptime(timestamp, '%Y-%m-%d, %H:%M:%S')
-
-                for sensor, sensor_info in self.sensor_patterns.items():
-                    match = re.search(sensor_info['pattern'], decoded_message)
-                    if match:
-                        record = {
-                            "metadata": sensor_info['metadata'],
-                            "timestamp": dt,
-                            "data": {k: float(v) for k, v in zip(sensor_info['data_keys'], match.groups())}
-                        }
-                        self.insert_single_record(record, sensor)
+            start = self.metrics.clock()
+            parsed = self.registry.parse(decoded_message, topic)
+            self.metrics.observe_since("sensor_parse_seconds", start, PARSE_BUCKETS)
+            for sensor, record in parsed:
+                self.insert_single_record(record, sensor)
 
         except Exception as e:
+            self.metrics.inc("errors_total", stage="insert_decoded_message")
             print(f"Error inserting decoded message: {e}")
 
     def insert_single_record(self, record, sensor_type):
-        dt = record['timestamp']
-        date_str = dt.strftime('%Y-%m-%d')
-        collection_name = f"{sensor_type}-{date_str}"
-        collection = self.db[collection_name]
-        collection.insert_one(record)
+        self._enqueue(sensor_type, record)
+        self._received(sensor_type, [record])
+
+    def _enqueue(self, key, record):
+        # key is a sensor type, or ALERTS for an anomaly alert
+        if self.write_buffer:
+            # never blocks; a full queue spills to the spool (see _spill)
+            self.write_buffer.put(key, record)
+        elif self.spool and self.spool.pending():
+            self.spool.put(key, [record])
+        else:
+            try:
+                if key == ALERTS:
+                    self.db.anomalies.insert_one(record)
+                    return
+                inserted = self.storage.insert_one(key, record)
+            except Exception as e:
+                self._spool_failed(key, [record], e)
+                return
+            if inserted:
+                self._stored(key, [record])
+
+    def start_write_behind(self, max_batch=500, max_delay=1.0):
+        # live inserts are queued and written with insert_many from a worker thread
+        self.write_buffer = WriteBehindBuffer(self._write_batch, max_batch, max_delay, overflow=self._spill,
+                                              report=lambda message: log(message, level=logging.ERROR))
+        return self.write_buffer.start()
+
+    def _spill(self, sensor_type, records):
+        # the write-behind queue is full, the database is not keeping up;
+        # without a spool the buffer drops the readings and counts them
+        if self.spool is None:
+            return False
+        self.spool.put(sensor_type, records)
+        return True
+
+    def start_spool(self, directory=os.path.join('cwd', 'spool'), batch_size=5000, retry_interval=5.0):
+        # failed writes go to a local segment log and are replayed in order
+        self.spool = Spool(self._replay_batch, directory, batch_size, retry_interval,
+                           report=lambda message: log(message, level=logging.WARNING))
+        return self.spool.start()
+
+    def _replay_batch(self, sensor_type, records):
+        # spooled readings carry their _id, so a batch replayed twice only
+        # hits duplicates, which are skipped and not summarized again
+        if sensor_type == ALERTS:
+            self.db.anomalies.insert_many(records, ordered=False)
+            return
+        try:
+            inserted = self.storage.write(sensor_type, records, ordered=False, skip_duplicates=True)
+        except Exception:
+            # results cached during the outage do not include these readings;
+            # after a partial write some of the batch may be stored
+            self._invalidate(sensor_type, records)
+            raise
+        self._stored(sensor_type, inserted)
+
+    def _spool_failed(self, sensor_type, records, error):
+        if self.spool is None:
+            raise error
+        self.metrics.inc("errors_total", stage="write")
+        log(f"Spooling {len(records)} {sensor_type} readings, write failed: {error}", level=logging.WARNING)
+        self.spool.put(sensor_type, records)
+
+    @timed_method
+    def _write_batch(self, sensor_type, records):
+        self.metrics.observe("write_batch_size", len(records), SIZE_BUCKETS, sensor=sensor_type)
+        if self.spool and self.spool.pending():
+            # stay behind the readings still waiting in the spool
+            self.spool.put(sensor_type, records)
+            return
+        try:
+            if sensor_type == ALERTS:
+                self.db.anomalies.insert_many(records, ordered=False)
+                return
+            inserted = self.storage.write(sensor_type, records, ordered=False)
+        except Exception as e:
+            self._spool_failed(sensor_type, records, e)
+            return
+        self._stored(sensor_type, inserted)
+
+    def _aggregate(self, collection_name, pipeline, **kwargs):
+        # collection_name is the logical "<sensor>-YYYY-MM-DD" day; the storage
+        # backend supplies the stages that select that day's readings
+        collection, stages = self.storage.source(*split_collection_name(collection_name))
+        return collection.aggregate(stages + pipeline, **kwargs)
+
+    def _find(self, collection_name, conditions=None, projection=None, sort=None, limit=0, batch_size=0):
+        collection, stages = self.storage.source(*split_collection_name(collection_name))
+        if not stages:
+            cursor = collection.find(conditions or {}, projection, batch_size=batch_size)
+            if sort:
+                cursor = cursor.sort(sort)
+            return cursor.limit(limit)
+        pipeline = stages + [{"$match": conditions or {}}]
+        if sort:
+            pipeline.append({"$sort": dict(sort)})
+        if limit:
+            pipeline.append({"$limit": limit})
+        if projection:
+            pipeline.append({"$project": projection})
+        return collection.aggregate(pipeline, **({"batchSize": batch_size} if batch_size else {}))
 
     def extract_data(self, file_path):
+        start = self.metrics.clock()
+        lines = 0
+        parser = self.parser
+        records = {sensor: [] for sensor in self.sensor_patterns}
         with open(file_path, 'r') as file:
-            for line in file:
-                timestamp_pattern = r'(\d{4}-\d{2}-\d{2}, \d{2}:\d{2}:\d{2})'
-                timestamp_match = re.search(timestamp_pattern, line)
-                if timestamp_match:
-                    timestamp = timestamp_match.group(1)
-                    dt = datetime.strptime(timestamp,'%Y-%m-%d, %H:%M:%S')
-                    for sensor, sensor_info in self.sensor_patterns.items():
-                        match = re.search(sensor_info['pattern'],line)
-                        if match:
-                            record = {
-                                "metadata": sensor_info['metadata'],
-                                "timestamp": dt,
-                                "data": {k: float(v) for k,v in zip(sensor_info['data_keys'], match.groups())}
-                            }
-                            sensor_info['records'].append(record)
+            for lines, line in enumerate(file, 1):
+                for sensor, record in parser.parse(line):
+                    records[sensor].append(record)
+        if start is not None:
+            self._count_parsed(lines, time.perf_counter() - start)
         batch_size = 1000
-        for sensor, sensor_info in self.sensor_patterns.items():
-            self.insert_data(sensor_info['records'], sensor, batch_size)
-
+        for sensor, sensor_records in records.items():
+            self.insert_data(sensor_records, sensor, batch_size)
+
+    def _count_parsed(self, lines, seconds):
+        # serial log lines parsed by the file importers; pool workers' times add up
+        self.metrics.inc("sensor_file_lines_total", lines)
+        self.metrics.inc("sensor_file_parse_seconds_total", seconds)
+
+    def stream_extract(self, file_path, batch_size=1000, workers=None, chunk_bytes=4 * 1024 * 1024):
+        # bounded-memory alternative to extract_data: chunks are parsed in a
+        # process pool and written as soon as a full batch is available
+        progress = ImportProgress(os.path.getsize(file_path), log)
+        pending = {sensor: [] for sensor in self.sensor_patterns}
+        chunks = read_chunks(file_path, chunk_bytes)
+
+        on_parsed = self._count_parsed if self.metrics.enabled else None
+        for grouped, offset in parse_chunks(chunks, self.sensor_patterns, workers, on_parsed=on_parsed):
+            count = 0
+            for sensor, records in grouped.items():
+                count += len(records)
+                pending[sensor].extend(records)
+                if len(pending[sensor]) >= batch_size:
+                    self.insert_data(pending[sensor], sensor, batch_size)
+                    pending[sensor] = []
+            progress.update(offset, count)
+
+        for sensor, records in pending.items():
+            if records:
+                self.insert_data(records, sensor, batch_size)
+        log(f"Import finished: {progress.summary()}")
+        return progress.records
+
+    @timed_method
     def insert_data(self, data, sensor_type, batch_size):
-        date_groups = {}
-        for record in data:
-            dt = record['timestamp']
-            date_str = dt.strftime('%Y-%m-%d')
-            collection_name = f"{sensor_type}-{date_str}"
-            if collection_name not in date_groups:
-                date_groups[collection_name] = []
-
-            date_groups[collection_name].append(record)
-
-        for collection_name, records in date_groups.items():
-            collection = self.db[collection_name]
-            for i in range(0, len(records), batch_size):
-                batch = records[i:i + batch_size]
-                collection.insert_many(batch)
+        # the storage backend groups each batch by its target collection; with a
+        # spool, the batch that fails and every one after it are spooled in order.
+        # Returns the number of readings stored, not counting duplicates skipped
+        # or readings spooled for later
+        self.metrics.inc("sensor_readings_total", len(data), sensor=sensor_type, source="import")
+        self.latest_values.update(sensor_type, data)
+        spooling = self.spool is not None and self.spool.pending()
+        stored = 0
+        for i in range(0, len(data), batch_size):
+            batch = data[i:i + batch_size]
+            self.metrics.observe("write_batch_size", len(batch), SIZE_BUCKETS, sensor=sensor_type)
+            if spooling:
+                self.spool.put(sensor_type, batch)
+                continue
+            try:
+                inserted = self.storage.write(sensor_type, batch)
+            except Exception as e:
+                self._spool_failed(sensor_type, batch, e)
+                spooling = True
+                continue
+            self._stored(sensor_type, inserted)
+            stored += len(inserted)
+        return stored
+
+    def receive_readings(self, sensor_type, records):
+        # live readings another process stored (ingest_service workers publish
+        # them): the last values, anomaly detection and listeners see them as
+        # if they had been ingested here, nothing is written again
+        self._received(sensor_type, records)
+
+    def _received(self, sensor_type, records):
+        # live readings as they arrive, before (and whether or not) they are stored
+        self.metrics.inc("sensor_readings_total", len(records), sensor=sensor_type, source="live")
+        self.latest_values.update(sensor_type, records)
+        if self.anomalies is not None:
+            self.anomalies.observe(sensor_type, records)
+        for listener in self.listeners:
+            listener(sensor_type, records)
+
+    def _stored(self, sensor_type, records):
+        # summaries kept next to the raw data, from the readings the database
+        # accepted: duplicates skipped by a unique index are not counted twice
+        if not records:
+            return
+        self.sketches.update(sensor_type, records)
+        self.rollups.update(sensor_type, records)
+        self._invalidate(sensor_type, records)
+
+    def _invalidate(self, sensor_type, records):
+        # after records are stored: the current day's cached results expire on
+        # their own; anything else means an older day was changed (e.g. a log
+        # import) and is recomputed, here and in every process sharing the epochs
+        if self.query_cache is None:
+            return
+        for date_str in {record['timestamp'].strftime('%Y-%m-%d') for record in records}:
+            if QueryCache.is_finished(date_str):
+                self.query_cache.invalidate(sensor_type, date_str)
+
+    def _store_alert(self, alert):
+        # written like a live reading: queued, and spooled while the database is down
+        try:
+            self._enqueue(ALERTS, compact_alert(alert))
+        except Exception as e:
+            self.metrics.inc("errors_total", stage="store_alert")
+            log(f"Error storing anomaly alert: {e}", level=logging.ERROR)
 
+    def _query_cache_requests(self):
+        if not self.query_cache:
+            return None
+        stats = self.query_cache.stats()
+        return {(("result", "hit"),): stats["hits"], (("result", "miss"),): stats["misses"]}
+
+    def extract_incremental(self, file_path, checkpoint_path=None, follow=False, poll_interval=1.0,
+                            batch_size=1000, workers=None):
+        # import only what was appended since the last run; with follow=True keep
+        # waiting for new lines like tail -f
+        checkpoint = Checkpoint(checkpoint_path or f"{file_path}.checkpoint")
+        offset = checkpoint.load(file_path)
+        imported = 0
+        log(f"Resuming {file_path} from byte {offset}")
+        on_parsed = self._count_parsed if self.metrics.enabled else None
+
+        while True:
+            chunks = read_new_lines(file_path, offset)
+            for grouped, end in parse_chunks(chunks, self.sensor_patterns, workers, on_parsed=on_parsed):
+                for sensor, records in grouped.items():
+                    imported += self.insert_data(records, sensor, batch_size)
+                # only advance once the chunk is stored so a crash replays it
+                offset = end
+                checkpoint.save(file_path, offset)
+
+            if not follow:
+                break
+            # the backlog is caught up, new lines trickle in too slowly for a pool
+            workers = 1
+            time.sleep(poll_interval)
+            if checkpoint.load(file_path) != offset:
+                log(f"{file_path} was rotated or truncated, starting from the beginning")
+                offset = 0
+
+        log(f"Imported {imported} records from {file_path}, checkpoint at byte {offset}")
+        return imported
+
+    @cached_query
+    @timed_method
     def get_average_value(self, sensor_type, date_str, data_key):
+        rollup = self._day_rollup(sensor_type, date_str, data_key)
+        if rollup:
+            return rollup['average']
         collection_name = f"{sensor_type}-{date_str}"
-        collection = self.db[collection_name]
         pipeline = [
             {"$group": {"_id": None, "average": {"$avg": f"$data.{data_key}"}}}
         ]
-        result = collection.aggregate(pipeline)
+        result = self._aggregate(collection_name, pipeline)
         average_value = list(result)[0]['average'] if result else None
         return average_value
 
+    @cached_query
+    @timed_method
     def get_highest_value(self, sensor_type, date_str, data_key):
+        rollup = self._day_rollup(sensor_type, date_str, data_key)
+        if rollup:
+            return rollup['max']
         collection_name = f"{sensor_type}-{date_str}"
-        collection = self.db[collection_name]
         pipeline = [
             {"$group": {"_id": None, "highest": {"$max": f"$data.{data_key}"}}}
         ]
-        result = collection.aggregate(pipeline)
+        result = self._aggregate(collection_name, pipeline)
         highest_value = list(result)[0]['highest'] if result else None
         return highest_value
 
+    @cached_query
+    @timed_method
     def get_lowest_value(self, sensor_type, date_str, data_key):
+        rollup = self._day_rollup(sensor_type, date_str, data_key)
+        if rollup:
+            return rollup['min']
         collection_name = f"{sensor_type}-{date_str}"
-        collection = self.db[collection_name]
         pipeline = [
             {"$group": {"_id": None, "lowest": {"$min": f"$data.{data_key}"}}}
         ]
-        result = collection.aggregate(pipeline)
+        result = self._aggregate(collection_name, pipeline)
         lowest_value = list(result)[0]['lowest'] if result else None
         return lowest_value
 
-    def get_median(self, collection_name, data_key):
-        collection = self.db[collection_name]
-        data_points = list(collection.aggregate([
+    @cached_query
+    @timed_method
+    def get_median(self, collection_name, data_key, exact=False):
+        if not exact:
+            quantiles = self._sketch_quantiles(collection_name, data_key, [0.5])
+            if quantiles:
+                return quantiles[0.5]
+        data_points = list(self._aggregate(collection_name, [
             {"$project": {data_key: f"$data.{data_key}"}},
             {"$sort": {data_key: 1}}
         ]))
@@ -228,9 +451,10 @@ class SensorDataExtractor:
         data_values = [dp[data_key] for dp in data_points]
         return median(data_values)
 
+    @cached_query
+    @timed_method
     def get_mode(self, collection_name, data_key):
-        collection = self.db[collection_name]
-        data_points = list(collection.aggregate([
+        data_points = list(self._aggregate(collection_name, [
             {"$project": {data_key: f"$data.{data_key}"}},
             {"$group": {"_id": f"${data_key}", "count": {"$sum": 1}}},
             {"$sort": {"count": -1}}
@@ -238,18 +462,27 @@ class SensorDataExtractor:
 
         return data_points[0]['_id'] if data_points else None
 
+    @cached_query
+    @timed_method
     def get_standard_deviation(self, collection_name, data_key):
-        collection = self.db[collection_name]
-        data_points = list(collection.aggregate([
+        rollup = self._day_rollup(*split_collection_name(collection_name), data_key)
+        if rollup and rollup['standard_deviation'] is not None:
+            return rollup['standard_deviation']
+        data_points = list(self._aggregate(collection_name, [
             {"$project": {data_key: f"$data.{data_key}"}}
         ]))
 
         data_values = [dp[data_key] for dp in data_points]
         return stdev(data_values)
 
-    def get_percentiles(self, collection_name, data_key, percentiles=[25, 50, 75, 90]):
-        collection = self.db[collection_name]
-        data_points = list(collection.aggregate([
+    @cached_query
+    @timed_method
+    def get_percentiles(self, collection_name, data_key, percentiles=[25, 50, 75, 90], exact=False):
+        if not exact:
+            quantiles = self._sketch_quantiles(collection_name, data_key, [p / 100 for p in percentiles])
+            if quantiles:
+                return {p: quantiles[p / 100] for p in percentiles}
+        data_points = list(self._aggregate(collection_name, [
             {"$project": {data_key: f"$data.{data_key}"}},
             {"$sort": {data_key: 1}}
         ]))
@@ -264,13 +497,87 @@ class SensorDataExtractor:
 
         return percentile_values
 
+    @timed_method
+    def get_quantiles(self, sensor_type, date_range, data_key, percentiles=[25, 50, 75, 90], exact=False):
+        # percentiles over several days from merged sketches; falls back to an
+        # exact pass when a day has no complete sketch
+        if isinstance(date_range, str):
+            date_range = [date_range]
+        merged = None
+        if not exact:
+            for date_str in date_range:
+                sketch = self._complete_sketch(sensor_type, data_key, date_str)
+                if sketch is None:
+                    merged = None
+                    break
+                merged = sketch if merged is None else merged.merge(sketch)
+        if merged is not None:
+            return {p: merged.quantile(p / 100) for p in percentiles}
+        return self.get_summary(sensor_type, date_range, [data_key], percentiles)[data_key]['percentiles']
+
+    @cached_query
+    def _stored_count(self, sensor_type, date_str):
+        # cached with the day's other results, so the sketch and rollup checks
+        # do not count a time-series day on every statistics call
+        return self.storage.count(sensor_type, date_str)
+
+    def _complete_sketch(self, sensor_type, data_key, date_str):
+        # a sketch only answers for a day if it has seen every stored reading
+        sketch = self.sketches.get(sensor_type, data_key, date_str)
+        if sketch is None:
+            return None
+        if sketch.n != self._stored_count(sensor_type, date_str):
+            return None
+        return sketch
+
+    def _sketch_quantiles(self, collection_name, data_key, quantiles):
+        sensor_type, date_str = split_collection_name(collection_name)
+        sketch = self._complete_sketch(sensor_type, data_key, date_str)
+        if sketch is None:
+            return None
+        return {q: sketch.quantile(q) for q in quantiles}
+
+    def build_sketches(self, sensor_type, date_str):
+        # backfill for days stored before sketches existed
+        sketches = {}
+        for doc in self._find(f"{sensor_type}-{date_str}", projection={"_id": 0, "data": 1}, batch_size=10000):
+            for data_key, value in doc.get("data", {}).items():
+                sketches.setdefault(data_key, KLLSketch(self.sketches.k)).update(value)
+        for data_key, sketch in sketches.items():
+            self.sketches.replace(sensor_type, data_key, date_str, sketch)
+        return len(sketches)
+
+    def _day_rollup(self, sensor_type, date_str, data_key):
+        # the day tier only answers once it covers every stored reading
+        day = datetime.strptime(date_str, '%Y-%m-%d')
+        doc = self.rollups.get("day", sensor_type, data_key, day)
+        if not doc or doc["count"] != self._stored_count(sensor_type, date_str):
+            return None
+        return summarize(doc)
+
+    @timed_method
+    def get_rollup_series(self, sensor_type, start, end, data_key, resolution=None, max_points=1000):
+        # downsampled points from the coarsest tier that satisfies the request;
+        # resolution is the widest acceptable bucket in seconds
+        tier = RollupStore.choose_tier(start, end, resolution, max_points)
+        return tier, self.rollups.series(tier, sensor_type, data_key, start, end)
+
+    def backfill_rollups(self, sensor_type, date_str):
+        # rebuild all tiers for a day that was stored before rollups existed
+        cursor = self._find(f"{sensor_type}-{date_str}", projection={"_id": 0, "timestamp": 1, "data": 1},
+                            batch_size=10000)
+        return self.rollups.backfill(sensor_type, datetime.strptime(date_str, '%Y-%m-%d'), cursor)
+
+    @cached_query
+    @timed_method
     def get_data_count(self, collection_name):
-        collection = self.db[collection_name]
-        return collection.count_documents({})
+        result = next(self._aggregate(collection_name, [{"$count": "count"}]), None)
+        return result['count'] if result else 0
 
+    @cached_query
+    @timed_method
     def get_data_rate(self, collection_name):
-        collection = self.db[collection_name]
-        timestamps = list(collection.aggregate([
+        timestamps = list(self._aggregate(collection_name, [
             {"$project": {"timestamp": 1}},
             {"$sort": {"timestamp": 1}}
         ]))
@@ -284,12 +591,120 @@ class SensorDataExtractor:
 
         return len(timestamps) / time_delta if time_delta > 0 else None
     
+    @timed_method
+    def get_summary(self, sensor_type, date_range, data_keys, percentiles=[25, 50, 75, 90]):
+        # every metric above for several keys and days, from one aggregation
+        # streamed once instead of nine queries per key per day
+        if isinstance(date_range, str):
+            date_range = [date_range]
+        if not date_range:
+            return {}
+
+        projection = {"$project": {"_id": 0, "timestamp": 1, **{f"data.{k}": 1 for k in data_keys}}}
+        collection, pipeline = self.storage.union_source(sensor_type, date_range, [projection])
+        cursor = collection.aggregate(pipeline, batchSize=10000)
+
+        values = {k: [] for k in data_keys}
+        count = 0
+        first = last = None
+        for doc in cursor:
+            count += 1
+            ts = doc.get("timestamp")
+            if ts is not None:
+                first = ts if first is None or ts < first else first
+                last = ts if last is None or ts > last else last
+            data = doc.get("data", {})
+            for k in data_keys:
+                value = data.get(k)
+                if value is not None:
+                    values[k].append(value)
+
+        time_delta = (last - first).total_seconds() if count > 1 else 0
+        data_rate = count / time_delta if time_delta > 0 else None
+
+        summary = {}
+        for k, data_values in values.items():
+            data_values.sort()
+            n = len(data_values)
+            summary[k] = {
+                "average": mean(data_values) if n else None,
+                "highest": data_values[-1] if n else None,
+                "lowest": data_values[0] if n else None,
+                "median": median(data_values) if n else None,
+                "mode": Counter(data_values).most_common(1)[0][0] if n else None,
+                "standard_deviation": stdev(data_values) if n > 1 else None,
+                "percentiles": {p: data_values[min(int(n * (p / 100)), n - 1)] for p in percentiles} if n else {},
+                "count": n,
+                "data_count": count,
+                "data_rate": data_rate
+            }
+        return summary
+
+    @timed_method
     def filter_data(self, sensor_type, date_str, conditions):
         collection_name = f"{sensor_type}-{date_str}"
-        collection = self.db[collection_name]
-        filtered_data = collection.find(conditions)
+        filtered_data = self._find(collection_name, conditions)
         return list(filtered_data)
     
+    @timed_method
+    def filter_data_range(self, sensor_type, start, end, conditions=None):
+        # filter_data over every day from start to end, merged by timestamp;
+        # the first and last day are cut at start and end (a bare end date is inclusive)
+        start, end = to_datetime(start), to_datetime(end, end_of_day=True)
+        bounds = {"timestamp": {"$gte": start, "$lte": end}}
+        conditions = {"$and": [conditions, bounds]} if conditions else bounds
+        queries = [partial(self._find, f"{sensor_type}-{date_str}", conditions, sort=[("timestamp", 1)])
+                   for date_str in dates_between(start, end)]
+        return fan_out_merge(self.query_pool, queries)
+
+    @timed_method
+    def get_data_for_times(self, sensor_type, time_strs):
+        # get_data_for_time for many timestamps, one query per day they fall on
+        days = {}
+        for time_str in time_strs:
+            dt = to_datetime(time_str)
+            days.setdefault(dt.strftime('%Y-%m-%d'), []).append(dt)
+        queries = [partial(self._find, f"{sensor_type}-{date_str}", {"timestamp": {"$in": dts}}, sort=[("timestamp", 1)])
+                   for date_str, dts in sorted(days.items())]
+        return fan_out_merge(self.query_pool, queries)
+
+    @timed_method
+    def get_series(self, sensor_type, start, end, data_keys, resolution=None):
+        # readings between start and end as a lazy iterator ordered by timestamp;
+        # with a resolution (seconds) the points come from the rollup tiers instead
+        start, end = to_datetime(start), to_datetime(end, end_of_day=True)
+        if resolution:
+            points = {}
+            for data_key in data_keys:
+                _, series = self.get_rollup_series(sensor_type, start, end, data_key, resolution)
+                for point in series:
+                    points.setdefault(point['timestamp'], {})[data_key] = point['average']
+            return iter([{"timestamp": ts, "data": data} for ts, data in sorted(points.items())])
+
+        conditions = {"timestamp": {"$gte": start, "$lte": end}}
+        projection = {"_id": 0, "timestamp": 1, **{f"data.{k}": 1 for k in data_keys}}
+        queries = [partial(self._find, f"{sensor_type}-{date_str}", conditions, projection,
+                           sort=[("timestamp", 1)], batch_size=10000)
+                   for date_str in dates_between(start, end)]
+        return fan_out_merge(self.query_pool, queries)
+
+    @timed_method
+    def get_columns(self, sensor_type, start, end, data_keys):
+        # readings as NumPy columns decoded from raw BSON batches, one day per pool thread
+        start, end = to_datetime(start), to_datetime(end, end_of_day=True)
+        conditions = {"timestamp": {"$gte": start, "$lte": end}}
+        futures = [
+            self.query_pool.submit(columnar.fetch_columns, *self.storage.source(sensor_type, date_str), data_keys, conditions)
+            for date_str in dates_between(start, end)
+        ]
+        return columnar.concat_columns([future.result() for future in futures], data_keys)
+
+    def get_columnar_summary(self, sensor_type, start, end, data_keys, percentiles=[25, 50, 75, 90]):
+        return columnar.summarize(self.get_columns(sensor_type, start, end, data_keys), data_keys, percentiles)
+
+    def export_parquet(self, sensor_type, start, end, data_keys, path):
+        return columnar.export_parquet(self.get_columns(sensor_type, start, end, data_keys), path)
+
     def detect_anomalies(self, sensor_type, date_str, data_key, threshold=2):
         collection_name = f"{sensor_type}-{date_str}"
         mean_value = self.get_average_value(sensor_type, date_str, data_key)
@@ -298,88 +713,77 @@ class SensorDataExtractor:
         lower_bound = mean_value - threshold * std_dev_value
         upper_bound = mean_value + threshold * std_dev_value
 
-        collection = self.db[collection_name]
-        anomaly_data = collection.find({"$or": [
+        anomaly_data = self._find(collection_name, {"$or": [
             {f"data.{data_key}": {"$lt": lower_bound}},
             {f"data.{data_key}": {"$gt": upper_bound}},
         ]})
 
         return list(anomaly_data)
 
+    @timed_method
     def get_data_for_time(self, collection_name, time_str):
         dt = datetime.strptime(time_str, '%Y-%m-%d %H:%M:%S')
-        collection = self.db[collection_name]
-        result = collection.find_one({"timestamp": dt})
+        result = next(self._find(collection_name, {"timestamp": dt}, limit=1), None)
         return result
     
+    @timed_method
     def get_latest_datapoint(self, collection_name):
-        collection = self.db[collection_name]
-        result = collection.find().sort("timestamp", -1).limit(1)
-        return result[0] if collection.count_documents({}) > 0 else None
+        result = self._find(collection_name, sort=[("timestamp", -1)], limit=1)
+        return next(result, None)
 
-    
+    @timed_method
     def get_latest_collection(self, sensor_type):
-        collection_names = self.db.list_collection_names()
-        sensor_collections = sorted([name for name in collection_names if name.startswith(sensor_type)])
+        date_str = self.storage.latest_date(sensor_type)
 
-        if sensor_collections:
-            return sensor_collections[-1]
+        if date_str:
+            return f"{sensor_type}-{date_str}"
         else:
             return None
 
+    def warm_latest_values(self):
+        # seed the last-value cache once at startup; ingestion keeps it current
+        for sensor_type in self.sensor_patterns:
+            collection_name = self.get_latest_collection(sensor_type)
+            if collection_name:
+                latest_datapoint = self.get_latest_datapoint(collection_name)
+                if latest_datapoint:
+                    self.latest_values.update(sensor_type, [latest_datapoint])
+        return len(self.latest_values)
+
     def magic(self, time_str=None):
-        ideal = {
-            "temperature_high": 27,
-            "temperature_low": 20,
-            "co2_high": 700,
-            "co2_low": 350,
-            "humidity_high": 70,
-            "humidity_low": 40,
-            "pH_high": 6.8,
-            "pH_low": 5.3,
-            "EC_high": 1800,
-            "EC_low": 1200,
-            "o2_high": 80,
-            "o2_low": 35
-        }
         if time_str == None:
-            collections = {
-                "temperature-humidity": self.get_latest_collection("temperature-humidity"),
-                "co2": self.get_latest_collection("co2"),
-                "pH": self.get_latest_collection("pH"),
-                "EC": self.get_latest_collection("EC"),
-                "o2": self.get_latest_collection("o2")
-            }
-            
-            values = {}
-            for sensor, collection_name in collections.items():
-                if isinstance(collection_name, str):
-                    latest_datapoint = self.get_latest_datapoint(collection_name)
-                    if latest_datapoint:
-                        for key, value in latest_datapoint["data"].items():
-                            values[key] = value
-                else:
-                    print(f"Warning: Invalid collection name for sensor {sensor}: {collection_name}")
+            if not len(self.latest_values):
+                self.warm_latest_values()
+            sensors = ["temperature-humidity", "co2", "pH", "conductivity", "o2"]
 
-            total = 0
-            for key, value in values.items():
-                if ideal[f"{key}_low"] <= value <= ideal[f"{key}_high"]:
-                    total += 1
+            values = {}
+            for sensor in sensors:
+                latest = self.latest_values.latest(sensor)
+                if latest:
+                    values.update(latest)
                 else:
-                    total -= 1
-
-            return total
-
-
+                    print(f"Warning: No latest values for sensor {sensor}")
 
+            return score(values)
 
     def close(self):
+        if self.write_buffer:
+            self.write_buffer.close()
+        if self.spool:
+            self.spool.close()
+        self.sketches.flush()
+        self.rollups.flush()
+        self.query_pool.shutdown()
+        self.registry.close()
+        if self.query_cache:
+            self.query_cache.close()
         self.client.close()
 
 def run_mqtt():
     info = keys.run()
     db_uri = info.getauth("mongo")
     extractor = SensorDataExtractor(db_uri)
+    extractor.start_spool()
     mqtt_broker = "test.mosquitto.org"
     mqtt_port = 1883
     mqtt_topic = "fantopic"
@@ -398,13 +802,13 @@ def run_mqtt():
 def run_extract():
     info = keys.run()
     db_uri = info.getauth("mongo")
-    extractor = SensorDataExtractor(db_uri)
+    extractor = SensorDataExtractor(db_uri, idempotent=True)
 
     path = info.getpath("logs")
 
     try:
         log("Starting data extraction")
-        extractor.extract_data(path)
+        extractor.extract_incremental(path)
 
     except Exception as e:
         log(f"Error running data extraction: {e}", level=logging.ERROR)
@@ -413,8 +817,29 @@ def run_extract():
         log("Closing the extractor")
         extractor.close()
 
+def run_backfill():
+    info = keys.run()
+    db_uri = info.getauth("mongo")
+    extractor = SensorDataExtractor(db_uri)
+
+    try:
+        log("Starting sketch and rollup backfill")
+        for sensor_type in extractor.sensor_patterns:
+            for date_str in extractor.storage.list_dates(sensor_type):
+                extractor.build_sketches(sensor_type, date_str)
+                extractor.backfill_rollups(sensor_type, date_str)
+                log(f"Backfilled {sensor_type}-{date_str}")
+
+    except Exception as e:
+        log(f"Error running backfill: {e}", level=logging.ERROR)
+
+    finally:
+        log("Closing the extractor")
+        extractor.close()
+
 if __name__ == '__main__':
-    run_extract()
+    commands = {"extract": run_extract, "mqtt": run_mqtt, "backfill": run_backfill}
+    commands[sys.argv[1] if len(sys.argv) > 1 else "extract"]()
 
 '''if __name__ == '__main__':
     # run_mqtt()
@@ -448,26 +873,20 @@ if __name__ == '__main__':
     for sensor_type, data_keys in sensors.items():
         for date_str in date_str_list:
             collection_name = f"{sensor_type}-{date_str}"
-            for data_key in data_keys:
+            summary = extractor.get_summary(sensor_type, date_str, data_keys)
+            for data_key, stats in summary.items():
                 print("Collection: {%s}, Data: {%s}", collection_name, data_key)
-                average_value = extractor.get_average_value(sensor_type, date_str, data_key)
-                highest_value = extractor.get_highest_value(sensor_type, date_str, data_key)
-                lowest_value = extractor.get_lowest_value(sensor_type, date_str, data_key)
-                median_value = extractor.get_median(collection_name, data_key)
-                mode_value = extractor.get_mode(collection_name, data_key)
-                std_dev_value = extractor.get_standard_deviation(collection_name, data_key)
-                percentiles = extractor.get_percentiles(collection_name, data_key)
-                data_count = extractor.get_data_count(collection_name)
-                data_rate = extractor.get_data_rate(collection_name)
-                print(f"Average value: {average_value}")
-                print(f"Highest value: {highest_value}")
-                print(f"Lowest value: {lowest_value}")
-                print(f"Median value: {median_value}")
-                print(f"Mode value: {mode_value}")
-                print(f"Standard deviation: {std_dev_value}")
-                print(f"Percentiles: {percentiles}")
-                print(f"Data count: {data_count}")
-                print(f"Data rate: {data_rate}")
+                print(f"Average value: {stats['average']}")
+                print(f"Highest value: {stats['highest']}")
+                print(f"Lowest value: {stats['lowest']}")
+                print(f"Median value: {stats['median']}")
+                print(f"Mode value: {stats['mode']}")
+                print(f"Standard deviation: {stats['standard_deviation']}")
+                print(f"Percentiles: {stats['percentiles']}")
+                print(f"Data count: {stats['data_count']}")
+                print(f"Data rate: {stats['data_rate']}")
+        # or the whole period at once
+        print(extractor.get_summary(sensor_type, date_str_list, data_keys))
         magic_value = extractor.magic()
     print("magic: ", magic_value)
     extractor.close()
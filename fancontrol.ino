@@ -7,6 +7,7 @@ const char* ssid = "CanesGuest";
 // MQTT Broker credentials
 const char* mqtt_server = "test.mosquitto.org";
 const char* mqtt_topic = "fantopic";
+const char* ack_topic = "fantopic/ack";
 
 // Relay pin
 
@@ -60,7 +61,7 @@ void setup() {
 
   // Subscribe to MQTT topic and register callback function
   mqttClient.setCallback(callback);
-  mqttClient.subscribe(mqtt_topic);
+  mqttClient.subscribe(mqtt_topic, 1);
 }
 
 void loop() {
@@ -80,7 +81,7 @@ void loop() {
     Serial.println("MQTT connection lost, reconnecting...");
     if (mqttClient.connect("ArduinoMKR1010")) {
       Serial.println("Reconnected to MQTT Broker");
-      mqttClient.subscribe(mqtt_topic);
+      mqttClient.subscribe(mqtt_topic, 1);
     } else {
       Serial.println("Failed to reconnect to MQTT Broker");
     }
@@ -90,104 +91,84 @@ void loop() {
   mqttClient.loop();
 }
 
-// MQTT message handler
-void callback(char* topic, byte* payload, unsigned int length) {
-
-
-    Serial.print("Message arrived [");
-    Serial.print(topic);
-    Serial.print("] ");
-    
-    // Allocate memory for the payload_char with length+1 to accommodate the null terminator
-    char payload_char[length + 1];
-    
-    // Copy the payload into payload_char and add the null terminator
-    for (int i = 0; i < length; i++) {
-        payload_char[i] = (char)payload[i];
-        Serial.print((char)payload[i]);
-    }
-    payload_char[length] = '\0'; // Null terminator
-    Serial.println();
-    
-    Serial.println("Message received: " + String(topic));
-    Serial.println("Payload: " + String(payload_char));
-
-    if (strcmp(payload_char,"pump1_on") == 0)
+// Switch one relay, e.g. "pump1_on"; returns false for an unknown command
+bool applyCommand(const char* cmd) {
+    if (strcmp(cmd,"pump1_on") == 0)
     {   
         digitalWrite(relayPin1, HIGH);
         Serial.println("Pump 1 turned on");
     }
-    else if (strcmp(payload_char,"pump1_off") == 0)
+    else if (strcmp(cmd,"pump1_off") == 0)
     {   
         digitalWrite(relayPin1, LOW);
         Serial.println("Pump 1 turned off");
     }
-    else if (strcmp(payload_char,"pump2_on") == 0)
+    else if (strcmp(cmd,"pump2_on") == 0)
     {   
         digitalWrite(relayPin2, HIGH);
         Serial.println("Pump 2 turned on");
     }
-    else if (strcmp(payload_char,"pump2_off") == 0)
+    else if (strcmp(cmd,"pump2_off") == 0)
     {   
         digitalWrite(relayPin2, LOW);
         Serial.println("Pump 2 turned off");
     }
-    else if (strcmp(payload_char,"pump3_on") == 0)
+    else if (strcmp(cmd,"pump3_on") == 0)
     {   
         digitalWrite(relayPin3, HIGH);
         Serial.println("Pump 3 turned on");
     }
-    else if (strcmp(payload_char,"pump3_off") == 0)
+    else if (strcmp(cmd,"pump3_off") == 0)
     {   
         digitalWrite(relayPin3, LOW);
         Serial.println("Pump 3 turned off");
     }
-    else if (strcmp(payload_char,"pump4_on") == 0)
+    else if (strcmp(cmd,"pump4_on") == 0)
     {   
         digitalWrite(relayPin4, HIGH);
         Serial.println("Pump 4 turned on");
     }
-    else if (strcmp(payload_char,"pump4_off") == 0)
+    else if (strcmp(cmd,"pump4_off") == 0)
     {   
         digitalWrite(relayPin4, LOW);
         Serial.println("Pump 4 turned off");
     }
-    else if (strcmp(payload_char,"fan1_on") == 0)
+    else if (strcmp(cmd,"fan1_on") == 0)
     {   
         digitalWrite(relayPin5, HIGH);
         Serial.println("fan 1 turned on");
     }
-    else if (strcmp(payload_char,"fan1_off") == 0)
+    else if (strcmp(cmd,"fan1_off") == 0)
     {   
         digitalWrite(relayPin5, LOW);
         Serial.println("fan 1 turned off");
     }
-    else if (strcmp(payload_char,"fan2_on") == 0)
+    else if (strcmp(cmd,"fan2_on") == 0)
     {   
         digitalWrite(relayPin6, HIGH);
         Serial.println("fan 2 turned on");
     }
-    else if (strcmp(payload_char,"fan2_off") == 0)
+    else if (strcmp(cmd,"fan2_off") == 0)
     {   
         digitalWrite(relayPin6, LOW);
         Serial.println("fan 2 turned off");
     }
-    else if (strcmp(payload_char,"sample7on") == 0)
+    else if (strcmp(cmd,"sample7on") == 0)
     {   
         digitalWrite(relayPin7, HIGH);
         Serial.println("Device turned on");
     }
-    else if (strcmp(payload_char,"sample7off") == 0)
+    else if (strcmp(cmd,"sample7off") == 0)
     {   
         digitalWrite(relayPin7, LOW);
         Serial.println("Device turned off");
     }
-    else if (strcmp(payload_char,"sample8on") == 0)
+    else if (strcmp(cmd,"sample8on") == 0)
     {   
         digitalWrite(relayPin8, HIGH);
         Serial.println("Device turned on");
     }
-    else if (strcmp(payload_char,"sample8off") == 0)
+    else if (strcmp(cmd,"sample8off") == 0)
     {   
         digitalWrite(relayPin8, LOW);
         Serial.println("Device turned off");
@@ -195,8 +176,55 @@ void callback(char* topic, byte* payload, unsigned int length) {
     else
     {
         Serial.println("Payload not recognized");
+        return false;
     }
-
+    return true;
 }
 
+// MQTT message handler
+// Payloads are either a single legacy command ("pump1_on") or a batch tagged
+// with an id ("<id>:pump1_on,fan2_off"). Batches are acknowledged on
+// ack_topic as "<id>:pump1_on=1,fan2_off=1", 0 marking unknown commands.
+void callback(char* topic, byte* payload, unsigned int length) {
+
 
+    Serial.print("Message arrived [");
+    Serial.print(topic);
+    Serial.print("] ");
+    
+    // Allocate memory for the payload_char with length+1 to accommodate the null terminator
+    char payload_char[length + 1];
+    
+    // Copy the payload into payload_char and add the null terminator
+    for (int i = 0; i < length; i++) {
+        payload_char[i] = (char)payload[i];
+        Serial.print((char)payload[i]);
+    }
+    payload_char[length] = '\0'; // Null terminator
+    Serial.println();
+    
+    Serial.println("Message received: " + String(topic));
+    Serial.println("Payload: " + String(payload_char));
+
+    char* separator = strchr(payload_char, ':');
+    if (separator == NULL)
+    {
+        applyCommand(payload_char);
+        return;
+    }
+
+    // The payload buffer is copied above, so publishing the ack from inside
+    // the callback cannot overwrite it
+    *separator = '\0';
+    char ack[MQTT_MAX_PACKET_SIZE];
+    snprintf(ack, sizeof(ack), "%s:", payload_char);
+    bool first = true;
+    for (char* cmd = strtok(separator + 1, ","); cmd != NULL; cmd = strtok(NULL, ","))
+    {
+        bool ok = applyCommand(cmd);
+        size_t used = strlen(ack);
+        snprintf(ack + used, sizeof(ack) - used, "%s%s=%d", first ? "" : ",", cmd, ok ? 1 : 0);
+        first = false;
+    }
+    mqttClient.publish(ack_topic, ack);
+}
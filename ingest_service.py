@@ -0,0 +1,382 @@
+'''
+Author: Munir Mohamed Hafeel
+Date: 10-18-2026
+
+Standalone MQTT ingestion, separate from the Flask app: a supervisor runs N
+worker processes, each with its own MQTT connection, SensorDataExtractor and
+write-behind buffer.
+
+    python ingest_service.py --workers 4 [--mode shared|partition] [--broker host:port]
+
+shared     every worker subscribes to $share/<group>/<topic> and the broker
+           spreads messages over the group. Workers on other hosts that use
+           the same --group join the same pool.
+partition  the supervisor assigns each sensor topic to one worker and moves
+           topics when a worker stops, restarts or sensors.json changes.
+           For brokers without shared subscriptions; one host only.
+
+GET /health on --health-port reports every worker and answers 503 when one
+is down, disconnected or has stopped sending heartbeats. Dead or stuck
+workers are restarted. SIGTERM/SIGINT stop the workers gracefully: they
+unsubscribe, finish the message in hand and flush their buffers. Readings a
+worker cannot write go to its own spool (--spool/worker-N) and are replayed
+when the database is back.
+
+Workers publish every reading they parse on <--readings-topic>/<sensor>. The
+dashboard app, started with INGEST_MODE=service, subscribes to that instead
+of the sensor topics: its stream, control rules and anomaly detection see
+the readings of all workers while only the workers write them.
+'''
+
+import os
+import json
+import time
+import queue
+import signal
+import socket
+import argparse
+import threading
+import multiprocessing
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from db import log
+from sensor_registry import SensorRegistry
+
+
+def readings_payload(sensor_type, records):
+    # timestamp and data, what the app's listeners use; not the metadata or an
+    # _id that insert_many added to the stored record
+    return json.dumps({
+        "sensor": sensor_type,
+        "records": [{"timestamp": record['timestamp'].isoformat(), "data": record['data']} for record in records]
+    })
+
+
+def parse_readings(payload):
+    # (sensor_type, records) from readings_payload
+    message = json.loads(payload)
+    records = [dict(record, timestamp=datetime.fromisoformat(record['timestamp'])) for record in message["records"]]
+    return message["sensor"], records
+
+
+def follow_registry(registry, assign=None, interval=5.0):
+    # every worker reloads sensors.json so it parses with the current patterns;
+    # shared workers also subscribe to its topics, partitioned ones are sent theirs
+    if assign is not None:
+        assign(registry.topics())
+        registry.listeners.append(lambda registry: assign(registry.topics()))
+    return registry.watch(interval)
+
+
+def run_worker(index, config, control, status):
+    # one worker process with its own MongoClient and MQTT connection
+    import db
+    import paho.mqtt.client as mqtt
+
+    # only the supervisor reacts to Ctrl-C; a SIGTERM sent to the whole
+    # process group (e.g. by systemd) stops the worker like the supervisor would
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda *args: control.put(("stop", None)))
+    db_uri = config["mongo"] or db.keys.run().getauth("mongo")
+    extractor = db.SensorDataExtractor(db_uri, idempotent=True, storage=config["storage"])
+    extractor.start_write_behind(config["max_batch"], config["max_delay"])
+    extractor.start_spool(os.path.join(config["spool"], f"worker-{index}"))
+    if config["readings_topic"]:
+        # the app detects anomalies on the readings of all workers, see parse_readings
+        extractor.anomalies = None
+
+    shared = config["mode"] == "shared"
+    lock = threading.Lock()
+    subscriptions = set()
+    state = {"connected": False, "messages": 0}
+
+    def subscription(topic):
+        return f"$share/{config['group']}/{topic}" if shared else topic
+
+    def assign(topics):
+        topics = set(topics)
+        with lock:
+            for topic in subscriptions - topics:
+                client.unsubscribe(subscription(topic))
+            for topic in topics - subscriptions:
+                client.subscribe(subscription(topic), qos=1)
+            subscriptions.clear()
+            subscriptions.update(topics)
+
+    def on_connect(client, userdata, flags, rc):
+        state["connected"] = rc == 0
+        with lock:
+            topics = list(subscriptions)
+            subscriptions.clear()
+        assign(topics)
+
+    def on_disconnect(client, userdata, rc):
+        state["connected"] = False
+
+    def on_message(client, userdata, msg):
+        state["messages"] += 1
+        extractor.insert_decoded_message(msg.payload.decode(), msg.topic)
+
+    # shared workers keep their session so the broker holds their share of
+    # messages across a restart; partitioned workers get their topics anew
+    client = mqtt.Client(client_id=f"{config['group']}-{socket.gethostname()}-{index}", clean_session=not shared)
+    client.on_connect = on_connect
+    client.on_disconnect = on_disconnect
+    client.on_message = on_message
+    if config["readings_topic"]:
+        extractor.listeners.append(lambda sensor_type, records: client.publish(
+            f"{config['readings_topic']}/{sensor_type}", readings_payload(sensor_type, records)))
+    follow_registry(extractor.registry, assign if shared else None)
+    host, _, port = config["broker"].partition(":")
+    client.connect_async(host, int(port or 1883))
+    client.loop_start()
+
+    try:
+        while True:
+            try:
+                command, argument = control.get(timeout=config["heartbeat"])
+            except queue.Empty:
+                command = None
+            if command == "stop":
+                break
+            if command == "assign":
+                assign(argument)
+            buffer = extractor.write_buffer.stats()
+            status.put({
+                "worker": index,
+                "pid": os.getpid(),
+                "time": time.time(),
+                "connected": state["connected"],
+                "messages": state["messages"],
+                "topics": sorted(subscriptions),
+                "queue_depth": buffer["queue_depth"],
+                "flushed_records": buffer["flushed_records"],
+                "write_errors": buffer["errors"],
+                "dropped": buffer["dropped"]
+            })
+    finally:
+        # stop new deliveries first, then let the buffer write what it holds
+        assign([])
+        client.disconnect()
+        client.loop_stop()
+        extractor.close()
+
+
+class IngestService:
+    '''
+    Starts and watches the worker processes. Heartbeats arrive on one status
+    queue; each worker has a control queue for topic assignments and stop.
+    A worker that exits or misses heartbeats for health_timeout seconds is
+    replaced, with a growing delay if it keeps failing.
+    '''
+
+    def __init__(self, workers, config, health_port=8081, health_timeout=30.0, report=log):
+        self.workers = workers
+        self.config = config
+        self.health_port = health_port
+        self.health_timeout = health_timeout
+        self.report = report
+        self.context = multiprocessing.get_context("spawn")
+        self.status = self.context.Queue()
+        self.processes = {}
+        self.controls = {}
+        self.heartbeats = {}
+        self.started = {}
+        self.failures = {}
+        self.restart_at = {}
+        self.restarts = 0
+        self.stopping = threading.Event()
+        self.lock = threading.Lock()
+        self.registry = None
+        self.server = None
+
+    @property
+    def partitioned(self):
+        return self.config["mode"] == "partition"
+
+    def start_worker(self, index):
+        control = self.context.Queue()
+        process = self.context.Process(target=run_worker, args=(index, self.config, control, self.status),
+                                       name=f"ingest-worker-{index}", daemon=False)
+        process.start()
+        with self.lock:
+            self.processes[index] = process
+            self.controls[index] = control
+            self.started[index] = time.monotonic()
+            self.heartbeats.pop(index, None)
+        self.report(f"Started ingest worker {index} (pid {process.pid})")
+
+    def rebalance(self, *args):
+        # partition mode: topics round-robin over the workers that are running
+        if not self.partitioned or self.stopping.is_set():
+            return
+        with self.lock:
+            live = sorted(i for i, p in self.processes.items() if p.is_alive())
+            controls = dict(self.controls)
+        if not live:
+            return
+        topics = sorted(self.registry.topics())
+        assignment = {index: [] for index in live}
+        for i, topic in enumerate(topics):
+            assignment[live[i % len(live)]].append(topic)
+        for index, assigned in assignment.items():
+            controls[index].put(("assign", assigned))
+        self.report(f"Assigned topics: {assignment}")
+
+    def _drain_status(self):
+        while True:
+            try:
+                heartbeat = self.status.get_nowait()
+            except queue.Empty:
+                return
+            heartbeat["received"] = time.monotonic()
+            with self.lock:
+                self.heartbeats[heartbeat["worker"]] = heartbeat
+                self.failures.pop(heartbeat["worker"], None)
+
+    def _check_workers(self):
+        now = time.monotonic()
+        changed = False
+        for index in range(self.workers):
+            process = self.processes.get(index)
+            if process is not None and process.is_alive():
+                heartbeat = self.heartbeats.get(index)
+                last = heartbeat["received"] if heartbeat else self.started[index]
+                if now - last > self.health_timeout:
+                    self.report(f"Ingest worker {index} sent no heartbeat for {now - last:.0f}s, restarting it")
+                    process.kill()
+                    process.join()
+                else:
+                    continue
+            if process is not None:
+                # first notice of a stopped worker: its topics go to the others until it is back
+                failures = self.failures[index] = self.failures.get(index, 0) + 1
+                self.restart_at[index] = now + min(60, 2 ** (failures - 1))
+                self.report(f"Ingest worker {index} exited with code {process.exitcode}")
+                with self.lock:
+                    del self.processes[index]
+                changed = True
+            elif now >= self.restart_at.get(index, 0):
+                self.start_worker(index)
+                self.restarts += 1
+                changed = True
+        if changed:
+            self.rebalance()
+
+    def health(self):
+        now = time.monotonic()
+        with self.lock:
+            processes = dict(self.processes)
+            heartbeats = dict(self.heartbeats)
+        workers = {}
+        healthy = True
+        for index in range(self.workers):
+            process = processes.get(index)
+            heartbeat = heartbeats.get(index, {})
+            age = now - heartbeat["received"] if heartbeat else None
+            ok = (process is not None and process.is_alive() and heartbeat.get("connected", False)
+                  and age is not None and age <= self.health_timeout)
+            healthy = healthy and ok
+            workers[index] = dict(heartbeat, alive=process is not None and process.is_alive(),
+                                  heartbeat_age=age, healthy=ok)
+        return {"healthy": healthy, "mode": self.config["mode"], "restarts": self.restarts, "workers": workers}
+
+    def _serve_health(self):
+        service = self
+
+        class HealthHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/health":
+                    self.send_error(404)
+                    return
+                health = service.health()
+                body = json.dumps(health, default=str).encode()
+                self.send_response(200 if health["healthy"] else 503)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("", self.health_port), HealthHandler)
+        threading.Thread(target=self.server.serve_forever, name="health", daemon=True).start()
+
+    def run(self):
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *args: self.stopping.set())
+        if self.partitioned:
+            self.registry = SensorRegistry(report=self.report)
+            self.registry.listeners.append(self.rebalance)
+            self.registry.watch()
+        for index in range(self.workers):
+            self.start_worker(index)
+        self.rebalance()
+        self._serve_health()
+        self.report(f"Ingest service running {self.workers} workers ({self.config['mode']}), "
+                    f"health on :{self.health_port}/health")
+        try:
+            while not self.stopping.wait(1.0):
+                self._drain_status()
+                self._check_workers()
+        finally:
+            self.shutdown()
+
+    def shutdown(self, timeout=30.0):
+        self.stopping.set()
+        self.report("Stopping ingest workers")
+        with self.lock:
+            processes = dict(self.processes)
+            controls = dict(self.controls)
+        for index in processes:
+            controls[index].put(("stop", None))
+        deadline = time.monotonic() + timeout
+        for index, process in processes.items():
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                self.report(f"Ingest worker {index} did not stop in time, killing it")
+                process.kill()
+                process.join()
+        if self.server:
+            self.server.shutdown()
+        if self.registry:
+            self.registry.close()
+        self.report("Ingest service stopped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run MQTT ingestion in several worker processes")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--mode", choices=["shared", "partition"], default="shared")
+    parser.add_argument("--group", default="ingest", help="shared subscription group and client id prefix")
+    parser.add_argument("--broker", default="100.64.74.12:1883")
+    parser.add_argument("--mongo", default=None, help="MongoDB URI, the keys file default if omitted")
+    parser.add_argument("--storage", default="daily")
+    parser.add_argument("--max-batch", type=int, default=500)
+    parser.add_argument("--max-delay", type=float, default=1.0)
+    parser.add_argument("--spool", default=os.path.join("cwd", "spool"), help="spool directory, one log per worker")
+    parser.add_argument("--readings-topic", default="readings",
+                        help="topic prefix the parsed readings are published on, empty to publish none")
+    parser.add_argument("--heartbeat", type=float, default=5.0)
+    parser.add_argument("--health-port", type=int, default=8081)
+    parser.add_argument("--health-timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    config = {
+        "mode": args.mode,
+        "group": args.group,
+        "broker": args.broker,
+        "mongo": args.mongo,
+        "storage": args.storage,
+        "max_batch": args.max_batch,
+        "max_delay": args.max_delay,
+        "spool": args.spool,
+        "readings_topic": args.readings_topic,
+        "heartbeat": args.heartbeat
+    }
+    IngestService(args.workers, config, args.health_port, args.health_timeout).run()
+
+
+if __name__ == '__main__':
+    main()
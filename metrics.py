@@ -0,0 +1,185 @@
+'''
+Author: Munir Mohamed Hafeel
+Date: 10-18-2026
+
+In-process counters and histograms rendered in the Prometheus text format.
+Every recording call returns immediately while the registry is disabled, so
+instrumented hot paths cost one attribute check.
+'''
+
+import time
+import bisect
+import functools
+import threading
+from collections.abc import Iterator
+
+DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PARSE_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.005)
+SIZE_BUCKETS = (1, 10, 50, 100, 250, 500, 1000, 5000, 10000)
+
+# name -> (type, help)
+DESCRIPTIONS = {
+    "mqtt_messages_total": ("counter", "MQTT messages received, by topic"),
+    "sensor_readings_total": ("counter", "Readings ingested, by sensor and source (live or import)"),
+    "sensor_parse_seconds": ("histogram", "Time to parse one live message"),
+    "sensor_file_lines_total": ("counter", "Serial log lines read by the file importers"),
+    "sensor_file_parse_seconds_total": ("counter", "Time spent parsing serial log lines, summed over parse workers"),
+    "mongo_operation_seconds": ("histogram", "Latency of SensorDataExtractor database methods"),
+    "mongo_operation_errors_total": ("counter", "SensorDataExtractor database methods that raised"),
+    "write_batch_size": ("histogram", "Records per database write, by sensor"),
+    "errors_total": ("counter", "Errors by stage"),
+}
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in labels)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + "}"
+
+
+class Metrics:
+    '''
+    Registry of labelled counters and histograms. collect() adds values that
+    are read from other components (queue depths, cache hit counts) only when
+    the metrics are rendered.
+    '''
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.counters = {}
+        self.histograms = {}
+        self.collectors = []
+        self.lock = threading.Lock()
+
+    def clock(self):
+        # start time for observe_since, None while disabled
+        return time.perf_counter() if self.enabled else None
+
+    def inc(self, name, amount=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, value, buckets=DURATION_BUCKETS, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def observe_since(self, name, start, buckets=DURATION_BUCKETS, **labels):
+        if start is not None:
+            self.observe(name, time.perf_counter() - start, buckets, **labels)
+
+    def collect(self, name, kind, help, read):
+        # read() returns a number or {(("label", "value"), ...): number}
+        self.collectors.append((name, kind, help, read))
+
+    def render(self):
+        lines = []
+        with self.lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted((key, (h.buckets, list(h.counts), h.sum, h.count))
+                                for key, h in self.histograms.items())
+
+        described = set()
+
+        def header(name, kind=None, help=None):
+            if name not in described:
+                described.add(name)
+                kind, help = DESCRIPTIONS.get(name, (kind or "untyped", help or name))
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in counters:
+            header(name)
+            lines.append(f"{name}{_labels(labels)} {value}")
+
+        for (name, labels), (buckets, counts, total, count) in histograms:
+            header(name)
+            cumulative = 0
+            for bound, n in zip(buckets + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {total}")
+            lines.append(f"{name}_count{_labels(labels)} {count}")
+
+        for name, kind, help, read in self.collectors:
+            try:
+                values = read()
+            except Exception:
+                continue
+            if values is None:
+                continue
+            header(name, kind, help)
+            if not isinstance(values, dict):
+                values = {(): values}
+            for labels, value in values.items():
+                lines.append(f"{name}{_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _timed_iterator(metrics, name, iterator, elapsed):
+    # adds the time spent producing each item, not the consumer's time in
+    # between; observed once the iterator is exhausted, fails or is dropped
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            except Exception:
+                metrics.inc("mongo_operation_errors_total", method=name)
+                raise
+            finally:
+                elapsed += time.perf_counter() - start
+            yield item
+    finally:
+        metrics.observe("mongo_operation_seconds", elapsed, method=name)
+
+
+def timed_method(method):
+    # latency of a SensorDataExtractor database method, labelled with its name;
+    # for lazy results (range queries) that includes consuming the iterator
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        metrics = self.metrics
+        if not metrics.enabled:
+            return method(self, *args, **kwargs)
+        start = time.perf_counter()
+        try:
+            result = method(self, *args, **kwargs)
+        except Exception:
+            metrics.inc("mongo_operation_errors_total", method=name)
+            metrics.observe("mongo_operation_seconds", time.perf_counter() - start, method=name)
+            raise
+        elapsed = time.perf_counter() - start
+        if isinstance(result, Iterator):
+            return _timed_iterator(metrics, name, result, elapsed)
+        metrics.observe("mongo_operation_seconds", elapsed, method=name)
+        return result
+
+    return wrapper
@@ -0,0 +1,94 @@
+'''
+Author: Munir Mohamed Hafeel
+Date: 10-18-2026
+
+Copy the per-day "<sensor>-YYYY-MM-DD" collections into one time-series
+collection per sensor (storage.TimeSeriesStorage) or into bucketed documents
+(storage.BucketStorage).
+
+    python migrate.py [--to timeseries|buckets] [--drop] [--batch-size 10000] [sensor ...]
+
+Finished days are recorded in the "migrations" collection and skipped on the
+next run. A day that was interrupted is cleared from the target and copied
+again (deleting time-series readings by timestamp needs MongoDB 7.0).
+'''
+
+import time
+import logging
+import argparse
+from datetime import datetime, timezone
+import db
+from storage import STORAGE_BACKENDS, DailyCollectionStorage
+
+
+def migrate_day(database, daily, target, sensor_type, date_str, batch_size=10000):
+    name = daily.collection_name(sensor_type, date_str)
+    migrations = database.migrations
+    migration_id = f"{target.name}:{name}"
+    state = migrations.find_one({"_id": migration_id})
+    if state and state.get("finished"):
+        return None
+    if state:
+        target.delete_day(sensor_type, date_str)
+    migrations.replace_one({"_id": migration_id}, {"started": datetime.now(timezone.utc)}, upsert=True)
+
+    count = 0
+    batch = []
+    for doc in database[name].find({}, {"_id": 0}, batch_size=batch_size):
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            target.write(sensor_type, batch, ordered=False)
+            count += len(batch)
+            batch = []
+    if batch:
+        target.write(sensor_type, batch, ordered=False)
+        count += len(batch)
+
+    migrations.update_one({"_id": migration_id}, {"$set": {"finished": datetime.now(timezone.utc), "count": count}})
+    return count
+
+
+def migrate(database, sensors, target="timeseries", batch_size=10000, drop=False, report=print):
+    daily = DailyCollectionStorage(database)
+    target = STORAGE_BACKENDS[target](database)
+    total = 0
+    started = time.monotonic()
+    for sensor_type in sensors:
+        for date_str in daily.list_dates(sensor_type):
+            day_started = time.monotonic()
+            count = migrate_day(database, daily, target, sensor_type, date_str, batch_size)
+            if count is None:
+                continue
+            total += count
+            report(f"{sensor_type}-{date_str}: {count} readings in {time.monotonic() - day_started:.1f}s")
+            if drop:
+                database[daily.collection_name(sensor_type, date_str)].drop()
+    elapsed = time.monotonic() - started
+    report(f"Migrated {total} readings in {elapsed:.1f}s ({total / elapsed if elapsed else 0:.0f}/s)")
+    for sensor_type in sensors:
+        report(f"{sensor_type}: {daily.storage_size(sensor_type) / 1e6:.1f} MB daily, "
+               f"{target.storage_size(sensor_type) / 1e6:.1f} MB {target.name}")
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate daily sensor collections to another storage layout")
+    parser.add_argument("sensors", nargs="*", help="sensor types to migrate (default: all)")
+    parser.add_argument("--to", choices=["timeseries", "buckets"], default="timeseries")
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--drop", action="store_true", help="drop each daily collection once it is copied")
+    args = parser.parse_args()
+
+    info = db.keys.run()
+    extractor = db.SensorDataExtractor(info.getauth("mongo"))
+    sensors = args.sensors or list(extractor.sensor_patterns)
+    try:
+        migrate(extractor.db, sensors, args.to, args.batch_size, args.drop, report=db.log)
+    except Exception as e:
+        db.log(f"Error migrating collections: {e}", level=logging.ERROR)
+    finally:
+        extractor.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+'''
+Author: Munir Mohamed Hafeel
+Date: 10-18-2026
+'''
+
+import heapq
+from datetime import datetime, date, timedelta
+
+
+def to_datetime(value, end_of_day=False):
+    # a bare date means the start of that day, or its last moment for end_of_day
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        value = value.strftime('%Y-%m-%d')
+    if len(value) == 10:
+        day = datetime.strptime(value, '%Y-%m-%d')
+        return day + timedelta(days=1, microseconds=-1) if end_of_day else day
+    return datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
+
+
+def dates_between(start, end):
+    # every "YYYY-MM-DD" from start's day to end's day, inclusive
+    day = to_datetime(start).date()
+    last = to_datetime(end).date()
+    dates = []
+    while day <= last:
+        dates.append(day.strftime('%Y-%m-%d'))
+        day += timedelta(days=1)
+    return dates
+
+
+def _open(query):
+    # runs on a pool thread: issuing the query and pulling the first batch is
+    # the slow part, the rest of the cursor is read lazily by the consumer
+    cursor = iter(query())
+    return next(cursor, None), cursor
+
+
+def _drain(future):
+    first, cursor = future.result()
+    if first is None:
+        return
+    yield first
+    yield from cursor
+
+
+def fan_out_merge(executor, queries, key=lambda doc: doc['timestamp']):
+    '''
+    Start every query on the executor at once and merge their (individually
+    sorted) results into one lazy iterator ordered by key.
+    '''
+    futures = [executor.submit(_open, query) for query in queries]
+    return heapq.merge(*[_drain(future) for future in futures], key=key)
@@ -0,0 +1,216 @@
+'''
+Author: Munir Mohamed Hafeel
+Date: 10-18-2026
+'''
+
+import time
+import threading
+from datetime import timedelta
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import BulkWriteError
+
+# coarsest last; seconds per bucket
+TIERS = [("minute", 60), ("hour", 3600), ("day", 86400)]
+
+
+def bucket_start(dt, tier):
+    if tier == "minute":
+        return dt.replace(second=0, microsecond=0)
+    if tier == "hour":
+        return dt.replace(minute=0, second=0, microsecond=0)
+    return dt.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def rollup_id(sensor_type, data_key, ts):
+    return f"{sensor_type}|{data_key}|{ts.isoformat()}"
+
+
+def accumulate(sensor_type, records, buckets=None):
+    # (tier, sensor, key, bucket) -> [count, sum, sum of squares, min, max]
+    buckets = {} if buckets is None else buckets
+    for record in records:
+        dt = record['timestamp']
+        for tier, _ in TIERS:
+            ts = bucket_start(dt, tier)
+            for data_key, value in record['data'].items():
+                stats = buckets.get((tier, sensor_type, data_key, ts))
+                if stats is None:
+                    buckets[(tier, sensor_type, data_key, ts)] = [1, value, value * value, value, value]
+                else:
+                    stats[0] += 1
+                    stats[1] += value
+                    stats[2] += value * value
+                    stats[3] = value if value < stats[3] else stats[3]
+                    stats[4] = value if value > stats[4] else stats[4]
+    return buckets
+
+
+def merge_stats(buckets, key, stats):
+    current = buckets.get(key)
+    if current is None:
+        buckets[key] = list(stats)
+    else:
+        current[0] += stats[0]
+        current[1] += stats[1]
+        current[2] += stats[2]
+        current[3] = min(current[3], stats[3])
+        current[4] = max(current[4], stats[4])
+
+
+def summarize(doc):
+    count = doc["count"]
+    variance = (doc["sumsq"] - doc["sum"] ** 2 / count) / (count - 1) if count > 1 else None
+    return {
+        "timestamp": doc["ts"],
+        "count": count,
+        "average": doc["sum"] / count,
+        "min": doc["min"],
+        "max": doc["max"],
+        "standard_deviation": max(variance, 0.0) ** 0.5 if variance is not None else None
+    }
+
+
+class RollupStore:
+    '''
+    count/sum/sum-of-squares/min/max per sensor and data key at minute, hour
+    and day resolution, one collection per tier. Ingest adds to in-memory
+    deltas that are merged into the stored buckets with $inc/$min/$max.
+    Deltas a flush could not write stay pending and are retried, after a
+    growing delay, by a later flush.
+    '''
+
+    def __init__(self, db, flush_every=5000, flush_interval=10.0, retry_interval=5.0, report=print):
+        self.collections = {tier: db[f"rollup_{tier}"] for tier, _ in TIERS}
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.pending = {}
+        self.updates = 0
+        self.last_flush = time.monotonic()
+        self.retry_interval = retry_interval
+        self.report = report
+        self.failures = 0
+        self.retry_at = 0.0
+        self.lock = threading.Lock()
+        self.indexed = False
+
+    def _ensure_indexes(self):
+        if not self.indexed:
+            for collection in self.collections.values():
+                collection.create_index([("sensor", ASCENDING), ("key", ASCENDING), ("ts", ASCENDING)])
+            self.indexed = True
+
+    def update(self, sensor_type, records):
+        with self.lock:
+            accumulate(sensor_type, records, self.pending)
+            self.updates += len(records)
+            now = time.monotonic()
+            due = (self.updates >= self.flush_every or now - self.last_flush >= self.flush_interval) and now >= self.retry_at
+        if due:
+            self.flush()
+
+    def flush(self):
+        # never raises; returns False when some deltas could not be written
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.updates = 0
+            self.last_flush = time.monotonic()
+        if not pending:
+            return True
+        try:
+            self._ensure_indexes()
+        except Exception as e:
+            failed, error = pending, e
+        else:
+            failed, error = self._write(pending)
+        with self.lock:
+            for key, stats in failed.items():
+                merge_stats(self.pending, key, stats)
+            if failed:
+                self.failures += 1
+                self.retry_at = time.monotonic() + min(self.retry_interval * 2 ** (self.failures - 1), 300.0)
+            else:
+                self.failures = 0
+                self.retry_at = 0.0
+        if failed:
+            self.report(f"Rollup flush failed, {len(failed)} of {len(pending)} bucket deltas kept for the next one: {error}")
+        return not failed
+
+    def _write(self, pending):
+        # (deltas not written, last error), per tier; after a BulkWriteError
+        # only the updates it lists failed, the others are already applied
+        operations = {tier: ([], []) for tier, _ in TIERS}
+        for key, (count, total, sumsq, low, high) in pending.items():
+            tier, sensor_type, data_key, ts = key
+            keys, ops = operations[tier]
+            keys.append(key)
+            ops.append(UpdateOne(
+                {"_id": rollup_id(sensor_type, data_key, ts)},
+                {
+                    "$setOnInsert": {"sensor": sensor_type, "key": data_key, "ts": ts},
+                    "$inc": {"count": count, "sum": total, "sumsq": sumsq},
+                    "$min": {"min": low},
+                    "$max": {"max": high}
+                },
+                upsert=True
+            ))
+        failed, error, unreachable = {}, None, False
+        for tier, (keys, ops) in operations.items():
+            if not ops:
+                continue
+            if unreachable:
+                # keep the other tiers without waiting on the database again
+                failed.update((key, pending[key]) for key in keys)
+                continue
+            try:
+                self.collections[tier].bulk_write(ops, ordered=False)
+            except BulkWriteError as e:
+                error = e
+                for write_error in e.details.get("writeErrors", []):
+                    key = keys[write_error["index"]]
+                    failed[key] = pending[key]
+            except Exception as e:
+                error, unreachable = e, True
+                failed.update((key, pending[key]) for key in keys)
+        return failed, error
+
+    def backfill(self, sensor_type, day_start, records):
+        # rebuild one day of every tier from scratch, replacing what was there;
+        # the records cover the deltas not flushed yet, so those are dropped
+        day_end = day_start + timedelta(days=1)
+        with self.lock:
+            for key in [key for key in self.pending if key[1] == sensor_type and day_start <= key[3] < day_end]:
+                del self.pending[key]
+        self._ensure_indexes()
+        buckets = accumulate(sensor_type, records)
+        for tier, collection in self.collections.items():
+            collection.delete_many({"sensor": sensor_type, "ts": {"$gte": day_start, "$lt": day_end}})
+            docs = [{
+                "_id": rollup_id(sensor_type, data_key, ts),
+                "sensor": sensor_type, "key": data_key, "ts": ts,
+                "count": count, "sum": total, "sumsq": sumsq, "min": low, "max": high
+            } for (t, _, data_key, ts), (count, total, sumsq, low, high) in buckets.items() if t == tier]
+            if docs:
+                collection.insert_many(docs, ordered=False)
+        return len(buckets)
+
+    def get(self, tier, sensor_type, data_key, ts):
+        return self.collections[tier].find_one({"_id": rollup_id(sensor_type, data_key, ts)})
+
+    def series(self, tier, sensor_type, data_key, start, end):
+        cursor = self.collections[tier].find(
+            {"sensor": sensor_type, "key": data_key, "ts": {"$gte": bucket_start(start, tier), "$lt": end}}
+        ).sort("ts", ASCENDING)
+        return [summarize(doc) for doc in cursor]
+
+    @staticmethod
+    def choose_tier(start, end, resolution=None, max_points=1000):
+        # coarsest tier no wider than the requested resolution, or, without
+        # one, the finest tier that still fits the range into max_points
+        span = (end - start).total_seconds()
+        if resolution is not None:
+            fitting = [tier for tier, seconds in TIERS if seconds <= resolution]
+            return fitting[-1] if fitting else TIERS[0][0]
+        for tier, seconds in TIERS:
+            if span / seconds <= max_points:
+                return tier
+        return TIERS[-1][0]
@@ -0,0 +1,194 @@
+'''
+Author: Munir Mohamed Hafeel
+Date: 10-18-2026
+'''
+
+import os
+import json
+import time
+import threading
+
+# ideal (low, high) per data key, used by score() and SensorDataExtractor.magic
+IDEAL_RANGES = {
+    "temperature": (20, 27),
+    "humidity": (40, 70),
+    "co2": (350, 700),
+    "pH": (5.3, 6.8),
+    "EC": (1200, 1800),
+    "o2": (35, 80),
+}
+
+# which rule drives which relay depends on the wiring, so the rules live in a
+# file of their own; rules.example.json is a starting point, not the farm's setup
+RULES_CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rules.json')
+
+
+def score(values):
+    # +1 for every key inside its ideal range, -1 for every key outside it
+    total = 0
+    for key, value in values.items():
+        if key in IDEAL_RANGES:
+            low, high = IDEAL_RANGES[key]
+            total += 1 if low <= value <= high else -1
+    return total
+
+
+class Rule:
+    '''
+    Wants `device` on while sensor/key is above `above` (or below `below`).
+    Once active it only lets go when the value is `hysteresis` back on the
+    other side of the threshold, so readings hovering around it do not make
+    the device flap.
+    '''
+
+    def __init__(self, name, sensor, key, device, above=None, below=None, hysteresis=0.0):
+        if (above is None) == (below is None):
+            raise ValueError(f"rule {name!r} needs exactly one of above or below")
+        self.name = name
+        self.sensor = sensor
+        self.key = key
+        self.device = device
+        self.above = above
+        self.below = below
+        self.hysteresis = hysteresis
+        self.active = False
+
+    def update(self, value):
+        if self.above is not None:
+            if value > self.above:
+                self.active = True
+            elif value < self.above - self.hysteresis:
+                self.active = False
+        else:
+            if value < self.below:
+                self.active = True
+            elif value > self.below + self.hysteresis:
+                self.active = False
+        return self.active
+
+
+def load_rules(path=RULES_CONFIG):
+    # {"rules": [{"name", "sensor", "key", "device", "above" or "below", "hysteresis"}]};
+    # raises ValueError naming the first bad rule
+    with open(path) as file:
+        config = json.load(file)
+    rules = []
+    for entry in config.get("rules", []):
+        for field in ("name", "sensor", "key", "device"):
+            if field not in entry:
+                raise ValueError(f"rule {entry.get('name')!r} in {path} has no {field}")
+        unknown = set(entry) - {"name", "sensor", "key", "device", "above", "below", "hysteresis"}
+        if unknown:
+            raise ValueError(f"rule {entry['name']!r} in {path} has unknown fields {sorted(unknown)}")
+        rules.append(Rule(**entry))
+    if not rules:
+        raise ValueError(f"{path} defines no rules")
+    return rules
+
+
+class RuleEngine:
+    '''
+    Evaluates rules as live readings arrive. Rules are indexed by (sensor,
+    key), so a reading only touches the rules that watch it, and a device is
+    re-decided only when one of its rules saw a new value. A device is on
+    while any of its rules is active. The controller does not report device
+    states, so a device is only switched off after its rules switched it on;
+    until then it is left as it is. Changes are sent through `send` (e.g.
+    CommandDispatcher.send) in one batch per reading; a device changed less
+    than `debounce` seconds ago is held back and sent by the timer thread
+    once the interval is over, if the change is still wanted.
+    '''
+
+    def __init__(self, send, rules, debounce=10.0, interval=1.0, report=print):
+        self.send = send
+        self.rules = rules
+        self.debounce = debounce
+        self.interval = interval
+        self.report = report
+        self.by_key = {}
+        self.by_device = {}
+        for rule in self.rules:
+            self.by_key.setdefault((rule.sensor, rule.key), []).append(rule)
+            self.by_device.setdefault(rule.device, []).append(rule)
+        self.values = {}
+        self.desired = {}
+        self.commanded = {}
+        self.last_sent = {}
+        self.listeners = []
+        self.lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="rule-engine", daemon=True)
+        self._thread.start()
+        return self
+
+    def observe(self, sensor_type, records):
+        # extractor listener: (sensor_type, records) for every live reading
+        devices = set()
+        with self.lock:
+            for record in records:
+                for key, value in record['data'].items():
+                    self.values[key] = value
+                    for rule in self.by_key.get((sensor_type, key), ()):
+                        rule.update(value)
+                        devices.add(rule.device)
+            for device in devices:
+                state = "on" if any(rule.active for rule in self.by_device[device]) else "off"
+                if state == "off" and device not in self.desired:
+                    # no rule wanted it on yet, e.g. the first readings after a start
+                    continue
+                self.desired[device] = state
+        if devices:
+            self._dispatch()
+
+    def _dispatch(self):
+        now = time.monotonic()
+        with self.lock:
+            changes = {
+                device: state for device, state in self.desired.items()
+                if self.commanded.get(device) != state and now - self.last_sent.get(device, float("-inf")) >= self.debounce
+            }
+            for device, state in changes.items():
+                self.commanded[device] = state
+                self.last_sent[device] = now
+            reasons = {device: [rule.name for rule in self.by_device[device] if rule.active] for device in changes}
+        if not changes:
+            return
+        try:
+            self.send(changes)
+        except Exception as e:
+            self.report(f"Rule engine could not send {changes}: {e}")
+            with self.lock:
+                for device in changes:
+                    self.commanded.pop(device, None)
+            return
+        for device, state in changes.items():
+            for listener in self.listeners:
+                listener(device, state, reasons[device])
+
+    def _run(self):
+        # picks up changes that were held back by the debounce interval
+        while not self._stop.wait(self.interval):
+            self._dispatch()
+
+    def score(self):
+        with self.lock:
+            return score(self.values)
+
+    def status(self):
+        with self.lock:
+            return {
+                "score": score(self.values),
+                "values": dict(self.values),
+                "rules": [{"name": rule.name, "sensor": rule.sensor, "key": rule.key, "device": rule.device,
+                           "above": rule.above, "below": rule.below, "active": rule.active} for rule in self.rules],
+                "devices": {device: {"desired": self.desired.get(device), "commanded": self.commanded.get(device)}
+                            for device in self.by_device}
+            }
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
@@ -0,0 +1,86 @@
+'''
+Author: Munir Mohamed Hafeel
+Date: 10-18-2026
+'''
+
+import os
+import re
+import json
+from datetime import datetime
+
+TIMESTAMP_PATTERN = r'(\d{4}-\d{2}-\d{2}, \d{2}:\d{2}:\d{2})'
+TIMESTAMP_FORMAT = '%Y-%m-%d, %H:%M:%S'
+
+# sensor definitions (topic, pattern, data_keys, metadata, optional storage)
+# live in sensors.json; sensor_registry.SensorRegistry reloads them at runtime
+SENSOR_CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sensors.json')
+
+
+def load_sensor_config(path=SENSOR_CONFIG):
+    with open(path) as file:
+        return json.load(file)
+
+
+SENSOR_PATTERNS = load_sensor_config()["sensors"]
+
+
+def parse_timestamp(timestamp):
+    # fixed layout "YYYY-MM-DD, HH:MM:SS", much cheaper than strptime
+    return datetime(int(timestamp[0:4]), int(timestamp[5:7]), int(timestamp[8:10]),
+                    int(timestamp[12:14]), int(timestamp[15:17]), int(timestamp[18:20]))
+
+
+class SensorLineParser:
+    '''
+    Shared parsing engine for serial log lines and MQTT payloads. All sensor
+    patterns are compiled into one alternation so a line is scanned once, and
+    the decoded timestamp is reused while consecutive lines share the same second.
+    '''
+
+    def __init__(self, sensor_patterns):
+        self.timestamp_regex = re.compile(TIMESTAMP_PATTERN)
+        self.sensors = {}
+        alternatives = []
+        group_index = 1
+        for i, (sensor, sensor_info) in enumerate(sensor_patterns.items()):
+            name = f"s{i}"
+            inner_groups = re.compile(sensor_info['pattern']).groups
+            alternatives.append(f"(?P<{name}>{sensor_info['pattern']})")
+            # inner groups follow the named wrapper group in the combined pattern
+            self.sensors[name] = (sensor, sensor_info['metadata'], sensor_info['data_keys'],
+                                  group_index, group_index + inner_groups)
+            group_index += inner_groups + 1
+        self.sensor_regex = re.compile('|'.join(alternatives))
+        self._last_second = (None, None)
+
+    def parse_timestamp(self, timestamp):
+        # one tuple so concurrent callers never see a mismatched pair
+        last_timestamp, last_dt = self._last_second
+        if timestamp == last_timestamp:
+            return last_dt
+        dt = parse_timestamp(timestamp)
+        self._last_second = (timestamp, dt)
+        return dt
+
+    def parse(self, line):
+        timestamp_match = self.timestamp_regex.search(line)
+        if not timestamp_match:
+            return []
+
+        dt = self.parse_timestamp(timestamp_match.group(1))
+        results = []
+        seen = set()
+        for match in self.sensor_regex.finditer(line):
+            name = match.lastgroup
+            if name in seen:
+                continue
+            seen.add(name)
+            sensor, metadata, data_keys, start, end = self.sensors[name]
+            groups = match.groups()[start:end]
+            record = {
+                "metadata": metadata,
+                "timestamp": dt,
+                "data": {k: float(v) for k, v in zip(data_keys, groups)}
+            }
+            results.append((sensor, record))
+        return results
@@ -0,0 +1,125 @@
+'''
+Author: Munir Mohamed Hafeel
+Date: 10-18-2026
+'''
+
+import os
+import re
+import threading
+from sensor_parser import SENSOR_CONFIG, SensorLineParser, load_sensor_config
+
+
+def validate(config, storage_backends=None):
+    # raises ValueError naming the first bad definition
+    sensors = config.get("sensors")
+    if not sensors:
+        raise ValueError("sensor config defines no sensors")
+    for sensor, info in sensors.items():
+        for field in ("topic", "pattern", "data_keys", "metadata"):
+            if field not in info:
+                raise ValueError(f"sensor {sensor!r} has no {field}")
+        try:
+            groups = re.compile(info["pattern"]).groups
+        except re.error as e:
+            raise ValueError(f"sensor {sensor!r} has an invalid pattern: {e}")
+        if groups != len(info["data_keys"]):
+            raise ValueError(f"sensor {sensor!r} pattern has {groups} groups for {len(info['data_keys'])} data keys")
+        if storage_backends is not None and info.get("storage", None) not in (None, *storage_backends):
+            raise ValueError(f"sensor {sensor!r} uses unknown storage {info['storage']!r}")
+
+
+class _Snapshot:
+    # one loaded config; replaced as a whole on reload so readers never see a mix
+    def __init__(self, config):
+        self.sensors = config["sensors"]
+        self.fallback_topics = list(config.get("fallback_topics", []))
+        by_topic = {}
+        for sensor, info in self.sensors.items():
+            topics = info["topic"] if isinstance(info["topic"], list) else [info["topic"]]
+            for topic in topics:
+                by_topic.setdefault(topic, {})[sensor] = info
+        self.parsers = {topic: SensorLineParser(sensors) for topic, sensors in by_topic.items()}
+        self.parser = SensorLineParser(self.sensors)
+        self.topics = list(by_topic) + [t for t in self.fallback_topics if t not in by_topic]
+
+
+class SensorRegistry:
+    '''
+    Sensor definitions loaded from sensors.json. A message is parsed only with
+    the patterns of the sensors published on its topic, found with one dict
+    lookup, so adding a sensor costs nothing for the others. Messages on any
+    other topic (fallback_topics are subscribed to without a sensor of their
+    own) or without one (serial logs) are tested against every sensor.
+    reload() picks up edits to the file; a file that does not load or
+    validate is reported and the current definitions stay in use.
+    '''
+
+    def __init__(self, path=SENSOR_CONFIG, storage_backends=None, report=print):
+        self.path = path
+        self.storage_backends = storage_backends
+        self.report = report
+        self.listeners = []
+        self._mtime = None
+        self._snapshot = None
+        self._stop = threading.Event()
+        self._thread = None
+        self.reload(force=True)
+
+    @property
+    def sensors(self):
+        return self._snapshot.sensors
+
+    @property
+    def parser(self):
+        return self._snapshot.parser
+
+    def topics(self):
+        return self._snapshot.topics
+
+    def storage(self, sensor_type):
+        info = self._snapshot.sensors.get(sensor_type)
+        return info.get("storage") if info else None
+
+    def parse(self, line, topic=None):
+        snapshot = self._snapshot
+        return snapshot.parsers.get(topic, snapshot.parser).parse(line)
+
+    def reload(self, force=False):
+        # True when new definitions were loaded
+        mtime = os.stat(self.path).st_mtime
+        if not force and mtime == self._mtime:
+            return False
+        try:
+            config = load_sensor_config(self.path)
+            validate(config, self.storage_backends)
+            snapshot = _Snapshot(config)
+        except (OSError, ValueError) as e:
+            if self._snapshot is None:
+                raise
+            self.report(f"Keeping current sensor definitions, {self.path} did not load: {e}")
+            self._mtime = mtime
+            return False
+        self._snapshot = snapshot
+        self._mtime = mtime
+        for listener in self.listeners:
+            listener(self)
+        return True
+
+    def watch(self, interval=5.0):
+        # check the file for changes in the background
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    if self.reload():
+                        self.report(f"Reloaded sensor definitions from {self.path}")
+                except OSError as e:
+                    self.report(f"Could not check {self.path}: {e}")
+
+        self._thread = threading.Thread(target=run, name="sensor-registry", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
@@ -0,0 +1,258 @@
+'''
+Author: Munir Mohamed Hafeel
+Date: 10-18-2026
+'''
+
+import os
+import json
+import mmap
+import zlib
+import struct
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    # no advisory locks on Windows; run one process per spool directory there
+    fcntl = None
+from bson import ObjectId, decode, encode
+from pymongo.errors import BulkWriteError
+
+# every entry is: payload length, CRC32 of the payload, payload (BSON)
+HEADER = struct.Struct("<II")
+
+
+class SegmentLog:
+    '''
+    Append-only log of BSON entries in fixed-size, memory-mapped segment
+    files named after the log offset they start at. commit(offset) records
+    how far a reader has consumed (commit.json, replaced atomically) and
+    deletes segments that lie entirely before it. On open, the tail segment
+    is scanned up to the first empty or corrupt entry, so an entry torn by a
+    crash is dropped and overwritten. The directory is locked while the log
+    is open, so a second process fails instead of writing over the segments.
+    '''
+
+    def __init__(self, directory, segment_bytes=64 * 1024 * 1024):
+        os.makedirs(directory, exist_ok=True)
+        self._lock_file = self._lock(directory)
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.lock = threading.Lock()
+        self.committed = self._load_commit()
+        bases = self._bases()
+        self._open_tail(bases[-1] if bases else self.committed)
+
+    @staticmethod
+    def _lock(directory):
+        lock_file = open(os.path.join(directory, "lock"), 'w')
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_file.close()
+                raise RuntimeError(f"spool directory {directory} is in use by another process")
+        return lock_file
+
+    def _path(self, base):
+        return os.path.join(self.directory, f"{base:020d}.seg")
+
+    def _bases(self):
+        return sorted(int(name[:-4]) for name in os.listdir(self.directory) if name.endswith(".seg"))
+
+    def _load_commit(self):
+        try:
+            with open(os.path.join(self.directory, "commit.json")) as file:
+                return json.load(file)["offset"]
+        except (OSError, ValueError, KeyError):
+            return 0
+
+    def _open_tail(self, base):
+        path = self._path(base)
+        open(path, 'ab').close()
+        self.file = open(path, 'r+b')
+        if os.path.getsize(path) < self.segment_bytes:
+            self.file.truncate(self.segment_bytes)
+        self.map = mmap.mmap(self.file.fileno(), self.segment_bytes)
+        self.base = base
+        self.position = self._scan(self.map, self.segment_bytes)
+        if self.position + HEADER.size <= self.segment_bytes and HEADER.unpack_from(self.map, self.position)[0]:
+            # torn entry from a crash: clear it so it is never read back
+            self.map[self.position:] = bytes(self.segment_bytes - self.position)
+            self.map.flush()
+
+    @staticmethod
+    def _scan(buffer, size, start=0, entries=None):
+        # end of the valid entries from start; appends (end, payload) to entries if given
+        position = start
+        while position + HEADER.size <= size:
+            length, crc = HEADER.unpack_from(buffer, position)
+            end = position + HEADER.size + length
+            if length == 0 or end > size:
+                break
+            payload = bytes(buffer[position + HEADER.size:end])
+            if zlib.crc32(payload) != crc:
+                break
+            if entries is not None:
+                entries.append((end, payload))
+            position = end
+        return position
+
+    def end(self):
+        return self.base + self.position
+
+    def append(self, payloads):
+        with self.lock:
+            for payload in payloads:
+                size = HEADER.size + len(payload)
+                if size > self.segment_bytes:
+                    raise ValueError(f"entry of {len(payload)} bytes does not fit in a spool segment")
+                if self.position + size > self.segment_bytes:
+                    self._roll()
+                HEADER.pack_into(self.map, self.position, len(payload), zlib.crc32(payload))
+                self.map[self.position + HEADER.size:self.position + size] = payload
+                self.position += size
+            self.map.flush()
+            return self.end()
+
+    def _roll(self):
+        base = self.end()
+        self.map.close()
+        self.file.close()
+        self._open_tail(base)
+
+    def read(self, offset, max_entries):
+        # [(end_offset, payload)] of up to max_entries entries after offset, in order
+        entries = []
+        with self.lock:
+            bases = self._bases()
+            tail_base, tail_map, tail_position = self.base, self.map, self.position
+            for i, base in enumerate(bases):
+                next_base = bases[i + 1] if i + 1 < len(bases) else None
+                if next_base is not None and next_base <= offset:
+                    continue
+                start = max(offset - base, 0)
+                found = []
+                if base == tail_base:
+                    self._scan(tail_map, tail_position, start, found)
+                else:
+                    with open(self._path(base), 'rb') as file:
+                        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as segment:
+                            self._scan(segment, len(segment), start, found)
+                entries.extend((base + end, payload) for end, payload in found)
+                if len(entries) >= max_entries:
+                    break
+        return entries[:max_entries]
+
+    def commit(self, offset):
+        path = os.path.join(self.directory, "commit.json")
+        with open(path + ".tmp", 'w') as file:
+            json.dump({"offset": offset}, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(path + ".tmp", path)
+        with self.lock:
+            self.committed = offset
+            bases = self._bases()
+            for base, next_base in zip(bases, bases[1:]):
+                if next_base <= offset and base != self.base:
+                    os.remove(self._path(base))
+
+    def close(self):
+        with self.lock:
+            self.map.flush()
+            self.map.close()
+            self.file.close()
+            self._lock_file.close()
+
+
+class Spool:
+    '''
+    Store-and-forward for readings the database could not take. put() appends
+    them to a SegmentLog; a replay thread writes them back in batches of up
+    to batch_size, in the order they were spooled, and commits the log offset
+    only after a whole batch is written. Until then the batch is retried with
+    a growing delay. Every reading gets its _id before it is spooled, so a
+    batch replayed twice (after a crash between write and commit) only hits
+    duplicate key errors, which are treated as already written.
+    '''
+
+    def __init__(self, write, directory="spool", batch_size=5000, retry_interval=5.0, report=print):
+        self.write = write
+        self.log = SegmentLog(directory)
+        self.batch_size = batch_size
+        self.retry_interval = retry_interval
+        self.report = report
+        self.spooled = 0
+        self.replayed = 0
+        self.failures = 0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="spool-replay", daemon=True)
+
+    def start(self):
+        if self.pending():
+            self.report(f"Spool has {self.pending_bytes()} bytes left from a previous run, replaying")
+        self._thread.start()
+        return self
+
+    def pending(self):
+        return self.log.committed < self.log.end()
+
+    def pending_bytes(self):
+        return self.log.end() - self.log.committed
+
+    def put(self, sensor_type, records):
+        for record in records:
+            record.setdefault("_id", ObjectId())
+        self.log.append([encode({"s": sensor_type, "r": record}) for record in records])
+        self.spooled += len(records)
+        self._wake.set()
+
+    def _write_group(self, sensor_type, records):
+        try:
+            self.write(sensor_type, records)
+        except BulkWriteError as e:
+            if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                raise
+
+    def _run(self):
+        delay = self.retry_interval
+        while not self._stop.is_set():
+            entries = self.log.read(self.log.committed, self.batch_size)
+            if not entries:
+                self._wake.wait(1.0)
+                self._wake.clear()
+                continue
+            groups = {}
+            for _, payload in entries:
+                entry = decode(payload)
+                groups.setdefault(entry["s"], []).append(entry["r"])
+            try:
+                for sensor_type, records in groups.items():
+                    self._write_group(sensor_type, records)
+            except Exception as e:
+                self.failures += 1
+                self.report(f"Spool replay of {len(entries)} readings failed, retrying in {delay:.0f}s: {e}")
+                self._stop.wait(delay)
+                delay = min(delay * 2, 60.0)
+                continue
+            delay = self.retry_interval
+            self.log.commit(entries[-1][0])
+            self.replayed += len(entries)
+
+    def stats(self):
+        return {
+            "pending_bytes": self.pending_bytes(),
+            "spooled": self.spooled,
+            "replayed": self.replayed,
+            "failures": self.failures
+        }
+
+    def close(self):
+        # whatever is not replayed yet stays in the log for the next start
+        self._stop.set()
+        self._wake.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self.log.close()
@@ -0,0 +1,441 @@
+'''
+Author: Munir Mohamed Hafeel
+Date: 10-18-2026
+'''
+
+import re
+from datetime import datetime, timedelta
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import BulkWriteError, CollectionInvalid, DuplicateKeyError, OperationFailure
+
+
+def day_bounds(date_str):
+    start = datetime.strptime(date_str, '%Y-%m-%d')
+    return start, start + timedelta(days=1)
+
+
+def collection_size(db, collection_name):
+    # bytes on disk, including indexes; 0 for a collection that does not exist
+    try:
+        stats = db.command("collStats", collection_name)
+    except OperationFailure:
+        return 0
+    return stats.get("storageSize", 0) + stats.get("totalIndexSize", 0)
+
+
+def without_rejected(records, error):
+    # the records of an unordered insert_many that were stored despite the error
+    rejected = {write_error["index"] for write_error in error.details.get("writeErrors", [])}
+    return [record for i, record in enumerate(records) if i not in rejected]
+
+
+def split_collection_name(collection_name):
+    # "<sensor>-YYYY-MM-DD"; sensor names may themselves contain dashes
+    return collection_name[:-11], collection_name[-10:]
+
+
+class DailyCollectionStorage:
+    '''
+    The original layout: one collection per sensor per day, "<sensor>-YYYY-MM-DD".
+    With idempotent writes each day gets a unique (sensor, timestamp) index
+    and duplicate inserts are ignored. insert_one and write report what was
+    actually stored, so summaries skip the duplicates.
+    '''
+
+    name = "daily"
+
+    def __init__(self, db, idempotent=False, report=print):
+        self.db = db
+        self.idempotent = idempotent
+        self.report = report
+        self._indexed_collections = set()
+
+    def collection_name(self, sensor_type, date_str):
+        return f"{sensor_type}-{date_str}"
+
+    def _collection(self, collection_name):
+        collection = self.db[collection_name]
+        if self.idempotent and collection_name not in self._indexed_collections:
+            try:
+                collection.create_index([("metadata.sensor", ASCENDING), ("timestamp", ASCENDING)], unique=True)
+            except OperationFailure as e:
+                self.report(f"Could not create unique index on {collection_name}: {e}")
+            self._indexed_collections.add(collection_name)
+        return collection
+
+    def insert_one(self, sensor_type, record):
+        # False when the reading was already stored
+        collection_name = self.collection_name(sensor_type, record['timestamp'].strftime('%Y-%m-%d'))
+        try:
+            self._collection(collection_name).insert_one(record)
+        except DuplicateKeyError:
+            if not self.idempotent:
+                raise
+            return False
+        return True
+
+    def write(self, sensor_type, records, ordered=True, skip_duplicates=None):
+        # returns the records that were stored; skip_duplicates (default: the
+        # idempotent setting) ignores records whose _id or key already exists.
+        # Unordered writes still try every day after one of them fails.
+        skip = self.idempotent if skip_duplicates is None else skip_duplicates
+        date_groups = {}
+        for record in records:
+            collection_name = self.collection_name(sensor_type, record['timestamp'].strftime('%Y-%m-%d'))
+            date_groups.setdefault(collection_name, []).append(record)
+        inserted = []
+        failure = None
+        for collection_name, group in date_groups.items():
+            try:
+                inserted.extend(self._insert_many(collection_name, group, ordered, skip))
+            except Exception as e:
+                if ordered:
+                    raise
+                failure = failure or e
+        if failure is not None:
+            raise failure
+        return inserted
+
+    def _insert_many(self, collection_name, records, ordered=True, skip_duplicates=False):
+        collection = self._collection(collection_name)
+        try:
+            collection.insert_many(records, ordered=ordered and not skip_duplicates)
+        except BulkWriteError as e:
+            # duplicates of already imported readings are expected on replay
+            errors = e.details.get("writeErrors", [])
+            if not skip_duplicates or any(error.get("code") != 11000 for error in errors):
+                raise
+            return without_rejected(records, e)
+        return records
+
+    def source(self, sensor_type, date_str):
+        # (collection, stages) where the stages turn the collection into the
+        # day's reading documents: {metadata, timestamp, data}
+        return self.db[self.collection_name(sensor_type, date_str)], []
+
+    def union_source(self, sensor_type, date_strs, pipeline):
+        # one aggregation over several days; pipeline runs on every day before the union
+        names = [self.collection_name(sensor_type, date_str) for date_str in date_strs]
+        stages = list(pipeline) + [{"$unionWith": {"coll": name, "pipeline": list(pipeline)}} for name in names[1:]]
+        return self.db[names[0]], stages
+
+    def count(self, sensor_type, date_str):
+        return self.db[self.collection_name(sensor_type, date_str)].estimated_document_count()
+
+    def list_dates(self, sensor_type):
+        pattern = f"^{re.escape(sensor_type)}-\\d{{4}}-\\d{{2}}-\\d{{2}}$"
+        names = self.db.list_collection_names(filter={"name": {"$regex": pattern}})
+        return sorted(split_collection_name(name)[1] for name in names)
+
+    def latest_date(self, sensor_type):
+        dates = self.list_dates(sensor_type)
+        return dates[-1] if dates else None
+
+    def storage_size(self, sensor_type):
+        return sum(collection_size(self.db, self.collection_name(sensor_type, date_str))
+                   for date_str in self.list_dates(sensor_type))
+
+
+class TimeSeriesStorage:
+    '''
+    One MongoDB time-series collection per sensor family, "<sensor>_ts", with
+    metadata as the metaField and an index on (metadata.sensor, timestamp).
+    Day-based queries become timestamp ranges on that collection, served by
+    a timestamp index. Time-series collections do not support unique indexes:
+    idempotent writes look up the batch's (sensor, timestamp) keys first and
+    leave out readings already stored. The lookup and the insert are not
+    atomic, two processes storing the same reading at once can both store it.
+    '''
+
+    name = "timeseries"
+
+    def __init__(self, db, idempotent=False, report=print, granularity="seconds"):
+        self.db = db
+        self.idempotent = idempotent
+        self.report = report
+        self.granularity = granularity
+        self._ready = set()
+
+    def collection_name(self, sensor_type, date_str=None):
+        return f"{sensor_type}_ts"
+
+    def collection(self, sensor_type):
+        name = self.collection_name(sensor_type)
+        if name not in self._ready:
+            try:
+                self.db.create_collection(name, timeseries={
+                    "timeField": "timestamp", "metaField": "metadata", "granularity": self.granularity
+                })
+            except CollectionInvalid:
+                pass
+            self.db[name].create_index([("metadata.sensor", ASCENDING), ("timestamp", ASCENDING)])
+            self.db[name].create_index([("timestamp", ASCENDING)])
+            self._ready.add(name)
+        return self.db[name]
+
+    @staticmethod
+    def _new(collection, records):
+        # the records whose (sensor, timestamp) is neither stored nor earlier in the batch
+        stored = collection.find({"timestamp": {"$in": list({record['timestamp'] for record in records})}},
+                                 {"_id": 0, "metadata.sensor": 1, "timestamp": 1})
+        seen = {(doc.get("metadata", {}).get("sensor"), doc["timestamp"]) for doc in stored}
+        new = []
+        for record in records:
+            key = (record.get("metadata", {}).get("sensor"), record['timestamp'])
+            if key not in seen:
+                seen.add(key)
+                new.append(record)
+        return new
+
+    def insert_one(self, sensor_type, record):
+        # False when the reading was already stored (idempotent only)
+        collection = self.collection(sensor_type)
+        if self.idempotent and not self._new(collection, [record]):
+            return False
+        collection.insert_one(record)
+        return True
+
+    def write(self, sensor_type, records, ordered=True, skip_duplicates=None):
+        # returns the records that were stored; skip_duplicates (default: the
+        # idempotent setting) leaves out readings that are already stored
+        collection = self.collection(sensor_type)
+        if self.idempotent if skip_duplicates is None else skip_duplicates:
+            records = self._new(collection, records)
+        if records:
+            collection.insert_many(records, ordered=ordered)
+        return records
+
+    def source(self, sensor_type, date_str):
+        start, end = day_bounds(date_str)
+        return self.collection(sensor_type), [{"$match": {"timestamp": {"$gte": start, "$lt": end}}}]
+
+    def union_source(self, sensor_type, date_strs, pipeline):
+        ranges = []
+        for date_str in date_strs:
+            start, end = day_bounds(date_str)
+            ranges.append({"timestamp": {"$gte": start, "$lt": end}})
+        return self.collection(sensor_type), [{"$match": {"$or": ranges}}] + list(pipeline)
+
+    def count(self, sensor_type, date_str):
+        start, end = day_bounds(date_str)
+        return self.collection(sensor_type).count_documents({"timestamp": {"$gte": start, "$lt": end}})
+
+    def list_dates(self, sensor_type):
+        days = self.collection(sensor_type).aggregate([
+            {"$group": {"_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$timestamp"}}}},
+            {"$sort": {"_id": 1}}
+        ])
+        return [day["_id"] for day in days]
+
+    def latest_date(self, sensor_type):
+        latest = self.collection(sensor_type).find_one({}, sort=[("timestamp", DESCENDING)])
+        return latest['timestamp'].strftime('%Y-%m-%d') if latest else None
+
+    def delete_day(self, sensor_type, date_str):
+        start, end = day_bounds(date_str)
+        self.collection(sensor_type).delete_many({"timestamp": {"$gte": start, "$lt": end}})
+
+    def storage_size(self, sensor_type):
+        return collection_size(self.db, self.collection_name(sensor_type))
+
+
+class BucketStorage:
+    '''
+    Bucket pattern: one document per sensor per minute (or hour) of readings,
+    "<sensor>_buckets". The metadata is stored once, timestamps as second
+    offsets from the bucket start ("o") and each data key as an array of
+    values ("v"). A chunk of readings is appended to a bucket of its start
+    that still has room for all of it, or opens a new one, so no bucket holds
+    more than max_count. Readers get the usual {metadata, timestamp, data}
+    documents back through an $unwind stage. Idempotent writes first read the
+    offsets stored for the buckets they touch and leave out readings already
+    there; as with time-series, the read and the append are not atomic.
+    '''
+
+    name = "buckets"
+
+    def __init__(self, db, idempotent=False, report=print, span="minute", max_count=1000):
+        self.db = db
+        self.idempotent = idempotent
+        self.report = report
+        self.span = span
+        self.max_count = max_count
+        self._ready = set()
+
+    def collection_name(self, sensor_type, date_str=None):
+        return f"{sensor_type}_buckets"
+
+    def collection(self, sensor_type):
+        name = self.collection_name(sensor_type)
+        if name not in self._ready:
+            self.db[name].create_index([("start", ASCENDING)])
+            self._ready.add(name)
+        return self.db[name]
+
+    def bucket_start(self, dt):
+        if self.span == "hour":
+            return dt.replace(minute=0, second=0, microsecond=0)
+        return dt.replace(second=0, microsecond=0)
+
+    def insert_one(self, sensor_type, record):
+        return bool(self.write(sensor_type, [record]))
+
+    def _new(self, collection, buckets):
+        # drops readings whose offset is stored in a bucket of the same start,
+        # or repeated in the batch; buckets is {start: [record, ...]}
+        stored = collection.find({"start": {"$in": list(buckets)}}, {"_id": 0, "start": 1, "o": 1})
+        seen = {(doc["start"], offset) for doc in stored for offset in doc.get("o", [])}
+        new = {}
+        for start, group in buckets.items():
+            for record in group:
+                key = (start, (record['timestamp'] - start).total_seconds())
+                if key not in seen:
+                    seen.add(key)
+                    new.setdefault(start, []).append(record)
+        return new
+
+    def write(self, sensor_type, records, ordered=True, skip_duplicates=None):
+        # returns the records that were stored; skip_duplicates (default: the
+        # idempotent setting) leaves out readings that are already stored
+        collection = self.collection(sensor_type)
+        buckets = {}
+        for record in records:
+            buckets.setdefault(self.bucket_start(record['timestamp']), []).append(record)
+        if self.idempotent if skip_duplicates is None else skip_duplicates:
+            buckets = self._new(collection, buckets)
+
+        operations = []
+        for start, group in buckets.items():
+            for i in range(0, len(group), self.max_count):
+                chunk = group[i:i + self.max_count]
+                values = {}
+                for record in chunk:
+                    for data_key, value in record['data'].items():
+                        values.setdefault(data_key, []).append(value)
+                operations.append(UpdateOne(
+                    # a bucket with room for the whole chunk, else a new one
+                    {"start": start, "n": {"$lte": self.max_count - len(chunk)}},
+                    {
+                        "$setOnInsert": {"metadata": chunk[0]['metadata']},
+                        "$inc": {"n": len(chunk)},
+                        "$push": {
+                            "o": {"$each": [(r['timestamp'] - start).total_seconds() for r in chunk]},
+                            **{f"v.{k}": {"$each": v} for k, v in values.items()}
+                        }
+                    },
+                    upsert=True
+                ))
+        if operations:
+            collection.bulk_write(operations, ordered=ordered)
+        return [record for group in buckets.values() for record in group]
+
+    def _unpack(self):
+        return [
+            {"$unwind": {"path": "$o", "includeArrayIndex": "i"}},
+            {"$project": {
+                "_id": 0,
+                "metadata": 1,
+                "timestamp": {"$add": ["$start", {"$multiply": ["$o", 1000]}]},
+                "data": {"$arrayToObject": {"$map": {
+                    "input": {"$objectToArray": "$v"},
+                    "as": "kv",
+                    "in": {"k": "$$kv.k", "v": {"$arrayElemAt": ["$$kv.v", "$i"]}}
+                }}}
+            }}
+        ]
+
+    def source(self, sensor_type, date_str):
+        start, end = day_bounds(date_str)
+        return self.collection(sensor_type), [{"$match": {"start": {"$gte": start, "$lt": end}}}] + self._unpack()
+
+    def union_source(self, sensor_type, date_strs, pipeline):
+        ranges = []
+        for date_str in date_strs:
+            start, end = day_bounds(date_str)
+            ranges.append({"start": {"$gte": start, "$lt": end}})
+        return self.collection(sensor_type), [{"$match": {"$or": ranges}}] + self._unpack() + list(pipeline)
+
+    def count(self, sensor_type, date_str):
+        start, end = day_bounds(date_str)
+        result = next(self.collection(sensor_type).aggregate([
+            {"$match": {"start": {"$gte": start, "$lt": end}}},
+            {"$group": {"_id": None, "n": {"$sum": "$n"}}}
+        ]), None)
+        return result["n"] if result else 0
+
+    def list_dates(self, sensor_type):
+        days = self.collection(sensor_type).aggregate([
+            {"$group": {"_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$start"}}}},
+            {"$sort": {"_id": 1}}
+        ])
+        return [day["_id"] for day in days]
+
+    def latest_date(self, sensor_type):
+        latest = self.collection(sensor_type).find_one({}, sort=[("start", DESCENDING)])
+        return latest['start'].strftime('%Y-%m-%d') if latest else None
+
+    def delete_day(self, sensor_type, date_str):
+        start, end = day_bounds(date_str)
+        self.collection(sensor_type).delete_many({"start": {"$gte": start, "$lt": end}})
+
+    def storage_size(self, sensor_type):
+        return collection_size(self.db, self.collection_name(sensor_type))
+
+
+class RoutedStorage:
+    '''
+    Per-sensor choice of backend: route(sensor_type) names the backend for a
+    sensor ("daily", "timeseries" or "buckets") or returns None for the
+    default. Every call is passed on to that backend, created on first use.
+    '''
+
+    name = "routed"
+
+    def __init__(self, db, idempotent=False, report=print, default="daily", route=None):
+        self.db = db
+        self.idempotent = idempotent
+        self.report = report
+        self.default = default
+        self.route = route or (lambda sensor_type: None)
+        self.backends = {}
+
+    def backend(self, sensor_type):
+        name = self.route(sensor_type) or self.default
+        backend = self.backends.get(name)
+        if backend is None:
+            backend = self.backends[name] = STORAGE_BACKENDS[name](self.db, self.idempotent, report=self.report)
+        return backend
+
+    def collection_name(self, sensor_type, date_str=None):
+        return self.backend(sensor_type).collection_name(sensor_type, date_str)
+
+    def insert_one(self, sensor_type, record):
+        return self.backend(sensor_type).insert_one(sensor_type, record)
+
+    def write(self, sensor_type, records, ordered=True, skip_duplicates=None):
+        return self.backend(sensor_type).write(sensor_type, records, ordered, skip_duplicates)
+
+    def source(self, sensor_type, date_str):
+        return self.backend(sensor_type).source(sensor_type, date_str)
+
+    def union_source(self, sensor_type, date_strs, pipeline):
+        return self.backend(sensor_type).union_source(sensor_type, date_strs, pipeline)
+
+    def count(self, sensor_type, date_str):
+        return self.backend(sensor_type).count(sensor_type, date_str)
+
+    def list_dates(self, sensor_type):
+        return self.backend(sensor_type).list_dates(sensor_type)
+
+    def latest_date(self, sensor_type):
+        return self.backend(sensor_type).latest_date(sensor_type)
+
+    def storage_size(self, sensor_type):
+        return self.backend(sensor_type).storage_size(sensor_type)
+
+
+STORAGE_BACKENDS = {
+    DailyCollectionStorage.name: DailyCollectionStorage,
+    TimeSeriesStorage.name: TimeSeriesStorage,
+    BucketStorage.name: BucketStorage
+}
@@ -0,0 +1,69 @@
+'''
+Author: Munir Mohamed Hafeel
+Date: 10-18-2026
+'''
+
+import os
+import json
+
+
+class Checkpoint:
+    '''
+    Byte offset of the last fully imported line of a log file, stored as JSON
+    next to the log. The file's inode is kept too so a rotated or truncated
+    log is read again from the start.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self, file_path):
+        try:
+            with open(self.path, 'r') as file:
+                state = json.load(file)
+        except (OSError, ValueError):
+            return 0
+
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return 0
+        if state.get("path") != os.path.abspath(file_path) or state.get("inode") != stat.st_ino:
+            return 0
+        if state.get("offset", 0) > stat.st_size:
+            return 0
+        return state["offset"]
+
+    def save(self, file_path, offset):
+        state = {
+            "path": os.path.abspath(file_path),
+            "inode": os.stat(file_path).st_ino,
+            "offset": offset
+        }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w') as file:
+            json.dump(state, file)
+        os.replace(tmp_path, self.path)
+
+
+def read_new_lines(file_path, offset, chunk_bytes=4 * 1024 * 1024):
+    # like bulk_import.read_chunks, but a trailing line that is still being
+    # written is left for the next pass instead of being returned half done
+    with open(file_path, 'rb') as file:
+        file.seek(offset)
+        while True:
+            data = file.read(chunk_bytes)
+            if not data:
+                return
+            end = data.rfind(b'\n')
+            if end == -1:
+                if len(data) < chunk_bytes:
+                    return
+                data += file.readline()
+                if not data.endswith(b'\n'):
+                    return
+                end = len(data) - 1
+            data = data[:end + 1]
+            offset += len(data)
+            file.seek(offset)
+            yield data.decode('utf-8', errors='replace'), offset
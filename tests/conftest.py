@@ -0,0 +1,24 @@
+'''
+Author: Munir Mohamed Hafeel
+Date: 10-18-2026
+'''
+
+import os
+import sys
+
+import pytest
+
+# the modules live at the repository root, one level up
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+
+@pytest.fixture
+def extractor(tmp_path, monkeypatch):
+    # a SensorDataExtractor on mongomock; db keeps its log under ./cwd, so it runs in tmp_path
+    mongomock = pytest.importorskip("mongomock")
+    monkeypatch.chdir(tmp_path)
+    import db
+    monkeypatch.setattr(db, "MongoClient", mongomock.MongoClient)
+    extractor = db.SensorDataExtractor("mongodb://localhost")
+    yield extractor
+    extractor.close()
@@ -0,0 +1,81 @@
+'''
+Author: Munir Mohamed Hafeel
+Date: 10-18-2026
+'''
+
+import statistics
+from datetime import datetime, timedelta
+
+import pytest
+
+from anomaly import AnomalyDetector, EwmaStats, RollingStats, compact_alert
+
+START = datetime(2026, 1, 1)
+
+
+def series(values, start=START, step=10):
+    # one record per value, `step` seconds apart; a steady series alternates 100/102
+    return [{"timestamp": start + timedelta(seconds=step * i), "data": {"co2": value}} for i, value in enumerate(values)]
+
+
+def steady(n):
+    return [100.0 + 2 * (i % 2) for i in range(n)]
+
+
+def test_rolling_stats_match_the_window():
+    stats = RollingStats(window=5)
+    values = [3.0, 9.0, 4.0, 7.0, 1.0, 8.0, 2.0, 6.0]
+    for value in values:
+        stats.add(value)
+    assert stats.n == 5
+    assert stats.mean == pytest.approx(statistics.mean(values[-5:]))
+    assert stats.std() == pytest.approx(statistics.stdev(values[-5:]))
+
+
+def test_ewma_of_a_constant_has_no_spread():
+    stats = EwmaStats(window=10)
+    for _ in range(50):
+        stats.add(5.0)
+    assert (stats.mean, stats.std()) == (5.0, 0.0)
+
+
+@pytest.mark.parametrize("method", ["window", "ewma"])
+def test_one_spike_one_alert(method):
+    detector = AnomalyDetector(method=method, window=50)
+    heard = []
+    detector.listeners.append(heard.append)
+    values = steady(60)
+    values[45] = 200.0
+    alerts = detector.observe("co2", series(values))
+    assert [(alert["value"], alert["timestamp"]) for alert in alerts] == [(200.0, START + timedelta(seconds=450))]
+    assert alerts[0]["z"] > 3
+    assert heard == alerts
+
+
+def test_no_alerts_during_warm_up():
+    detector = AnomalyDetector(min_samples=30)
+    values = steady(29) + [200.0]
+    assert detector.observe("co2", series(values)) == []
+    # the 31st reading is checked
+    assert len(detector.observe("co2", series([500.0], start=START + timedelta(seconds=300)))) == 1
+
+
+def test_keys_warm_up_separately():
+    detector = AnomalyDetector(min_samples=30)
+    detector.observe("co2", series(steady(40)))
+    assert detector.observe("o2", series([200.0])) == []
+
+
+def test_stuck_sensor_alerts_once_per_cooldown():
+    detector = AnomalyDetector(cooldown=60.0)
+    alerts = detector.observe("co2", series(steady(40) + [200.0] * 5))
+    assert len(alerts) == 1
+    assert detector.suppressed == 4
+    every = AnomalyDetector(cooldown=0)
+    assert len(every.observe("co2", series(steady(40) + [200.0] * 5))) == 5
+
+
+def test_compact_alert():
+    [alert] = AnomalyDetector().observe("co2", series(steady(40) + [200.0]))
+    assert compact_alert(alert) == {"s": "co2", "k": "co2", "t": START + timedelta(seconds=400), "v": 200.0,
+                                    "z": round(alert["z"], 2)}
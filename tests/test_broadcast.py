@@ -0,0 +1,45 @@
+'''
+Author: Munir Mohamed Hafeel
+Date: 10-18-2026
+'''
+
+import json
+
+from broadcast import Broadcaster, format_sse
+
+
+def drain(subscriber):
+    events = []
+    while not subscriber.empty():
+        events.append(subscriber.get_nowait())
+    return events
+
+
+def test_format_sse():
+    assert format_sse({"v": 1}, "reading") == 'event: reading\ndata: {"v": 1}\n\n'
+    assert format_sse({"v": 1}) == 'data: {"v": 1}\n\n'
+
+
+def test_slow_subscriber_loses_its_oldest_events():
+    broadcaster = Broadcaster(max_queue=3)
+    slow = broadcaster.subscribe()
+    fast = broadcaster.subscribe()
+    received = []
+    for i in range(5):
+        broadcaster.publish({"i": i})
+        received.extend(drain(fast))
+    assert [event["i"] for event in drain(slow)] == [2, 3, 4]
+    assert [event["i"] for event in received] == [0, 1, 2, 3, 4]
+
+
+def test_stream_sends_events_and_keepalives_then_unsubscribes():
+    broadcaster = Broadcaster()
+    stream = broadcaster.stream(keepalive=0.01)
+    assert next(stream) == ": keepalive\n\n"
+    assert len(broadcaster) == 1
+    broadcaster.publish({"type": "alert", "value": 200.0})
+    message = next(stream)
+    assert message.startswith("event: alert\ndata: ")
+    assert json.loads(message.split("data: ", 1)[1]) == {"type": "alert", "value": 200.0}
+    stream.close()
+    assert len(broadcaster) == 0
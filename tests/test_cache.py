@@ -0,0 +1,122 @@
+'''
+Author: Munir Mohamed Hafeel
+Date: 10-18-2026
+'''
+
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from cache import LastValueCache, QueryCache
+
+DAY = ("co2", "2020-01-01")
+TODAY = ("co2", date.today().strftime('%Y-%m-%d'))
+
+
+def test_last_value_cache_keeps_the_newest():
+    cache = LastValueCache()
+    cache.update("co2", [{"timestamp": datetime(2026, 1, 2), "data": {"co2": 500}}])
+    # an older import does not overwrite the live value
+    cache.update("co2", [{"timestamp": datetime(2026, 1, 1), "data": {"co2": 400}}])
+    assert cache.get("co2", "co2") == (500, datetime(2026, 1, 2))
+    assert cache.latest("co2") == {"co2": 500}
+    assert cache.snapshot() == {"co2": {"co2": {"value": 500, "timestamp": datetime(2026, 1, 2)}}}
+
+
+def test_lru_eviction():
+    cache = QueryCache(max_entries=2)
+    cache.put(DAY, "a", 1)
+    cache.put(DAY, "b", 2)
+    cache.get(DAY, "a")
+    cache.put(DAY, "c", 3)
+    assert cache.get(DAY, "b") == (False, None)
+    assert cache.get(DAY, "a") == (True, 1)
+    assert cache.get(DAY, "c") == (True, 3)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_results_are_copies():
+    cache = QueryCache()
+    value = {"percentiles": [1, 2]}
+    cache.put(DAY, "k", value)
+    value["percentiles"].append(3)
+    found, cached = cache.get(DAY, "k")
+    cached["percentiles"].append(4)
+    assert cache.get(DAY, "k") == (True, {"percentiles": [1, 2]})
+
+
+def test_todays_results_expire():
+    cache = QueryCache(today_ttl=0)
+    cache.put(TODAY, "k", 1)
+    cache.put(DAY, "k2", 2)
+    assert cache.get(TODAY, "k") == (False, None)
+    assert cache.get(DAY, "k2") == (True, 2)
+
+
+def test_invalidate_drops_only_that_day():
+    cache = QueryCache()
+    other = ("co2", "2020-01-02")
+    cache.put(DAY, "a", 1)
+    cache.put(other, "b", 2)
+    cache.invalidate(*DAY)
+    assert cache.get(DAY, "a") == (False, None)
+    assert cache.get(other, "b") == (True, 2)
+
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = QueryCache(disk_path=path)
+    cache.put(DAY, "k", {"v": 1})
+    cache.put(TODAY, "t", 2)
+    cache.close()
+    restarted = QueryCache(disk_path=path)
+    assert restarted.get(DAY, "k") == (True, {"v": 1})
+    assert restarted.get(TODAY, "t") == (False, None)
+    assert restarted.stats()["disk_hits"] == 1
+    restarted.invalidate(*DAY)
+    restarted.close()
+    assert QueryCache(disk_path=path).get(DAY, "k") == (False, None)
+
+
+@pytest.fixture
+def epochs():
+    mongomock = pytest.importorskip("mongomock")
+    return mongomock.MongoClient().db.cache_epochs
+
+
+def test_invalidation_reaches_other_processes(epochs):
+    # two processes sharing the epochs collection
+    reader = QueryCache(epochs=epochs, epoch_ttl=0)
+    writer = QueryCache(epochs=epochs, epoch_ttl=0)
+    epoch = reader.epoch(DAY)
+    reader.put(DAY, "k", 1, epoch)
+    assert reader.get(DAY, "k", reader.epoch(DAY)) == (True, 1)
+    writer.invalidate(*DAY)
+    assert reader.epoch(DAY) == epoch + 1
+    assert reader.get(DAY, "k", reader.epoch(DAY)) == (False, None)
+
+
+def test_result_of_a_query_raced_by_a_write_is_not_served(epochs):
+    cache = QueryCache(epochs=epochs, epoch_ttl=0)
+    epoch = cache.epoch(DAY)
+    # a write lands while the query runs
+    QueryCache(epochs=epochs).invalidate(*DAY)
+    cache.put(DAY, "k", "stale", epoch)
+    assert cache.get(DAY, "k", cache.epoch(DAY)) == (False, None)
+
+
+def test_todays_results_have_no_epoch(epochs):
+    assert QueryCache(epochs=epochs).epoch(TODAY) is None
+
+
+def test_cached_statistics_follow_writes(extractor):
+    day = datetime(2020, 1, 1)
+    records = [{"metadata": {"sensor": "SCD40"}, "timestamp": day + timedelta(minutes=i), "data": {"co2": float(i)}}
+               for i in range(3)]
+    extractor.insert_data(records, "co2", 1000)
+    assert extractor.get_data_count("co2-2020-01-01") == 3
+    assert extractor.get_data_count("co2-2020-01-01") == 3
+    assert extractor.query_cache.stats()["hits"] == 1
+    extractor.insert_data([{"metadata": {"sensor": "SCD40"}, "timestamp": day + timedelta(hours=1), "data": {"co2": 9.0}}],
+                          "co2", 1000)
+    assert extractor.get_data_count("co2-2020-01-01") == 4
@@ -0,0 +1,80 @@
+'''
+Author: Munir Mohamed Hafeel
+Date: 10-18-2026
+'''
+
+from datetime import datetime, timedelta
+
+import pytest
+
+np = pytest.importorskip("numpy")
+from bson import encode
+
+import columnar
+
+KEYS = ["temperature", "humidity"]
+
+
+def batch(docs):
+    return b"".join(encode(doc) for doc in docs)
+
+
+def readings(n, start=datetime(2026, 1, 1)):
+    return [{"timestamp": start + timedelta(seconds=i), "data": {"temperature": 20.0 + i / 8, "humidity": 50.0 - i}}
+            for i in range(n)]
+
+
+def assert_same(a, b):
+    assert set(a) == set(b)
+    for key in a:
+        assert a[key].dtype == b[key].dtype
+        assert np.array_equal(a[key], b[key], equal_nan=True)
+
+
+def test_fixed_layout_matches_decode_all():
+    raw = batch(readings(500))
+    fixed = columnar.decode_fixed(raw, KEYS + ["co2"])
+    assert fixed is not None
+    assert_same(fixed, columnar.decode_documents(raw, KEYS + ["co2"]))
+    assert fixed["timestamp"][1] == np.datetime64("2026-01-01T00:00:01.000")
+    assert np.isnan(fixed["co2"]).all()
+
+
+@pytest.mark.parametrize("change", [
+    lambda doc: doc["data"].update(temperature=21),
+    lambda doc: doc["data"].pop("humidity"),
+    lambda doc: doc.update(data={"humidity": 1.0, "temperature": 2.0}),
+])
+def test_other_layouts_fall_back(change):
+    docs = readings(10)
+    change(docs[4])
+    raw = batch(docs)
+    assert columnar.decode_fixed(raw, KEYS) is None
+    assert_same(columnar.decode_batch(raw, KEYS), columnar.decode_documents(raw, KEYS))
+
+
+def test_empty_batch():
+    columns = columnar.decode_batch(b"", KEYS)
+    assert columns["timestamp"].size == 0 and columns["temperature"].size == 0
+
+
+def test_statistics():
+    values = np.array([1.0, 2.0, np.nan, 2.0, 5.0])
+    assert columnar.mean(values) == 2.5
+    assert columnar.mode(values) == 2.0
+    # same index rule as get_percentiles: sorted[int(n * p / 100)]
+    assert columnar.percentiles(values, [25, 50, 90]) == {25: 2.0, 50: 2.0, 90: 5.0}
+    assert columnar.mean(np.array([np.nan])) is None
+
+
+def test_get_columns_bounds_each_day_query(extractor, monkeypatch):
+    calls = []
+
+    def fetch(collection, stages, data_keys, conditions=None):
+        calls.append(conditions)
+        return columnar.decode_documents(b"", data_keys)
+
+    monkeypatch.setattr(columnar, "fetch_columns", fetch)
+    extractor.get_columns("co2", "2026-01-01 06:00:00", "2026-01-02", ["co2"])
+    assert len(calls) == 2
+    assert calls[0] == {"timestamp": {"$gte": datetime(2026, 1, 1, 6), "$lte": datetime(2026, 1, 2, 23, 59, 59, 999999)}}
@@ -0,0 +1,94 @@
+'''
+Author: Munir Mohamed Hafeel
+Date: 10-18-2026
+'''
+
+from commands import CommandDispatcher, format_commands, parse_ack, split_command
+
+
+class FakeClient:
+    # records what the dispatcher publishes instead of talking to a broker
+    def __init__(self):
+        self.published = []
+
+    def publish(self, topic, payload, qos=0):
+        self.published.append((topic, payload, qos))
+
+
+def dispatcher(**kwargs):
+    client = FakeClient()
+    return CommandDispatcher(client, report=lambda message: None, **kwargs), client
+
+
+def test_split_command():
+    assert split_command("pump1_on") == ("pump1", "on")
+    assert split_command("sample7off") == ("sample7", "off")
+    assert split_command("reboot") == ("reboot", None)
+
+
+def test_format_and_parse():
+    assert format_commands("a1", ["pump1_on", "fan2_off"]) == "a1:pump1_on,fan2_off"
+    assert parse_ack("a1:pump1_on=1,fan2_off=0") == ("a1", {"pump1_on": True, "fan2_off": False})
+
+
+def test_ack_on_time():
+    commands, client = dispatcher()
+    command_id = commands.send({"pump1": "on", "fan2": "off"})
+    assert client.published == [("fantopic", f"{command_id}:pump1_on,fan2_off", 1)]
+    assert commands.handle_ack(f"{command_id}:pump1_on=1,fan2_off=1")
+    result = commands.wait(command_id, timeout=0)
+    assert result["acked"] and result["attempts"] == 1 and result["unknown"] == []
+    stats = commands.stats()
+    assert stats["pending"] == 0 and stats["failed"] == 0
+    assert stats["devices"]["pump1"]["count"] == 1
+
+
+def test_retries_then_gives_up():
+    commands, client = dispatcher(timeout=0.02, retries=2)
+    commands.start()
+    command_id = commands.send(["pump1_on"])
+    result = commands.wait(command_id, timeout=5)
+    commands.close()
+    assert result == {"id": command_id, "commands": ["pump1_on"], "attempts": 3, "acked": False}
+    assert len(client.published) == 3
+    assert commands.stats()["failed"] == 1
+    assert commands.stats()["devices"]["pump1"]["timeouts"] == 1
+    # a late ack for a batch given up on changes nothing
+    assert not commands.handle_ack(f"{command_id}:pump1_on=1")
+
+
+def test_newer_batch_supersedes_a_pending_one():
+    commands, _ = dispatcher()
+    first = commands.send({"pump1": "on", "fan2": "on"})
+    second = commands.send({"pump1": "off"})
+    # fan2 still waits for the first batch, pump1 moved to the second
+    assert commands.pending[first]["commands"] == {"fan2": "fan2_on"}
+    third = commands.send({"fan2": "off"})
+    assert commands.wait(first, timeout=0) == {"id": first, "commands": [], "attempts": 1, "acked": False,
+                                               "superseded": True}
+    assert set(commands.pending) == {second, third}
+
+
+def test_controller_reports_unknown_commands():
+    reports = []
+    commands = CommandDispatcher(FakeClient(), report=reports.append)
+    command_id = commands.send(["pump9_on"])
+    assert commands.handle_ack(f"{command_id}:pump9_on=0")
+    assert commands.wait(command_id, timeout=0)["unknown"] == ["pump9_on"]
+    assert "pump9" not in commands.stats()["devices"]
+    assert reports
+
+
+def test_malformed_acks_are_ignored():
+    commands, _ = dispatcher()
+    command_id = commands.send(["pump1_on"])
+    for payload in ("", ":", "garbage", "pump1_on=1", f"{command_id}x:pump1_on=1"):
+        assert not commands.handle_ack(payload)
+    assert set(commands.pending) == {command_id}
+
+
+def test_nothing_to_send():
+    commands, client = dispatcher()
+    assert commands.send([]) is None
+    assert commands.wait("unknown") is None
+    assert client.published == []
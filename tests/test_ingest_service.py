@@ -0,0 +1,70 @@
+'''
+Author: Munir Mohamed Hafeel
+Date: 10-18-2026
+'''
+
+import os
+import json
+import time
+
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+pytest.importorskip("paho.mqtt.client")
+from ingest_service import follow_registry, parse_readings, readings_payload
+from sensor_registry import SensorRegistry
+
+CO2 = {"topic": "SCD40", "pattern": r"CO2: (\d+)", "data_keys": ["co2"], "metadata": {"sensor": "SCD40"}}
+O2 = {"topic": "DO", "pattern": r"O2: (\d+)", "data_keys": ["o2"], "metadata": {"sensor": "O2"}}
+
+
+def write_config(path, sensors, mtime):
+    with open(path, 'w') as file:
+        json.dump({"sensors": sensors}, file)
+    # a rewrite within the file system's timestamp resolution must still count as a change
+    os.utime(path, (mtime, mtime))
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def registry(tmp_path):
+    path = tmp_path / "sensors.json"
+    write_config(path, {"co2": CO2}, 1000)
+    registry = SensorRegistry(str(path), report=lambda message: None)
+    yield registry
+    registry.close()
+
+
+def test_partitioned_worker_parses_a_new_sensor(registry):
+    follow_registry(registry, interval=0.01)
+    line = "2023-03-01, 12:00:05 - O2: 40"
+    assert registry.parse(line, "DO") == []
+    write_config(registry.path, {"co2": CO2, "o2": O2}, 2000)
+    wait_for(lambda: registry.parse(line, "DO"))
+    [(sensor, record)] = registry.parse(line, "DO")
+    assert sensor == "o2" and record["data"] == {"o2": 40.0}
+
+
+def test_shared_worker_follows_the_topics(registry):
+    assigned = []
+    follow_registry(registry, assigned.append, interval=0.01)
+    write_config(registry.path, {"co2": CO2, "o2": O2}, 2000)
+    wait_for(lambda: len(assigned) == 2)
+    assert assigned == [["SCD40"], ["SCD40", "DO"]]
+
+
+def test_readings_payload_round_trip_without_storage_fields():
+    stored = {"_id": ObjectId(), "metadata": {"sensor": "SCD40"}, "timestamp": datetime(2023, 3, 1, 12, 0, 5),
+              "data": {"co2": 612.0}}
+    payload = readings_payload("co2", [stored])
+    assert "_id" not in payload
+    assert parse_readings(payload) == ("co2", [{"timestamp": datetime(2023, 3, 1, 12, 0, 5), "data": {"co2": 612.0}}])
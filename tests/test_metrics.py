@@ -0,0 +1,126 @@
+'''
+Author: Munir Mohamed Hafeel
+Date: 10-18-2026
+'''
+
+import re
+import time
+
+import pytest
+
+from metrics import Metrics, timed_method
+
+SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})? (\S+)$')
+LABEL = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+
+
+def parse(text):
+    # {(name, ((label, value), ...)): value}, and {name: (type, help)} from the comments
+    samples, described = {}, {}
+    assert text.endswith("\n")
+    for line in text.splitlines():
+        if line.startswith("# HELP "):
+            name, help = line[7:].split(" ", 1)
+            described[name] = [None, help]
+        elif line.startswith("# TYPE "):
+            name, kind = line[7:].split(" ")
+            described[name][0] = kind
+        else:
+            match = SAMPLE.match(line)
+            assert match, line
+            name, labels, value = match.groups()
+            samples[(name, tuple(LABEL.findall(labels or "")))] = float(value)
+    return samples, described
+
+
+def test_render_counters_histograms_and_collectors():
+    metrics = Metrics(enabled=True)
+    metrics.inc("sensor_readings_total", 3, sensor="co2", source="live")
+    metrics.inc("sensor_readings_total", 2, sensor="co2", source="live")
+    metrics.inc("errors_total", stage='say "hi"\n')
+    for value in (0.0002, 0.003, 0.003, 20.0):
+        metrics.observe("mongo_operation_seconds", value, method="get_median")
+    metrics.collect("queue_depth", "gauge", "Records waiting", lambda: 7)
+    metrics.collect("cache_hits", "counter", "Hits by tier", lambda: {(("tier", "memory"),): 4})
+    metrics.collect("broken", "gauge", "Raises", lambda: 1 / 0)
+    samples, described = parse(metrics.render())
+
+    assert samples[("sensor_readings_total", (("sensor", "co2"), ("source", "live")))] == 5
+    assert samples[("errors_total", (("stage", 'say \\"hi\\"\\n'),))] == 1
+    method = (("method", "get_median"),)
+    assert samples[("mongo_operation_seconds_bucket", method + (("le", "0.0005"),))] == 1
+    assert samples[("mongo_operation_seconds_bucket", method + (("le", "0.005"),))] == 3
+    assert samples[("mongo_operation_seconds_bucket", method + (("le", "+Inf"),))] == 4
+    assert samples[("mongo_operation_seconds_count", method)] == 4
+    assert samples[("mongo_operation_seconds_sum", method)] == pytest.approx(20.0062)
+    assert samples[("queue_depth", ())] == 7
+    assert samples[("cache_hits", (("tier", "memory"),))] == 4
+    assert described["mongo_operation_seconds"][0] == "histogram"
+    assert described["queue_depth"] == ["gauge", "Records waiting"]
+    assert "broken" not in described
+
+
+def test_disabled_records_nothing():
+    metrics = Metrics()
+    metrics.inc("errors_total")
+    metrics.observe("mongo_operation_seconds", 1.0)
+    assert metrics.clock() is None
+    assert metrics.render() == "\n"
+
+
+class Queries:
+    def __init__(self, enabled=True):
+        self.metrics = Metrics(enabled=enabled)
+
+    @timed_method
+    def rows(self, n, delay):
+        for i in range(n):
+            time.sleep(delay)
+            yield i
+
+    @timed_method
+    def fails(self):
+        yield 1
+        raise RuntimeError("cursor died")
+
+    @timed_method
+    def value(self):
+        return 42
+
+
+def histogram(queries, method):
+    return queries.metrics.histograms.get(("mongo_operation_seconds", (("method", method),)))
+
+
+def test_generator_timing_covers_its_consumption():
+    queries = Queries()
+    rows = queries.rows(3, 0.02)
+    assert histogram(queries, "rows") is None
+    assert list(rows) == [0, 1, 2]
+    recorded = histogram(queries, "rows")
+    assert recorded.count == 1
+    assert recorded.sum >= 0.06
+
+
+def test_time_between_items_is_not_counted():
+    queries = Queries()
+    for _ in queries.rows(2, 0):
+        time.sleep(0.05)
+    assert histogram(queries, "rows").sum < 0.05
+
+
+def test_generator_errors_are_counted():
+    queries = Queries()
+    with pytest.raises(RuntimeError):
+        list(queries.fails())
+    assert queries.metrics.counters[("mongo_operation_errors_total", (("method", "fails"),))] == 1
+    assert histogram(queries, "fails").count == 1
+
+
+def test_plain_results_and_disabled_metrics():
+    queries = Queries()
+    assert queries.value() == 42
+    assert histogram(queries, "value").count == 1
+    off = Queries(enabled=False)
+    assert list(off.rows(2, 0)) == [0, 1]
+    assert off.metrics.histograms == {}
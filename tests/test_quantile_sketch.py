@@ -0,0 +1,121 @@
+'''
+Author: Munir Mohamed Hafeel
+Date: 10-18-2026
+'''
+
+import random
+from datetime import datetime
+
+import pytest
+
+from quantile_sketch import KLLSketch, SketchStore
+
+
+def rank_error(sketch, values, q):
+    # how far the returned value's rank is from the requested one, as a fraction of n
+    values = sorted(values)
+    estimate = sketch.quantile(q)
+    below = sum(1 for value in values if value < estimate)
+    return abs(below / len(values) - q)
+
+
+def test_quantiles_within_the_rank_error_bound():
+    random.seed(1)
+    values = [random.gauss(25, 4) for _ in range(50000)]
+    sketch = KLLSketch(200)
+    for value in values:
+        sketch.update(value)
+    assert sketch.n == len(values)
+    assert sketch.size < 1000
+    for q in (0.1, 0.25, 0.5, 0.75, 0.9, 0.99):
+        assert rank_error(sketch, values, q) <= 2 * sketch.normalized_rank_error()
+
+
+def test_extremes_and_empty_sketch():
+    sketch = KLLSketch()
+    assert sketch.quantile(0.5) is None
+    for value in (3.0, -1.0, 7.0):
+        sketch.update(value)
+    assert (sketch.quantile(0), sketch.quantile(1)) == (-1.0, 7.0)
+
+
+def test_merged_sketch_describes_both_streams():
+    random.seed(2)
+    low = [random.uniform(0, 10) for _ in range(20000)]
+    high = [random.uniform(10, 20) for _ in range(20000)]
+    a, b = KLLSketch(), KLLSketch()
+    for value in low:
+        a.update(value)
+    for value in high:
+        b.update(value)
+    merged = a.merge(b)
+    assert merged.n == 40000
+    assert (merged.min, merged.max) == (min(low), max(high))
+    assert rank_error(merged, low + high, 0.5) <= 2 * merged.normalized_rank_error()
+
+
+def test_dict_round_trip():
+    sketch = KLLSketch(50)
+    for i in range(1000):
+        sketch.update(float(i))
+    restored = KLLSketch.from_dict(sketch.to_dict())
+    assert restored.to_dict() == sketch.to_dict()
+    assert restored.quantile(0.5) == sketch.quantile(0.5)
+
+
+def readings(values, day=datetime(2026, 1, 1, 12)):
+    return [{"timestamp": day, "data": {"co2": value}} for value in values]
+
+
+@pytest.fixture
+def collection():
+    mongomock = pytest.importorskip("mongomock")
+    return mongomock.MongoClient().db.sketches
+
+
+def test_stores_merge_instead_of_overwriting(collection):
+    # two ingest processes adding to the same day
+    first, second = SketchStore(collection), SketchStore(collection)
+    first.update("co2", readings([float(i) for i in range(100)]))
+    second.update("co2", readings([float(i) for i in range(100, 300)]))
+    assert first.get("co2", "co2", "2026-01-01").n == 100
+    assert first.flush() and second.flush()
+    assert first.get("co2", "co2", "2026-01-01").n == 300
+    assert collection.find_one()["version"] == 2
+
+
+def test_get_includes_values_not_flushed_yet(collection):
+    store = SketchStore(collection)
+    store.update("co2", readings([1.0, 2.0]))
+    store.flush()
+    store.update("co2", readings([3.0]))
+    assert store.get("co2", "co2", "2026-01-01").n == 3
+
+
+def test_failed_flush_keeps_the_delta(collection):
+    store = SketchStore(collection, report=lambda message: None)
+    store.update("co2", readings([1.0, 2.0]))
+    find_one = collection.find_one
+
+    def unavailable(*args, **kwargs):
+        raise ConnectionError("database down")
+
+    collection.find_one = unavailable
+    assert store.flush() is False
+    assert store.retry_at > 0
+    collection.find_one = find_one
+    store.update("co2", readings([3.0]))
+    assert store.flush()
+    assert store.get("co2", "co2", "2026-01-01").n == 3
+
+
+def test_replace_takes_the_place_of_stored_and_pending(collection):
+    store = SketchStore(collection)
+    store.update("co2", readings([1.0, 2.0]))
+    store.flush()
+    store.update("co2", readings([3.0]))
+    rebuilt = KLLSketch()
+    for value in (1.0, 2.0, 3.0, 4.0):
+        rebuilt.update(value)
+    store.replace("co2", "co2", "2026-01-01", rebuilt)
+    assert store.get("co2", "co2", "2026-01-01").n == 4
@@ -0,0 +1,64 @@
+'''
+Author: Munir Mohamed Hafeel
+Date: 10-18-2026
+'''
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+from range_query import dates_between, fan_out_merge, to_datetime
+
+
+def test_to_datetime():
+    assert to_datetime("2026-01-02") == datetime(2026, 1, 2)
+    assert to_datetime("2026-01-02", end_of_day=True) == datetime(2026, 1, 2, 23, 59, 59, 999999)
+    assert to_datetime("2026-01-02 03:04:05", end_of_day=True) == datetime(2026, 1, 2, 3, 4, 5)
+    assert to_datetime(date(2026, 1, 2)) == datetime(2026, 1, 2)
+    dt = datetime(2026, 1, 2, 3)
+    assert to_datetime(dt, end_of_day=True) is dt
+
+
+def test_dates_between_is_inclusive():
+    assert dates_between("2025-12-30 23:00:00", "2026-01-02") == ["2025-12-30", "2025-12-31", "2026-01-01", "2026-01-02"]
+    assert dates_between("2026-01-02", "2026-01-01") == []
+
+
+def test_fan_out_merge_orders_across_queries():
+    days = [
+        [{"timestamp": 1}, {"timestamp": 4}],
+        [],
+        [{"timestamp": 2}, {"timestamp": 3}, {"timestamp": 5}],
+    ]
+    with ThreadPoolExecutor(3) as pool:
+        merged = fan_out_merge(pool, [lambda day=day: iter(day) for day in days])
+        assert [doc["timestamp"] for doc in merged] == [1, 2, 3, 4, 5]
+
+
+def store(extractor, hours):
+    # one co2 reading every 6 hours from 2026-01-01 00:00
+    records = [{"metadata": {"sensor": "SCD40"}, "timestamp": datetime(2026, 1, 1) + timedelta(hours=6 * i),
+                "data": {"co2": float(i)}} for i in range(hours // 6)]
+    extractor.storage.write("co2", records)
+
+
+def times(docs):
+    return [doc["timestamp"].strftime("%d %H") for doc in docs]
+
+
+def test_filter_data_range_cuts_the_first_and_last_day(extractor):
+    store(extractor, 72)
+    docs = extractor.filter_data_range("co2", "2026-01-01 07:00:00", "2026-01-02 13:00:00")
+    assert times(docs) == ["01 12", "01 18", "02 00", "02 06", "02 12"]
+
+
+def test_filter_data_range_bare_end_date_includes_the_day(extractor):
+    store(extractor, 72)
+    docs = extractor.filter_data_range("co2", "2026-01-02", "2026-01-02", {"data.co2": {"$gte": 6}})
+    assert times(docs) == ["02 12", "02 18"]
+
+
+def test_get_series_bounds_and_projection(extractor):
+    store(extractor, 72)
+    points = list(extractor.get_series("co2", "2026-01-01 18:00:00", "2026-01-03", ["co2"]))
+    assert times(points) == ["01 18", "02 00", "02 06", "02 12", "02 18", "03 00", "03 06", "03 12", "03 18"]
+    assert set(points[0]) == {"timestamp", "data"}
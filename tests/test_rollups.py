@@ -0,0 +1,119 @@
+'''
+Author: Munir Mohamed Hafeel
+Date: 10-18-2026
+'''
+
+import statistics
+from datetime import datetime, timedelta
+
+import pytest
+
+from rollups import RollupStore, accumulate, bucket_start, merge_stats, summarize
+
+START = datetime(2026, 1, 1, 10, 59, 30)
+
+
+def readings(values, start=START, step=10):
+    return [{"timestamp": start + timedelta(seconds=step * i), "data": {"co2": value}} for i, value in enumerate(values)]
+
+
+def test_bucket_start():
+    dt = datetime(2026, 1, 1, 10, 59, 30, 500)
+    assert bucket_start(dt, "minute") == datetime(2026, 1, 1, 10, 59)
+    assert bucket_start(dt, "hour") == datetime(2026, 1, 1, 10)
+    assert bucket_start(dt, "day") == datetime(2026, 1, 1)
+
+
+def test_accumulate_splits_buckets_per_tier():
+    buckets = accumulate("co2", readings([1.0, 2.0, 3.0, 4.0]))
+    # 10:59:30, :40, :50 and 11:00:00
+    assert buckets[("minute", "co2", "co2", datetime(2026, 1, 1, 10, 59))][:1] == [3]
+    assert buckets[("hour", "co2", "co2", datetime(2026, 1, 1, 11))] == [1, 4.0, 16.0, 4.0, 4.0]
+    assert buckets[("day", "co2", "co2", datetime(2026, 1, 1))] == [4, 10.0, 30.0, 1.0, 4.0]
+
+
+def test_summary_matches_the_statistics_module():
+    values = [412.0, 398.5, 430.25, 401.0, 415.5]
+    [stats] = [stats for key, stats in accumulate("co2", readings(values)).items() if key[0] == "day"]
+    count, total, sumsq, low, high = stats
+    summary = summarize({"ts": None, "count": count, "sum": total, "sumsq": sumsq, "min": low, "max": high})
+    assert summary["average"] == pytest.approx(statistics.mean(values))
+    assert summary["standard_deviation"] == pytest.approx(statistics.stdev(values))
+    assert (summary["min"], summary["max"], summary["count"]) == (398.5, 430.25, 5)
+
+
+def test_single_value_has_no_standard_deviation():
+    assert summarize({"ts": None, "count": 1, "sum": 2.0, "sumsq": 4.0, "min": 2.0, "max": 2.0})["standard_deviation"] is None
+
+
+def test_merge_stats():
+    buckets = {}
+    merge_stats(buckets, "k", [2, 3.0, 5.0, 1.0, 2.0])
+    merge_stats(buckets, "k", [1, 5.0, 25.0, 5.0, 5.0])
+    assert buckets["k"] == [3, 8.0, 30.0, 1.0, 5.0]
+
+
+def test_choose_tier():
+    start = datetime(2026, 1, 1)
+    assert RollupStore.choose_tier(start, start + timedelta(hours=6)) == "minute"
+    assert RollupStore.choose_tier(start, start + timedelta(days=30)) == "hour"
+    assert RollupStore.choose_tier(start, start + timedelta(days=3650)) == "day"
+    assert RollupStore.choose_tier(start, start + timedelta(days=1), resolution=7200) == "hour"
+    assert RollupStore.choose_tier(start, start + timedelta(days=1), resolution=5) == "minute"
+
+
+@pytest.fixture
+def database():
+    mongomock = pytest.importorskip("mongomock")
+    return mongomock.MongoClient().db
+
+
+def test_flushes_add_up(database):
+    store = RollupStore(database)
+    store.update("co2", readings([1.0, 2.0]))
+    store.flush()
+    store.update("co2", readings([3.0], start=START + timedelta(seconds=20)))
+    store.flush()
+    day = store.get("day", "co2", "co2", datetime(2026, 1, 1))
+    assert (day["count"], day["sum"], day["min"], day["max"]) == (3, 6.0, 1.0, 3.0)
+    series = store.series("minute", "co2", "co2", datetime(2026, 1, 1), datetime(2026, 1, 2))
+    assert [point["count"] for point in series] == [3]
+
+
+def test_failed_tier_is_retried_once(database):
+    store = RollupStore(database, report=lambda message: None)
+    store.update("co2", readings([1.0, 2.0]))
+    hours = store.collections["hour"]
+    bulk_write = hours.bulk_write
+
+    def unavailable(*args, **kwargs):
+        raise ConnectionError("database down")
+
+    hours.bulk_write = unavailable
+    assert store.flush() is False
+    # minute was written; hour failed; day was kept without trying
+    assert {key[0] for key in store.pending} == {"hour", "day"}
+    hours.bulk_write = bulk_write
+    assert store.flush()
+    for tier in ("minute", "hour", "day"):
+        assert sum(doc["count"] for doc in store.collections[tier].find()) == 2
+
+
+def test_backfill_replaces_a_day(database):
+    store = RollupStore(database)
+    store.update("co2", readings([100.0] * 3))
+    store.flush()
+    store.backfill("co2", datetime(2026, 1, 1), readings([1.0, 2.0]))
+    day = store.get("day", "co2", "co2", datetime(2026, 1, 1))
+    assert (day["count"], day["sum"]) == (2, 3.0)
+
+
+def test_backfill_drops_unflushed_deltas_of_the_day(database):
+    store = RollupStore(database)
+    store.update("co2", readings([1.0, 2.0]))
+    store.update("co2", readings([5.0], start=START + timedelta(days=1)))
+    store.backfill("co2", datetime(2026, 1, 1), readings([1.0, 2.0]))
+    store.flush()
+    day = store.get("day", "co2", "co2", datetime(2026, 1, 1))
+    assert (day["count"], day["sum"], day["min"], day["max"]) == (2, 3.0, 1.0, 2.0)
+    assert store.get("day", "co2", "co2", datetime(2026, 1, 2))["count"] == 1
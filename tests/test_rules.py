@@ -0,0 +1,150 @@
+'''
+Author: Munir Mohamed Hafeel
+Date: 10-18-2026
+'''
+
+import os
+import json
+
+import pytest
+
+from rules import Rule, RuleEngine, load_rules, score
+
+EXAMPLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'rules.example.json')
+
+
+def reading(**data):
+    return [{"data": data}]
+
+
+def engine(rules, debounce=0.0):
+    sent = []
+    rule_engine = RuleEngine(sent.append, rules=rules, debounce=debounce, report=lambda message: None)
+    return rule_engine, sent
+
+
+def test_rule_needs_exactly_one_threshold():
+    with pytest.raises(ValueError):
+        Rule("r", "co2", "co2", "fan2")
+    with pytest.raises(ValueError):
+        Rule("r", "co2", "co2", "fan2", above=700, below=350)
+
+
+def test_example_rules_load():
+    rules = load_rules(EXAMPLE)
+    assert {rule.device for rule in rules} == {"fan1", "fan2", "pump1"}
+    assert all((rule.above is None) != (rule.below is None) for rule in rules)
+
+
+@pytest.mark.parametrize("entry", [
+    {"name": "r", "sensor": "co2", "key": "co2", "above": 700},
+    {"name": "r", "sensor": "co2", "key": "co2", "device": "fan2", "above": 700, "abve": 800},
+    {"name": "r", "sensor": "co2", "key": "co2", "device": "fan2"},
+])
+def test_bad_rules_are_rejected(tmp_path, entry):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({"rules": [entry]}))
+    with pytest.raises(ValueError):
+        load_rules(str(path))
+
+
+def test_above_hysteresis():
+    rule = Rule("r", "co2", "co2", "fan2", above=700, hysteresis=50)
+    assert rule.update(701)
+    assert rule.update(660)
+    assert not rule.update(649)
+    assert not rule.update(690)
+
+
+def test_below_hysteresis():
+    rule = Rule("r", "o2", "o2", "pump1", below=35, hysteresis=5)
+    assert rule.update(30)
+    assert rule.update(39)
+    assert not rule.update(41)
+
+
+def test_no_off_before_anything_was_switched_on():
+    rule_engine, sent = engine([Rule("r", "co2", "co2", "fan2", above=700)])
+    rule_engine.observe("co2", reading(co2=500))
+    assert sent == []
+    assert "fan2" not in rule_engine.desired
+
+
+def test_on_then_off():
+    rule_engine, sent = engine([Rule("r", "co2", "co2", "fan2", above=700, hysteresis=50)])
+    rule_engine.observe("co2", reading(co2=800))
+    rule_engine.observe("co2", reading(co2=680))
+    rule_engine.observe("co2", reading(co2=600))
+    assert sent == [{"fan2": "on"}, {"fan2": "off"}]
+
+
+def test_other_sensors_are_ignored():
+    rule_engine, sent = engine([Rule("r", "co2", "co2", "fan2", above=700)])
+    rule_engine.observe("temperature-humidity", reading(co2=800))
+    assert sent == []
+
+
+def test_debounce_holds_a_change_until_the_interval_is_over(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("rules.time.monotonic", lambda: now[0])
+    rule_engine, sent = engine([Rule("r", "co2", "co2", "fan2", above=700)], debounce=10.0)
+    rule_engine.observe("co2", reading(co2=800))
+    now[0] += 1
+    rule_engine.observe("co2", reading(co2=600))
+    assert sent == [{"fan2": "on"}]
+    now[0] += 10
+    rule_engine._dispatch()
+    assert sent == [{"fan2": "on"}, {"fan2": "off"}]
+
+
+def test_debounced_change_no_longer_wanted_is_dropped(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("rules.time.monotonic", lambda: now[0])
+    rule_engine, sent = engine([Rule("r", "co2", "co2", "fan2", above=700)], debounce=10.0)
+    rule_engine.observe("co2", reading(co2=800))
+    now[0] += 1
+    rule_engine.observe("co2", reading(co2=600))
+    rule_engine.observe("co2", reading(co2=800))
+    now[0] += 10
+    rule_engine._dispatch()
+    assert sent == [{"fan2": "on"}]
+
+
+def test_failed_send_is_retried():
+    calls = []
+
+    def send(changes):
+        calls.append(changes)
+        if len(calls) == 1:
+            raise ConnectionError("controller down")
+
+    rule_engine = RuleEngine(send, rules=[Rule("r", "co2", "co2", "fan2", above=700)], debounce=0.0,
+                             report=lambda message: None)
+    rule_engine.observe("co2", reading(co2=800))
+    assert "fan2" not in rule_engine.commanded
+    rule_engine._dispatch()
+    assert calls == [{"fan2": "on"}, {"fan2": "on"}]
+    assert rule_engine.commanded["fan2"] == "on"
+
+
+def test_shared_device_stays_on_while_any_rule_is_active():
+    rule_engine, sent = engine([
+        Rule("humidity", "temperature-humidity", "humidity", "fan2", above=70),
+        Rule("co2", "co2", "co2", "fan2", above=700),
+    ])
+    listened = []
+    rule_engine.listeners.append(lambda device, state, reasons: listened.append((device, state, reasons)))
+    rule_engine.observe("temperature-humidity", reading(humidity=80))
+    rule_engine.observe("co2", reading(co2=800))
+    rule_engine.observe("temperature-humidity", reading(humidity=50))
+    assert sent == [{"fan2": "on"}]
+    rule_engine.observe("co2", reading(co2=500))
+    assert sent == [{"fan2": "on"}, {"fan2": "off"}]
+    assert listened == [("fan2", "on", ["humidity"]), ("fan2", "off", [])]
+
+
+def test_score():
+    assert score({"temperature": 22, "humidity": 90, "unknown": 1}) == 0
+    rule_engine, _ = engine([])
+    rule_engine.observe("co2", reading(co2=500, pH=6.0))
+    assert rule_engine.score() == 2
@@ -0,0 +1,60 @@
+'''
+Author: Munir Mohamed Hafeel
+Date: 10-18-2026
+'''
+
+from datetime import datetime
+
+from sensor_parser import SENSOR_PATTERNS, SensorLineParser, parse_timestamp
+
+
+def test_parse_timestamp_matches_strptime():
+    text = "2023-03-01, 07:08:09"
+    assert parse_timestamp(text) == datetime.strptime(text, '%Y-%m-%d, %H:%M:%S')
+
+
+def test_single_reading():
+    parser = SensorLineParser(SENSOR_PATTERNS)
+    [(sensor, record)] = parser.parse("2023-03-01, 12:00:05 - Temperature: 22.50, Humidity: 55.10")
+    assert sensor == "temperature-humidity"
+    assert record["timestamp"] == datetime(2023, 3, 1, 12, 0, 5)
+    assert record["data"] == {"temperature": 22.5, "humidity": 55.1}
+    assert record["metadata"] == SENSOR_PATTERNS["temperature-humidity"]["metadata"]
+
+
+def test_several_sensors_on_one_line():
+    parser = SensorLineParser(SENSOR_PATTERNS)
+    results = parser.parse("2023-03-01, 12:00:05 - CO2: 612 Red: 1, Green: 2, Blue: 3, Clear: 4")
+    assert dict(results)["co2"]["data"] == {"co2": 612.0}
+    assert dict(results)["light"]["data"] == {"Red": 1.0, "Green": 2.0, "Blue": 3.0, "Clear": 4.0}
+
+
+def test_a_sensor_repeated_on_a_line_counts_once():
+    parser = SensorLineParser(SENSOR_PATTERNS)
+    results = parser.parse("2023-03-01, 12:00:05 - CO2: 612 CO2: 700")
+    assert [(sensor, record["data"]) for sensor, record in results] == [("co2", {"co2": 612.0})]
+
+
+def test_lines_without_timestamp_or_reading():
+    parser = SensorLineParser(SENSOR_PATTERNS)
+    assert parser.parse("CO2: 612") == []
+    assert parser.parse("2023-03-01, 12:00:05 - Connecting to MQTT Broker...") == []
+
+
+def test_timestamp_reused_within_a_second_and_refreshed_after():
+    parser = SensorLineParser(SENSOR_PATTERNS)
+    first = parser.parse("2023-03-01, 12:00:05 - CO2: 600")[0][1]["timestamp"]
+    second = parser.parse("2023-03-01, 12:00:05 - CO2: 601")[0][1]["timestamp"]
+    third = parser.parse("2023-03-01, 12:00:06 - CO2: 602")[0][1]["timestamp"]
+    assert first is second
+    assert third == datetime(2023, 3, 1, 12, 0, 6)
+
+
+def test_custom_patterns():
+    parser = SensorLineParser({
+        "wind": {"pattern": r"Wind: (\d+\.\d+) (\d+)", "data_keys": ["speed", "direction"], "metadata": {}},
+        "rain": {"pattern": r"Rain: (\d+)", "data_keys": ["mm"], "metadata": {}},
+    })
+    results = dict(parser.parse("2023-03-01, 00:00:00 - Rain: 3 Wind: 4.5 270"))
+    assert results["wind"]["data"] == {"speed": 4.5, "direction": 270.0}
+    assert results["rain"]["data"] == {"mm": 3.0}
@@ -0,0 +1,88 @@
+'''
+Author: Munir Mohamed Hafeel
+Date: 10-18-2026
+'''
+
+import os
+import json
+
+import pytest
+
+from sensor_registry import SensorRegistry, validate
+
+CO2 = {"topic": "SCD40", "pattern": r"CO2: (\d+)", "data_keys": ["co2"], "metadata": {"sensor": "SCD40"}}
+O2 = {"topic": "DO", "pattern": r"O2: (\d+)", "data_keys": ["o2"], "metadata": {"sensor": "O2"}}
+LINE = "2023-03-01, 12:00:05 - CO2: 612 O2: 40"
+
+
+def write_config(path, config, mtime):
+    with open(path, 'w') as file:
+        json.dump(config, file)
+    # a rewrite within the file system's timestamp resolution must still count as a change
+    os.utime(path, (mtime, mtime))
+
+
+def sensors(results):
+    return sorted(sensor for sensor, _ in results)
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = tmp_path / "sensors.json"
+    write_config(path, {"sensors": {"co2": CO2}, "fallback_topics": ["TDS"]}, 1000)
+    return str(path)
+
+
+@pytest.mark.parametrize("config", [
+    {"sensors": {}},
+    {"sensors": {"co2": dict(CO2, pattern=r"CO2: (\d+")}},
+    {"sensors": {"co2": dict(CO2, data_keys=["co2", "extra"])}},
+    {"sensors": {"co2": {k: v for k, v in CO2.items() if k != "metadata"}}},
+    {"sensors": {"co2": dict(CO2, storage="tape")}},
+])
+def test_validate_rejects(config):
+    with pytest.raises(ValueError):
+        validate(config, ["daily", "buckets"])
+
+
+def test_routing_by_topic(path):
+    registry = SensorRegistry(path, report=lambda message: None)
+    assert registry.topics() == ["SCD40", "TDS"]
+    assert sensors(registry.parse(LINE, "SCD40")) == ["co2"]
+    # fallback topics and serial lines are tried against every sensor
+    assert sensors(registry.parse(LINE, "TDS")) == ["co2"]
+    assert sensors(registry.parse(LINE)) == ["co2"]
+
+
+def test_reload_picks_up_new_sensors_and_notifies(path):
+    registry = SensorRegistry(path, report=lambda message: None)
+    notified = []
+    registry.listeners.append(lambda registry: notified.append(registry.topics()))
+    assert not registry.reload()
+    write_config(path, {"sensors": {"co2": CO2, "o2": O2}}, 2000)
+    assert registry.reload()
+    assert notified == [["SCD40", "DO"]]
+    assert sensors(registry.parse(LINE, "DO")) == ["o2"]
+    assert sensors(registry.parse(LINE)) == ["co2", "o2"]
+
+
+def test_invalid_file_keeps_the_current_definitions(path):
+    reports = []
+    registry = SensorRegistry(path, report=reports.append)
+    notified = []
+    registry.listeners.append(notified.append)
+    write_config(path, {"sensors": {"co2": dict(CO2, pattern="CO2: (")}}, 2000)
+    assert not registry.reload()
+    assert reports and not notified
+    assert registry.topics() == ["SCD40", "TDS"]
+    assert sensors(registry.parse(LINE, "SCD40")) == ["co2"]
+    # reported once, not on every check until the file changes again
+    assert not registry.reload()
+    assert len(reports) == 1
+
+
+def test_invalid_file_at_startup_raises(tmp_path):
+    path = tmp_path / "sensors.json"
+    path.write_text("{not json")
+    with pytest.raises(ValueError):
+        SensorRegistry(str(path))
@@ -0,0 +1,159 @@
+'''
+Author: Munir Mohamed Hafeel
+Date: 10-18-2026
+'''
+
+import time
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from bson import decode, encode
+from pymongo.errors import BulkWriteError
+
+import spool
+from spool import HEADER, SegmentLog, Spool
+
+
+def payloads(n, start=0):
+    return [encode({"i": i}) for i in range(start, start + n)]
+
+
+def values(entries):
+    return [decode(payload)["i"] for _, payload in entries]
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.01)
+
+
+def test_append_read_and_offsets(tmp_path):
+    log = SegmentLog(str(tmp_path))
+    end = log.append(payloads(3))
+    entries = log.read(0, 10)
+    assert values(entries) == [0, 1, 2]
+    assert entries[-1][0] == end == log.end()
+    assert values(log.read(entries[0][0], 10)) == [1, 2]
+    assert values(log.read(0, 2)) == [0, 1]
+    log.close()
+
+
+def test_segments_roll_and_committed_ones_are_deleted(tmp_path):
+    log = SegmentLog(str(tmp_path), segment_bytes=256)
+    log.append(payloads(40))
+    assert len(log._bases()) > 3
+    entries = log.read(0, 100)
+    assert values(entries) == list(range(40))
+    log.commit(entries[29][0])
+    assert values(log.read(log.committed, 100)) == list(range(30, 40))
+    assert log._bases()[0] > 0
+    log.close()
+
+
+def test_reopen_keeps_entries_and_commit(tmp_path):
+    log = SegmentLog(str(tmp_path))
+    log.append(payloads(5))
+    log.commit(log.read(0, 2)[-1][0])
+    log.close()
+    reopened = SegmentLog(str(tmp_path))
+    assert values(reopened.read(reopened.committed, 10)) == [2, 3, 4]
+    reopened.append(payloads(1, start=5))
+    assert values(reopened.read(reopened.committed, 10)) == [2, 3, 4, 5]
+    reopened.close()
+
+
+def test_torn_entry_is_dropped_and_overwritten(tmp_path):
+    log = SegmentLog(str(tmp_path))
+    log.append(payloads(2))
+    # a crash in the middle of the next append: header written, payload not
+    HEADER.pack_into(log.map, log.position, 50, 12345)
+    log.close()
+    reopened = SegmentLog(str(tmp_path))
+    assert values(reopened.read(0, 10)) == [0, 1]
+    reopened.append(payloads(1, start=2))
+    assert values(reopened.read(0, 10)) == [0, 1, 2]
+    reopened.close()
+
+
+def test_corrupt_entry_ends_the_log(tmp_path):
+    log = SegmentLog(str(tmp_path))
+    log.append(payloads(3))
+    second = log.read(0, 1)[0][0]
+    log.map[second + HEADER.size] ^= 0xFF
+    assert values(log.read(0, 10)) == [0]
+    log.close()
+
+
+def test_entry_larger_than_a_segment(tmp_path):
+    log = SegmentLog(str(tmp_path), segment_bytes=64)
+    with pytest.raises(ValueError):
+        log.append([b"x" * 100])
+    log.close()
+
+
+@pytest.mark.skipif(spool.fcntl is None, reason="no advisory locks on this platform")
+def test_directory_is_locked(tmp_path):
+    log = SegmentLog(str(tmp_path))
+    with pytest.raises(RuntimeError):
+        SegmentLog(str(tmp_path))
+    log.close()
+    SegmentLog(str(tmp_path)).close()
+
+
+def test_spool_retries_until_the_write_succeeds(tmp_path):
+    written = []
+    down = threading.Event()
+    down.set()
+
+    def write(sensor_type, records):
+        if down.is_set():
+            raise ConnectionError("database down")
+        written.extend((sensor_type, record["v"]) for record in records)
+
+    store = Spool(write, str(tmp_path), retry_interval=0.01, report=lambda message: None).start()
+    records = [{"v": 1}, {"v": 2}]
+    store.put("co2", records)
+    assert all("_id" in record for record in records)
+    wait_for(lambda: store.failures >= 2)
+    assert store.pending()
+    down.clear()
+    wait_for(lambda: not store.pending())
+    store.close()
+    assert written == [("co2", 1), ("co2", 2)]
+    assert store.stats()["replayed"] == 2
+
+
+def test_duplicates_on_replay_count_as_written(tmp_path):
+    def write(sensor_type, records):
+        raise BulkWriteError({"writeErrors": [{"index": 0, "code": 11000}]})
+
+    store = Spool(write, str(tmp_path), retry_interval=0.01, report=lambda message: None).start()
+    store.put("co2", [{"v": 1}])
+    wait_for(lambda: not store.pending())
+    store.close()
+    assert store.failures == 0
+
+
+def test_outage_is_spooled_and_summarized_once(extractor, tmp_path):
+    extractor.start_spool(str(tmp_path / "spool"), retry_interval=0.01)
+    day = datetime(2020, 1, 1)
+    record = lambda i: {"metadata": {"sensor": "SCD40"}, "timestamp": day + timedelta(minutes=i), "data": {"co2": float(i)}}
+    write = extractor.storage.write
+
+    def unavailable(*args, **kwargs):
+        raise ConnectionError("database down")
+
+    extractor.storage.write = unavailable
+    extractor.insert_data([record(i) for i in range(3)], "co2", 1000)
+    assert extractor.spool.pending()
+    extractor.storage.write = write
+    wait_for(lambda: not extractor.spool.pending())
+    extractor.sketches.flush()
+    extractor.rollups.flush()
+    assert extractor.storage.count("co2", "2020-01-01") == 3
+    assert extractor.sketches.get("co2", "co2", "2020-01-01").n == 3
+    assert extractor.rollups.get("day", "co2", "co2", day)["count"] == 3
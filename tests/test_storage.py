@@ -0,0 +1,102 @@
+'''
+Author: Munir Mohamed Hafeel
+Date: 10-18-2026
+'''
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from storage import BucketStorage, DailyCollectionStorage, TimeSeriesStorage, split_collection_name
+
+START = datetime(2026, 1, 1, 12, 0, 0)
+
+
+def readings(n, start=START, step=10, sensor="SCD40"):
+    # fresh dicts every call; insert_many adds an _id to the ones it stores
+    return [{"metadata": {"sensor": sensor}, "timestamp": start + timedelta(seconds=step * i),
+             "data": {"co2": 400.0 + i}} for i in range(n)]
+
+
+@pytest.fixture
+def database(monkeypatch):
+    mongomock = pytest.importorskip("mongomock")
+    database = mongomock.MongoClient().db
+    create_collection = database.create_collection
+    # mongomock has no time-series collections; a plain one takes the same queries
+    monkeypatch.setattr(database, "create_collection", lambda name, timeseries=None, **kwargs: create_collection(name, **kwargs))
+    return database
+
+
+def test_split_collection_name():
+    assert split_collection_name("temperature-humidity-2026-01-01") == ("temperature-humidity", "2026-01-01")
+
+
+@pytest.mark.parametrize("backend", [DailyCollectionStorage, TimeSeriesStorage, BucketStorage])
+def test_idempotent_write_twice_stores_once(database, backend):
+    storage = backend(database, idempotent=True)
+    assert len(storage.write("co2", readings(5))) == 5
+    # a replay overlapping the first batch by three readings
+    stored = storage.write("co2", readings(5, start=START + timedelta(seconds=20)))
+    assert [record["timestamp"] for record in stored] == [START + timedelta(seconds=50), START + timedelta(seconds=60)]
+    assert storage.count("co2", "2026-01-01") == 7
+
+
+@pytest.mark.parametrize("backend", [DailyCollectionStorage, TimeSeriesStorage, BucketStorage])
+def test_duplicates_within_a_batch_and_across_sensors(database, backend):
+    storage = backend(database, idempotent=True)
+    batch = readings(2) + readings(2)
+    assert len(storage.write("co2", batch)) == 2
+    if backend is TimeSeriesStorage:
+        # the key includes metadata.sensor, another sensor at the same time is new
+        assert len(storage.write("co2", readings(2, sensor="SCD41"))) == 2
+
+
+@pytest.mark.parametrize("backend", [TimeSeriesStorage, BucketStorage])
+def test_insert_one_reports_duplicates(database, backend):
+    storage = backend(database, idempotent=True)
+    assert storage.insert_one("co2", readings(1)[0])
+    assert not storage.insert_one("co2", readings(1)[0])
+    assert storage.count("co2", "2026-01-01") == 1
+
+
+def test_non_idempotent_timeseries_stores_duplicates(database):
+    storage = TimeSeriesStorage(database)
+    storage.write("co2", readings(3))
+    storage.write("co2", readings(3))
+    assert storage.count("co2", "2026-01-01") == 6
+
+
+def buckets(database):
+    return sorted((doc["start"], doc["n"], len(doc["o"]), len(doc["v"]["co2"])) for doc in database.co2_buckets.find())
+
+
+def test_full_bucket_opens_a_new_one(database):
+    storage = BucketStorage(database, max_count=3)
+    storage.write("co2", readings(3, step=1))
+    assert buckets(database) == [(START, 3, 3, 3)]
+    storage.write("co2", readings(1, start=START + timedelta(seconds=3)))
+    assert buckets(database) == [(START, 1, 1, 1), (START, 3, 3, 3)]
+    assert storage.count("co2", "2026-01-01") == 4
+
+
+def test_chunk_goes_to_a_bucket_with_room_for_all_of_it(database):
+    storage = BucketStorage(database, max_count=3)
+    storage.write("co2", readings(2, step=1))
+    # two more would overflow the first bucket, so they start a second one
+    storage.write("co2", readings(2, start=START + timedelta(seconds=2), step=1))
+    storage.write("co2", readings(1, start=START + timedelta(seconds=4)))
+    assert buckets(database) == [(START, 2, 2, 2), (START, 3, 3, 3)]
+
+
+def test_large_batch_is_split_into_full_buckets(database):
+    storage = BucketStorage(database, max_count=4)
+    storage.write("co2", readings(10, step=1))
+    assert [n for _, n, _, _ in buckets(database)] == [2, 4, 4]
+    assert storage.count("co2", "2026-01-01") == 10
+
+
+def test_buckets_follow_the_span(database):
+    storage = BucketStorage(database)
+    storage.write("co2", readings(3, step=40))
+    assert [start for start, _, _, _ in buckets(database)] == [START, START + timedelta(minutes=1)]
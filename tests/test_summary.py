@@ -0,0 +1,56 @@
+'''
+Author: Munir Mohamed Hafeel
+Date: 10-18-2026
+'''
+
+from datetime import datetime, timedelta
+
+import pytest
+
+DAYS = ["2026-01-01", "2026-01-02"]
+
+
+def store(extractor, day, values):
+    start = datetime.strptime(day, '%Y-%m-%d')
+    records = [{"metadata": {"sensor": "DHT22"}, "timestamp": start + timedelta(minutes=7 * i),
+                "data": {"temperature": value, "humidity": 50.0 + i % 4}} for i, value in enumerate(values)]
+    extractor.insert_data(records, "temperature-humidity", 100)
+
+
+@pytest.fixture
+def stored(extractor):
+    store(extractor, DAYS[0], [21.5, 22.0, 22.0, 23.25, 20.75, 22.0, 24.5, 19.0, 21.0, 22.5, 23.0])
+    store(extractor, DAYS[1], [18.0, 26.0, 22.0, 25.5])
+    extractor.sketches.flush()
+    extractor.rollups.flush()
+    return extractor
+
+
+def test_summary_of_a_day_matches_the_statistics_methods(stored):
+    extractor = stored
+    collection_name = f"temperature-humidity-{DAYS[0]}"
+    summary = extractor.get_summary("temperature-humidity", DAYS[0], ["temperature", "humidity"])
+    for key in ("temperature", "humidity"):
+        fields = summary[key]
+        assert fields["average"] == pytest.approx(extractor.get_average_value("temperature-humidity", DAYS[0], key))
+        assert fields["highest"] == extractor.get_highest_value("temperature-humidity", DAYS[0], key)
+        assert fields["lowest"] == extractor.get_lowest_value("temperature-humidity", DAYS[0], key)
+        assert fields["median"] == extractor.get_median(collection_name, key, exact=True)
+        assert fields["standard_deviation"] == pytest.approx(extractor.get_standard_deviation(collection_name, key))
+        assert fields["percentiles"] == extractor.get_percentiles(collection_name, key, exact=True)
+        assert fields["count"] == fields["data_count"] == extractor.get_data_count(collection_name)
+        assert fields["data_rate"] == pytest.approx(extractor.get_data_rate(collection_name))
+    assert summary["temperature"]["mode"] == extractor.get_mode(collection_name, "temperature") == 22.0
+
+
+def test_summary_over_days_pools_the_readings(stored):
+    try:
+        summary = stored.get_summary("temperature-humidity", DAYS, ["temperature"])["temperature"]
+    except NotImplementedError as e:
+        pytest.skip(f"mongomock cannot run the $unionWith pipeline: {e}")
+    assert summary["count"] == 15
+    assert (summary["lowest"], summary["highest"]) == (18.0, 26.0)
+
+
+def test_summary_of_no_days(stored):
+    assert stored.get_summary("temperature-humidity", [], ["temperature"]) == {}
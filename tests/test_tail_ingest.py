@@ -0,0 +1,88 @@
+'''
+Author: Munir Mohamed Hafeel
+Date: 10-18-2026
+'''
+
+import os
+
+from tail_ingest import Checkpoint, read_new_lines
+
+
+def line(second, co2):
+    return f"2026-01-01, 12:00:{second:02d} - CO2: {co2}\n"
+
+
+def test_partial_trailing_line_waits_for_the_next_pass(tmp_path):
+    path = tmp_path / "serial.log"
+    path.write_bytes(b"one\ntwo\npart")
+    assert list(read_new_lines(str(path), 0)) == [("one\ntwo\n", 8)]
+    with open(path, 'ab') as file:
+        file.write(b"ial\nnext")
+    assert list(read_new_lines(str(path), 8)) == [("partial\n", 16)]
+
+
+def test_lines_longer_than_a_chunk(tmp_path):
+    path = tmp_path / "serial.log"
+    path.write_bytes(b"a" * 10 + b"\nbb\n" + b"c" * 10)
+    assert list(read_new_lines(str(path), 0, chunk_bytes=4)) == [("a" * 10 + "\n", 11), ("bb\n", 14)]
+
+
+def test_checkpoint_round_trip(tmp_path):
+    path = tmp_path / "serial.log"
+    path.write_text("one\ntwo\n")
+    checkpoint = Checkpoint(str(tmp_path / "serial.log.checkpoint"))
+    assert checkpoint.load(str(path)) == 0
+    checkpoint.save(str(path), 4)
+    assert Checkpoint(checkpoint.path).load(str(path)) == 4
+    # another log does not inherit the offset
+    other = tmp_path / "other.log"
+    other.write_text("one\ntwo\n")
+    assert checkpoint.load(str(other)) == 0
+
+
+def test_truncated_log_starts_over(tmp_path):
+    path = tmp_path / "serial.log"
+    path.write_text("one\ntwo\n")
+    checkpoint = Checkpoint(str(tmp_path / "checkpoint"))
+    checkpoint.save(str(path), 8)
+    path.write_text("x\n")
+    assert checkpoint.load(str(path)) == 0
+
+
+def test_rotated_log_starts_over(tmp_path):
+    path = tmp_path / "serial.log"
+    path.write_text("one\ntwo\n")
+    checkpoint = Checkpoint(str(tmp_path / "checkpoint"))
+    checkpoint.save(str(path), 4)
+    os.rename(path, tmp_path / "serial.log.1")
+    path.write_text("three\nfour\n")
+    assert checkpoint.load(str(path)) == 0
+
+
+def test_corrupt_checkpoint_starts_over(tmp_path):
+    path = tmp_path / "serial.log"
+    path.write_text("one\n")
+    (tmp_path / "checkpoint").write_text("{half")
+    assert Checkpoint(str(tmp_path / "checkpoint")).load(str(path)) == 0
+
+
+def test_extract_incremental_resumes_from_the_checkpoint(extractor, tmp_path):
+    path = tmp_path / "serial.log"
+    path.write_text(line(0, 400) + line(1, 401) + "2026-01-01, 12:00:02 - CO")
+    assert extractor.extract_incremental(str(path), workers=1) == 2
+    with open(path, 'a') as file:
+        file.write("2: 402\n" + line(3, 403))
+    assert extractor.extract_incremental(str(path), workers=1) == 2
+    assert extractor.storage.count("co2", "2026-01-01") == 4
+    assert extractor.extract_incremental(str(path), workers=1) == 0
+
+
+def test_extract_incremental_counts_stored_readings(extractor, tmp_path):
+    # with idempotent writes a replayed log stores, and reports, nothing new
+    extractor.storage.idempotent = True
+    path = tmp_path / "serial.log"
+    path.write_text(line(0, 400) + line(1, 401))
+    assert extractor.extract_incremental(str(path), workers=1) == 2
+    os.remove(f"{path}.checkpoint")
+    assert extractor.extract_incremental(str(path), workers=1) == 0
+    assert extractor.storage.count("co2", "2026-01-01") == 2
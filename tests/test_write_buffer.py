@@ -0,0 +1,81 @@
+'''
+Author: Munir Mohamed Hafeel
+Date: 10-18-2026
+'''
+
+import threading
+
+from write_buffer import WriteBehindBuffer
+
+
+def test_batches_are_grouped_by_key_and_flushed_on_close():
+    written = []
+    buffer = WriteBehindBuffer(lambda key, records: written.append((key, list(records))),
+                               max_batch=1000, max_delay=60).start()
+    for i in range(3):
+        buffer.put("co2", i)
+    buffer.put("pH", 9)
+    buffer.close()
+    assert sorted(written) == [("co2", [0, 1, 2]), ("pH", [9])]
+    assert buffer.stats()["flushed_records"] == 4
+    assert buffer.depth() == 0
+
+
+def test_flushes_when_max_batch_is_reached():
+    flushed = threading.Event()
+    written = []
+
+    def write(key, records):
+        written.append(len(records))
+        flushed.set()
+
+    buffer = WriteBehindBuffer(write, max_batch=5, max_delay=60).start()
+    for i in range(5):
+        buffer.put("co2", i)
+    assert flushed.wait(5)
+    buffer.close()
+    assert written == [5]
+
+
+def test_write_errors_are_counted_and_do_not_stop_the_worker():
+    written = []
+
+    def write(key, records):
+        if key == "bad":
+            raise RuntimeError("database down")
+        written.extend(records)
+
+    buffer = WriteBehindBuffer(write, max_batch=1000, max_delay=60, report=lambda message: None).start()
+    buffer.put("bad", 1)
+    buffer.put("good", 2)
+    buffer.close()
+    assert written == [2]
+    assert buffer.errors == 1
+
+
+def test_full_queue_spills_then_drops_without_blocking():
+    spilled = []
+
+    def overflow(key, records):
+        # room for one spilled record, then the spool is "full" too
+        if spilled:
+            return False
+        spilled.extend(records)
+        return True
+
+    # not started: nothing drains the queue
+    buffer = WriteBehindBuffer(lambda key, records: None, max_queue=2, overflow=overflow, report=lambda message: None)
+    results = [buffer.put("co2", i) for i in range(5)]
+    assert results == [True, True, True, False, False]
+    assert spilled == [2]
+    assert (buffer.spilled, buffer.dropped) == (1, 2)
+
+
+def test_overflow_errors_count_as_drops():
+    def overflow(key, records):
+        raise OSError("disk full")
+
+    buffer = WriteBehindBuffer(lambda key, records: None, max_queue=1, overflow=overflow, report=lambda message: None)
+    assert buffer.put("co2", 1)
+    assert not buffer.put("co2", 2)
+    assert buffer.dropped == 1
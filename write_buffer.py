@@ -0,0 +1,120 @@
+'''
+Author: Munir Mohamed Hafeel
+Date: 10-18-2026
+'''
+
+import time
+import queue
+import threading
+from collections import deque
+
+_STOP = object()
+
+
+class WriteBehindBuffer:
+    '''
+    Collects records on the caller's thread and writes them from a worker
+    thread, grouped by key (the sensor type, split into day collections by
+    the storage backend), once max_batch records are pending or the oldest
+    pending record is max_delay seconds old. put() never blocks: when the
+    queue is full the record goes to overflow(key, records), e.g. a spool,
+    and is dropped and counted if there is none or it returns False.
+    '''
+
+    def __init__(self, write, max_batch=500, max_delay=1.0, max_queue=100000, overflow=None, report=print):
+        self.write = write
+        self.overflow = overflow
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.report = report
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.pending = {}
+        self.pending_count = 0
+        self.flush_times = deque(maxlen=1000)
+        self.flushed = 0
+        self.errors = 0
+        self.spilled = 0
+        self.dropped = 0
+        self.thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def put(self, key, record):
+        # runs on the MQTT network thread, which must keep up with keepalives
+        try:
+            self.queue.put_nowait((key, record))
+            return True
+        except queue.Full:
+            pass
+        try:
+            if self.overflow is not None and self.overflow(key, [record]):
+                self.spilled += 1
+                return True
+        except Exception as e:
+            self.report(f"Could not spill a {key} record from the full write queue: {e}")
+        self.dropped += 1
+        if self.dropped == 1 or self.dropped % 1000 == 0:
+            self.report(f"Write queue full, {self.dropped} records dropped so far")
+        return False
+
+    def depth(self):
+        return self.queue.qsize() + self.pending_count
+
+    def stats(self):
+        times = list(self.flush_times)
+        return {
+            "queue_depth": self.depth(),
+            "flushed_records": self.flushed,
+            "flushes": len(times),
+            "errors": self.errors,
+            "spilled": self.spilled,
+            "dropped": self.dropped,
+            "last_flush_ms": times[-1] * 1000 if times else None,
+            "avg_flush_ms": sum(times) / len(times) * 1000 if times else None,
+            "max_flush_ms": max(times) * 1000 if times else None,
+        }
+
+    def _run(self):
+        oldest = None
+        while True:
+            timeout = self.max_delay if oldest is None else max(0.0, oldest + self.max_delay - time.monotonic())
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                self._flush()
+                return
+            if item is not None:
+                key, record = item
+                self.pending.setdefault(key, []).append(record)
+                self.pending_count += 1
+                if oldest is None:
+                    oldest = time.monotonic()
+
+            if self.pending_count >= self.max_batch or (oldest is not None and time.monotonic() - oldest >= self.max_delay):
+                self._flush()
+                oldest = None
+
+    def _flush(self):
+        if not self.pending:
+            return
+        batches, self.pending = self.pending, {}
+        self.pending_count = 0
+        start = time.monotonic()
+        for key, records in batches.items():
+            try:
+                self.write(key, records)
+                self.flushed += len(records)
+            except Exception as e:
+                self.errors += 1
+                self.report(f"Error flushing {len(records)} records to {key}: {e}")
+        self.flush_times.append(time.monotonic() - start)
+
+    def close(self):
+        if self.thread.is_alive():
+            self.queue.put(_STOP)
+            self.thread.join()